@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Compare audit log storage formats: per-field rows versus compact change sets.
+
+Writes the audit trail of a simulated bulk update (``--items`` items with
+``--fields`` changed fields each) into scratch SQLite databases, once per
+format, through the same ``write_rows`` path the app uses. Reports write
+throughput and the on-disk size of the audit tables including indexes.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import create_engine
+
+from benchmarks import common, datagen
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+    'python-requests/2.31.0'
+]
+
+def audit_rows(items, fields, seed):
+    """Per-field audit rows for a bulk update, grouped into one flush per 500 items."""
+    rng = random.Random(seed)
+    names = datagen.AUDIT_FIELDS[:fields]
+    flushes = []
+    for start in range(0, items, 500):
+        changed_at = datagen.EPOCH + timedelta(seconds=start)
+        user = rng.choice(datagen.USERS)
+        agent = rng.choice(USER_AGENTS)
+        ip_address = f'10.0.{rng.randrange(256)}.{rng.randrange(256)}'
+        flushes.append([
+            {
+                'action_type': 'UPDATE',
+                'field_name': name,
+                'old_value': f'old-{name}-{n}',
+                'new_value': f'new-{name}-{n}',
+                'asset_tag': f'BENCH{n:08d}',
+                'location_id': n % 200 + 1,
+                'changed_by': user,
+                'ip_address': ip_address,
+                'user_agent': agent,
+                'changed_at': changed_at
+            }
+            for n in range(start, min(start + 500, items))
+            for name in names
+        ])
+    return flushes
+
+def run(fmt, flushes, directory):
+    """Write every flush in one format and measure time and size."""
+    from src.models import db
+    from src.utils.audit import clear_dictionary_cache, write_rows
+
+    path = os.path.join(directory, f'audit-{fmt}.db')
+    engine = create_engine(f'sqlite:///{path}')
+    tables = [db.metadata.tables[name] for name in ('audit_log', 'audit_users', 'audit_user_agents', 'audit_changes')]
+    db.metadata.create_all(engine, tables=tables)
+    clear_dictionary_cache()
+
+    start = time.perf_counter()
+    for rows in flushes:
+        with engine.begin() as conn:
+            write_rows(conn, rows, {}, compact=fmt == 'compact')
+    elapsed = time.perf_counter() - start
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql('VACUUM')
+    engine.dispose()
+    entries = sum(len(rows) for rows in flushes)
+    return {
+        'entries': entries,
+        'seconds': round(elapsed, 3),
+        'entries_per_s': round(entries / elapsed, 1),
+        'bytes': os.path.getsize(path)
+    }
+
+def main(argv=None):
+    """Run both formats and print the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10_000, help='Items changed by the bulk update')
+    parser.add_argument('--fields', type=int, default=5, help=f'Changed fields per item (max {len(datagen.AUDIT_FIELDS)})')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', default='benchmarks/results/audit.json', help='JSON result file')
+    args = parser.parse_args(argv)
+
+    flushes = audit_rows(args.items, args.fields, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        results = {fmt: run(fmt, flushes, directory) for fmt in ('rows', 'compact')}
+
+    rows, compact = results['rows'], results['compact']
+    for fmt, result in results.items():
+        print(f'{fmt:8} {result["entries"]} entries in {result["seconds"]:.2f}s '
+              f'({result["entries_per_s"]:.0f}/s), {result["bytes"] / 1024:.0f} KiB on disk')
+    print(f'compact: {1 - compact["bytes"] / rows["bytes"]:.0%} less storage, '
+          f'{compact["entries_per_s"] / rows["entries_per_s"]:.1f}x write throughput')
+
+    common.write_results(args.output, dict(results, meta=common.run_metadata(items=args.items, fields=args.fields)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
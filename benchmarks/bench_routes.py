@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Benchmark every API route through the Flask test client.
+
+Each route is exercised against a database seeded by ``benchmarks.datagen``
+and reports p50/p95/p99 latency, SQL statements per request and peak Python
+memory. Results are written as JSON so runs can be compared with ``--compare``.
+"""
+import argparse
+import itertools
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from benchmarks import common, datagen
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+
+class QueryCounter:
+    """Count SQL statements issued on any engine."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self)
+
+class Context:
+    """Ids and scratch rows shared by the route cases."""
+
+    def __init__(self, session):
+        from src.models.inventory import Inventory
+        from src.models.location import Location
+
+        self.session = session
+        self.item_ids = session.execute(select(Inventory.id).order_by(Inventory.id).limit(1000)).scalars().all()
+        self.location_ids = session.execute(select(Location.id).order_by(Location.id).limit(100)).scalars().all()
+        self.tags = (f'BENCHNEW{n:08d}' for n in itertools.count())
+        self.rooms = (f'B{n:06d}' for n in itertools.count())
+
+    def item_id(self, n):
+        return self.item_ids[n % len(self.item_ids)]
+
+    def location_id(self, n):
+        return self.location_ids[n % len(self.location_ids)]
+
+    def new_item(self, n):
+        return {
+            'asset_tag': next(self.tags),
+            'asset_type': 'Laptop',
+            'manufacturer': 'Dell',
+            'model': 'BENCH',
+            'location_id': self.location_id(n)
+        }
+
+    def scratch_items(self, count):
+        """Insert throwaway items (e.g. for delete benchmarks) and return their ids."""
+        from src.models.inventory import Inventory
+
+        tags = [next(self.tags) for _ in range(count)]
+        self.session.execute(insert(Inventory.__table__), [
+            {'asset_tag': tag, 'asset_type': 'Laptop', 'location_id': self.location_id(n)}
+            for n, tag in enumerate(tags)
+        ])
+        self.session.commit()
+        return self.session.execute(select(Inventory.id).where(Inventory.asset_tag.in_(tags))).scalars().all()
+
+    def scratch_locations(self, count):
+        """Insert throwaway empty locations and return their ids."""
+        from src.models.location import Location
+
+        rooms = [next(self.rooms) for _ in range(count)]
+        self.session.execute(insert(Location.__table__), [
+            {'site_name': 'Benchmark', 'room_number': room} for room in rooms
+        ])
+        self.session.commit()
+        return self.session.execute(
+            select(Location.id).where(Location.site_name == 'Benchmark', Location.room_number.in_(rooms))
+        ).scalars().all()
+
+# Endpoint -> builder returning the list of (method, url, json) requests to time
+CASES = {
+    'auth.login': lambda ctx, n: [('GET', '/auth/login', None)] * n,
+    'auth.authorized': lambda ctx, n: [('GET', '/auth/authorized', None)] * n,
+    'auth.logout': lambda ctx, n: [('GET', '/auth/logout', None)] * n,
+    'auth.status': lambda ctx, n: [('GET', '/auth/status', None)] * n,
+    'inventory.get_inventory': lambda ctx, n: [('GET', '/api/inventory', None)] * n,
+    'inventory.get_asset_types': lambda ctx, n: [('GET', '/api/inventory/types', None)] * n,
+    'inventory.get_inventory_item': lambda ctx, n: [
+        ('GET', f'/api/inventory/{ctx.item_id(i)}', None) for i in range(n)
+    ],
+    'inventory.get_inventory_history': lambda ctx, n: [
+        ('GET', f'/api/inventory/{ctx.item_id(i)}/history', None) for i in range(n)
+    ],
+    'inventory.get_inventory_as_of': lambda ctx, n: [
+        ('GET', f'/api/inventory/{ctx.item_id(i)}/as-of?ts=2024-01-01T00:00:00', None) for i in range(n)
+    ],
+    'inventory.create_inventory_item': lambda ctx, n: [
+        ('POST', '/api/inventory', ctx.new_item(i)) for i in range(n)
+    ],
+    'inventory.update_inventory_item': lambda ctx, n: [
+        ('PUT', f'/api/inventory/{ctx.item_id(i)}', {'notes': f'bench {i}'}) for i in range(n)
+    ],
+    'inventory.delete_inventory_item': lambda ctx, n: [
+        ('DELETE', f'/api/inventory/{item_id}', None) for item_id in ctx.scratch_items(n)
+    ],
+    'inventory.toggle_loaner': lambda ctx, n: [
+        ('POST', f'/api/inventory/{ctx.item_id(i)}/toggle-loaner', None) for i in range(n)
+    ],
+    'inventory.bulk_create': lambda ctx, n: [
+        ('POST', '/api/inventory/bulk', {'items': [ctx.new_item(i) for i in range(100)]}) for _ in range(n)
+    ],
+    'inventory.bulk_update': lambda ctx, n: [
+        ('PUT', '/api/inventory/bulk', {'items': [
+            {'id': ctx.item_id(i * 100 + j), 'notes': f'bulk {i}'} for j in range(100)
+        ]}) for i in range(n)
+    ],
+    'location.get_locations': lambda ctx, n: [('GET', '/api/locations', None)] * n,
+    'location.get_location': lambda ctx, n: [
+        ('GET', f'/api/locations/{ctx.location_id(i)}', None) for i in range(n)
+    ],
+    'location.create_location': lambda ctx, n: [
+        ('POST', '/api/locations', {'site_name': 'Benchmark', 'room_number': next(ctx.rooms)}) for _ in range(n)
+    ],
+    'location.update_location': lambda ctx, n: [
+        ('PUT', f'/api/locations/{ctx.location_id(i)}', {'description': f'bench {i}'}) for i in range(n)
+    ],
+    'location.delete_location': lambda ctx, n: [
+        ('DELETE', f'/api/locations/{location_id}', None) for location_id in ctx.scratch_locations(n)
+    ],
+    'stats.get_stats': lambda ctx, n: [('GET', '/api/stats', None)] * n,
+    'stats.get_recent_activity': lambda ctx, n: [('GET', '/api/stats/recent-activity', None)] * n,
+    'stats.get_audit_log': lambda ctx, n: [
+        ('GET', f'/api/stats/audit?location_id={ctx.location_id(i)}&limit=20', None) for i in range(n)
+    ],
+    'stats.get_trends': lambda ctx, n: [('GET', '/api/stats/trends?metric=by_site&interval=month', None)] * n,
+    'stats.get_cache_metrics': lambda ctx, n: [('GET', '/api/stats/cache', None)] * n,
+}
+
+def missing_cases(app):
+    """List API endpoints that have no benchmark case."""
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules() if '.' in rule.endpoint}
+    return sorted(e for e in endpoints if e not in CASES and not e.endswith('.static'))
+
+def run_case(client, requests):
+    """Time a list of requests; returns latencies, query count and error count."""
+    latencies = []
+    errors = 0
+    with QueryCounter() as counter:
+        for method, url, body in requests:
+            start = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+    return latencies, counter.count, errors
+
+def measure_memory(client, request):
+    """Peak traced Python memory (KiB) for a single request."""
+    method, url, body = request
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        client.open(url, method=method, json=body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+def prepare_database(scale, seed, database_url=None):
+    """Return a database URL holding seeded data for ``scale``.
+
+    SQLite templates are cached under ``instance/`` and copied per run so
+    write benchmarks never mutate the template.
+    """
+    if database_url:
+        return database_url
+    os.makedirs(INSTANCE_DIR, exist_ok=True)
+    template = os.path.join(INSTANCE_DIR, f'bench-{scale}-{seed}.db')
+    working = os.path.join(INSTANCE_DIR, f'bench-{scale}-{seed}-run.db')
+    if not os.path.exists(template):
+        from src.models import db
+
+        engine = create_engine(f'sqlite:///{template}')
+        db.metadata.create_all(engine)
+        with Session(engine) as session:
+            datagen.seed(session, assets=datagen.parse_scale(scale), seed=seed)
+        engine.dispose()
+    shutil.copyfile(template, working)
+    return f'sqlite:///{working}'
+
+def main(argv=None):
+    """Run the route benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+    parser.add_argument('--seed', type=int, default=42, help='Data generator seed')
+    parser.add_argument('--iterations', type=int, default=50, help='Requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route')
+    parser.add_argument('--routes', nargs='*', help='Only run these endpoints (e.g. stats.get_stats)')
+    parser.add_argument('--database-url', help='Use an already seeded database instead of a SQLite template')
+    parser.add_argument('--output', default='benchmarks/results/routes.json', help='JSON result file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare p95 latency against')
+    args = parser.parse_args(argv)
+
+    # Config reads DATABASE_URL at import time
+    os.environ['DATABASE_URL'] = prepare_database(args.scale, args.seed, args.database_url)
+
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app('development')
+    app.config['SQLALCHEMY_ECHO'] = False
+    app.logger.disabled = True
+
+    results = {}
+    with app.app_context(), app.test_client() as client:
+        ctx = Context(db.session)
+        for endpoint in missing_cases(app):
+            print(f'WARNING: no benchmark case for {endpoint}', file=sys.stderr)
+
+        for endpoint, build in CASES.items():
+            if args.routes and endpoint not in args.routes:
+                continue
+            run_case(client, build(ctx, args.warmup))
+            requests = build(ctx, args.iterations + 1)
+            latencies, queries, errors = run_case(client, requests[:-1])
+            result = common.summarize(latencies)
+            result.update({
+                'method': requests[0][0],
+                'path': requests[0][1],
+                'errors': errors,
+                'queries_per_request': round(queries / max(len(latencies), 1), 2),
+                'peak_memory_kb': measure_memory(client, requests[-1])
+            })
+            results[endpoint] = result
+            print(f'{endpoint:40} p50={result["p50_ms"]:8.2f}ms p95={result["p95_ms"]:8.2f}ms '
+                  f'p99={result["p99_ms"]:8.2f}ms queries={result["queries_per_request"]:7.1f} '
+                  f'peak={result["peak_memory_kb"]:9.1f}KiB errors={errors}')
+
+    common.write_results(args.output, {
+        'meta': common.run_metadata(scale=args.scale, seed=args.seed, iterations=args.iterations),
+        'routes': results
+    })
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        baseline = common.load_results(args.compare)
+        common.print_comparison(common.compare(results, baseline.get('routes', {})))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Shared helpers for benchmark and load-test result files."""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+PERCENTILES = (50, 95, 99)
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(latencies_ms):
+    """Summarize latency samples in milliseconds."""
+    summary = {f'p{pct}_ms': _round(percentile(latencies_ms, pct)) for pct in PERCENTILES}
+    summary.update({
+        'mean_ms': _round(sum(latencies_ms) / len(latencies_ms)) if latencies_ms else None,
+        'max_ms': _round(max(latencies_ms)) if latencies_ms else None,
+        'samples': len(latencies_ms)
+    })
+    return summary
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+def run_metadata(**extra):
+    """Describe the environment a result file was produced in."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=False
+        ).stdout.strip() or None
+    except OSError:
+        revision = None
+    meta = {
+        'started_at': datetime.utcnow().isoformat(),
+        'revision': revision,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+    meta.update(extra)
+    return meta
+
+def write_results(path, results):
+    """Write a result document as JSON."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+
+def load_results(path):
+    """Load a result document."""
+    with open(path) as fh:
+        return json.load(fh)
+
+def compare(current, baseline, metric='p95_ms', tolerance=0.2):
+    """Compare two result maps keyed by name.
+
+    Returns a list of (name, baseline, current, ratio, regressed) tuples.
+    A value regresses when it is more than ``tolerance`` above the baseline.
+    """
+    rows = []
+    for name, values in sorted(current.items()):
+        old = baseline.get(name, {}).get(metric)
+        new = values.get(metric)
+        if old is None or new is None:
+            continue
+        ratio = new / old if old else float('inf') if new else 1.0
+        rows.append((name, old, new, ratio, ratio > 1 + tolerance))
+    return rows
+
+def print_comparison(rows, metric='p95_ms'):
+    """Print a comparison table."""
+    print(f'{"name":45} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, old, new, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:45} {old:10.2f} {new:10.2f} {(ratio - 1) * 100:+7.1f}%{flag}')
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic data generator for benchmarks.
+
+Seeds ``Location``, ``Inventory`` and ``AuditLog`` at a configurable scale.
+The same ``--seed`` and scale always produce the same rows, so benchmark runs
+against different builds are comparable.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+# Fixed epoch so generated timestamps do not depend on when the run happens
+EPOCH = datetime(2020, 1, 1)
+SPAN_DAYS = 5 * 365
+
+SITES = [
+    'Headquarters', 'North Campus', 'South Campus', 'Data Center', 'Warehouse',
+    'East Office', 'West Office', 'Research Lab', 'Training Center', 'Remote Depot'
+]
+ROOM_TYPES = ['Office', 'Conference', 'Lab', 'Storage', 'Server Room', 'Classroom']
+
+# (value, weight) pairs roughly matching production distributions
+ASSET_TYPES = [
+    ('Laptop', 40), ('Monitor', 25), ('Desktop', 15), ('Docking Station', 8),
+    ('Printer', 4), ('Phone', 4), ('Tablet', 3), ('Projector', 1)
+]
+MANUFACTURERS = {
+    'Laptop': ['Dell', 'Lenovo', 'HP', 'Apple'],
+    'Monitor': ['Dell', 'LG', 'Samsung'],
+    'Desktop': ['Dell', 'HP', 'Lenovo'],
+    'Docking Station': ['Dell', 'Lenovo', 'CalDigit'],
+    'Printer': ['HP', 'Brother', 'Xerox'],
+    'Phone': ['Cisco', 'Poly'],
+    'Tablet': ['Apple', 'Samsung'],
+    'Projector': ['Epson', 'BenQ']
+}
+STATUSES = [('active', 85), ('decommissioned', 10), ('repair', 5)]
+AUDIT_FIELDS = ['status', 'assigned_to', 'location_id', 'notes', 'is_loaner']
+USERS = [f'admin{n}@example.com' for n in range(20)]
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000
+}
+
+def _weighted(rng, pairs):
+    """Pick a value from (value, weight) pairs."""
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights)[0]
+
+def _timestamp(rng, start=EPOCH, span_days=SPAN_DAYS, recent_bias=2.0):
+    """Random timestamp skewed towards the end of the span."""
+    offset = span_days * (rng.random() ** (1 / recent_bias))
+    return start + timedelta(days=offset, seconds=rng.randrange(86400))
+
+def location_rows(rng, count):
+    """Generate location rows."""
+    rows = []
+    for n in range(count):
+        site = SITES[n % len(SITES)]
+        floor = str(1 + (n // len(SITES)) % 8)
+        rows.append({
+            'site_name': site,
+            'room_number': f'{floor}{n // len(SITES):04d}',
+            'room_name': f'Room {n}',
+            'room_type': rng.choice(ROOM_TYPES),
+            'floor': floor,
+            'building': f'{site} {chr(65 + n % 4)}',
+            'status': 'active',
+            'created_at': EPOCH,
+            'updated_at': EPOCH
+        })
+    return rows
+
+def location_weights(location_ids):
+    """Zipf-like cumulative weights: a handful of rooms (storage, labs) hold most assets."""
+    cum_weights = []
+    total = 0.0
+    for rank in range(len(location_ids)):
+        total += 1 / (rank + 1)
+        cum_weights.append(total)
+    return cum_weights
+
+def inventory_rows(rng, start, count, location_ids, cum_weights):
+    """Generate inventory rows skewed across locations."""
+    picked_locations = rng.choices(location_ids, cum_weights=cum_weights, k=count)
+    rows = []
+    for n, location_id in zip(range(start, start + count), picked_locations):
+        asset_type = _weighted(rng, ASSET_TYPES)
+        status = _weighted(rng, STATUSES)
+        purchased = _timestamp(rng)
+        rows.append({
+            'asset_tag': f'BENCH{n:08d}',
+            'asset_type': asset_type,
+            'manufacturer': rng.choice(MANUFACTURERS[asset_type]),
+            'model': f'{asset_type[:3].upper()}-{rng.randrange(100, 999)}',
+            'serial_number': f'SN{n:010d}',
+            'status': status,
+            'assigned_to': f'user{rng.randrange(5000)}@example.com' if rng.random() < 0.7 else None,
+            'date_assigned': purchased + timedelta(days=rng.randrange(30)),
+            'date_decommissioned': purchased + timedelta(days=rng.randrange(365, 1500))
+                if status == 'decommissioned' else None,
+            'purchase_date': purchased,
+            'warranty_expiry': purchased + timedelta(days=3 * 365),
+            'is_loaner': rng.random() < 0.05,
+            'location_id': location_id,
+            'created_at': purchased,
+            'updated_at': purchased
+        })
+    return rows
+
+def audit_rows(rng, assets, audit_per_asset):
+    """Generate audit rows; a minority of assets carry most of the history."""
+    rows = []
+    for asset in assets:
+        changes = min(int(rng.paretovariate(1.5) * audit_per_asset / 3), audit_per_asset * 20)
+        changed_at = asset['created_at']
+        for _ in range(changes):
+            changed_at = changed_at + timedelta(hours=rng.randrange(1, 24 * 60))
+            field = rng.choice(AUDIT_FIELDS)
+            rows.append({
+                'action_type': 'UPDATE',
+                'field_name': field,
+                'changed_by': rng.choice(USERS),
+                'old_value': f'old-{field}',
+                'new_value': f'new-{field}',
+                'asset_tag': asset['asset_tag'],
+                'location_id': asset['location_id'],
+                'changed_at': changed_at,
+                'ip_address': f'10.0.{rng.randrange(256)}.{rng.randrange(256)}',
+                'user_agent': 'Mozilla/5.0 (benchmark)',
+                'created_at': changed_at,
+                'updated_at': changed_at
+            })
+    return rows
+
+def seed(session, assets=10_000, locations=None, audit_per_asset=3, seed=42, batch_size=5000, echo=print):
+    """Seed the database bound to ``session``.
+
+    Returns a dict with the number of rows written per table.
+    """
+    from src.models.location import Location
+    from src.models.inventory import Inventory
+    from src.models.audit import AuditLog
+
+    rng = random.Random(seed)
+    locations = locations or max(10, assets // 50)
+    start = time.perf_counter()
+
+    session.execute(insert(Location.__table__), location_rows(rng, locations))
+    session.commit()
+    location_ids = [row[0] for row in session.execute(
+        Location.__table__.select().with_only_columns(Location.__table__.c.id).order_by(Location.__table__.c.id)
+    )]
+    cum_weights = location_weights(location_ids)
+    echo(f'Seeded {locations} locations')
+
+    audit_count = 0
+    for offset in range(0, assets, batch_size):
+        batch = inventory_rows(rng, offset, min(batch_size, assets - offset), location_ids, cum_weights)
+        session.execute(insert(Inventory.__table__), batch)
+        history = audit_rows(rng, batch, audit_per_asset)
+        if history:
+            session.execute(insert(AuditLog.__table__), history)
+        session.commit()
+        audit_count += len(history)
+        echo(f'Seeded {offset + len(batch)}/{assets} assets, {audit_count} audit rows')
+
+    elapsed = time.perf_counter() - start
+    echo(f'Seeding finished in {elapsed:.1f}s')
+    return {'locations': locations, 'inventory': assets, 'audit_log': audit_count}
+
+def parse_scale(value):
+    """Parse a scale name (10k/100k/1m) or a plain row count."""
+    return SCALES.get(value.lower()) or int(value)
+
+def main(argv=None):
+    """Seed the configured database."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+    parser.add_argument('--locations', type=int, help='Number of locations (default: assets / 50)')
+    parser.add_argument('--audit-per-asset', type=int, default=3, help='Mean audit rows per asset')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--database-url', help='Target database (default: app config)')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate tables first')
+    args = parser.parse_args(argv)
+
+    # Config reads DATABASE_URL at import time
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app('development')
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        seed(db.session, assets=parse_scale(args.scale), locations=args.locations,
+             audit_per_asset=args.audit_per_asset, seed=args.seed)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
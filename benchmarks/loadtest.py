@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Concurrent load test against a real gunicorn server.
+
+Starts the app through ``run_prod.StandaloneApplication`` in a child process,
+drives it with a mixed read/write workload from concurrent client threads and
+reports throughput and latency percentiles. With ``--baseline`` the run fails
+(exit code 1) when p95/p99 latency or throughput regress past the tolerance.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import create_engine, select
+
+from benchmarks import common
+from benchmarks.bench_routes import prepare_database
+
+AUTH_HEADERS = {
+    'X-User-ID': 'loadtest@example.com',
+    'X-User-Name': 'Load Test',
+    'X-User-Roles': '["admin"]',
+    'Content-Type': 'application/json'
+}
+
+# (operation, weight, builder) where builder(rng, item_ids) -> (method, path, body)
+WORKLOAD = [
+    ('list', 30, lambda rng, ids: ('GET', '/api/inventory?type=Projector', None)),
+    ('detail', 40, lambda rng, ids: ('GET', f'/api/inventory/{rng.choice(ids)}', None)),
+    ('stats', 20, lambda rng, ids: ('GET', '/api/stats', None)),
+    ('bulk_update', 10, lambda rng, ids: ('PUT', '/api/inventory/bulk', {'items': [
+        {'id': item_id, 'notes': f'load {rng.randrange(1000000)}'} for item_id in rng.sample(ids, 20)
+    ]})),
+]
+
+def serve(database_url, config_name, options):
+    """Child process entry point: run gunicorn via StandaloneApplication."""
+    # Config reads DATABASE_URL and pool sizing at import time
+    from run_prod import StandaloneApplication, lifecycle_hooks, pool_settings
+    os.environ['DATABASE_URL'] = database_url
+    for key, value in pool_settings(options).items():
+        os.environ.setdefault(key, str(value))
+    from src.app import create_app
+    from src.utils.db import dispose_engines
+
+    app = create_app(config_name)
+    dispose_engines(app)
+    StandaloneApplication(app, dict(options, **lifecycle_hooks(app))).run()
+
+def free_port():
+    """Find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(port, timeout=30):
+    """Block until the server answers HTTP requests."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/auth/status', headers=AUTH_HEADERS)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start within {timeout}s')
+
+def client_loop(port, item_ids, seed, stop_at, samples, errors, lock):
+    """Issue weighted requests on one keep-alive connection until ``stop_at``."""
+    rng = random.Random(seed)
+    operations, weights, builders = zip(*WORKLOAD)
+    local = defaultdict(list)
+    local_errors = defaultdict(int)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while time.monotonic() < stop_at:
+        index = rng.choices(range(len(operations)), weights=weights)[0]
+        method, path, body = builders[index](rng, item_ids)
+        payload = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=AUTH_HEADERS)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors[operations[index]] += 1
+        except (OSError, http.client.HTTPException):
+            local_errors[operations[index]] += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            continue
+        local[operations[index]].append((time.perf_counter() - start) * 1000)
+    conn.close()
+    with lock:
+        for operation, latencies in local.items():
+            samples[operation].extend(latencies)
+        for operation, count in local_errors.items():
+            errors[operation] += count
+
+def run_load(port, item_ids, clients, duration, seed):
+    """Run the client threads and collect samples."""
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(port, item_ids, seed + n, stop_at, samples, errors, lock))
+        for n in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    operations = {}
+    for operation, latencies in samples.items():
+        summary = common.summarize(latencies)
+        summary['errors'] = errors.get(operation, 0)
+        summary['throughput_rps'] = round(len(latencies) / elapsed, 2)
+        operations[operation] = summary
+    total = sum(len(latencies) for latencies in samples.values())
+    everything = [value for latencies in samples.values() for value in latencies]
+    overall = common.summarize(everything)
+    overall.update({
+        'errors': sum(errors.values()),
+        'throughput_rps': round(total / elapsed, 2),
+        'duration_s': round(elapsed, 2)
+    })
+    return {'overall': overall, 'operations': operations}
+
+def check_regressions(results, baseline, tolerance):
+    """Return human-readable regression messages (empty when within tolerance)."""
+    failures = []
+    current = dict(results['operations'], overall=results['overall'])
+    reference = dict(baseline.get('operations', {}), overall=baseline.get('overall', {}))
+    for metric in ('p95_ms', 'p99_ms'):
+        rows = common.compare(current, reference, metric=metric, tolerance=tolerance)
+        print(f'\n{metric}:')
+        common.print_comparison(rows, metric)
+        failures.extend(
+            f'{name} {metric} {old:.2f} -> {new:.2f}' for name, old, new, ratio, regressed in rows if regressed
+        )
+    old_rps = reference['overall'].get('throughput_rps')
+    new_rps = current['overall']['throughput_rps']
+    if old_rps and new_rps < old_rps * (1 - tolerance):
+        failures.append(f'throughput {old_rps:.1f} -> {new_rps:.1f} req/s')
+    return failures
+
+def main(argv=None):
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+    parser.add_argument('--seed', type=int, default=42, help='Data generator and workload seed')
+    parser.add_argument('--database-url', help='Use an already seeded database instead of a SQLite template')
+    parser.add_argument('--config', default='development',
+                        help='App config; development accepts X-User-* headers so clients need no SSO login')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of untimed load first')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='Gunicorn threads per worker')
+    parser.add_argument('--loglevel', default='warning', help='Gunicorn log level (info shows pool statistics)')
+    parser.add_argument('--max-requests', type=int, default=1000, help='Gunicorn worker recycle interval')
+    parser.add_argument('--output', default='benchmarks/results/loadtest.json', help='JSON result file')
+    parser.add_argument('--baseline', help='Baseline JSON to gate against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to --baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression ratio')
+    args = parser.parse_args(argv)
+
+    database_url = prepare_database(args.scale, args.seed, args.database_url)
+    engine = create_engine(database_url)
+    from src.models.inventory import Inventory
+    with engine.connect() as conn:
+        item_ids = conn.execute(select(Inventory.id).order_by(Inventory.id).limit(5000)).scalars().all()
+    engine.dispose()
+
+    from run_prod import get_options
+    port = free_port()
+    options = get_options(
+        bind=f'127.0.0.1:{port}',
+        workers=args.workers,
+        threads=args.threads,
+        max_requests=args.max_requests,
+        accesslog=None,
+        errorlog='-',
+        loglevel=args.loglevel,
+        worker_tmp_dir='/dev/shm' if os.path.isdir('/dev/shm') else None
+    )
+    server = multiprocessing.Process(target=serve, args=(database_url, args.config, options), daemon=True)
+    server.start()
+    try:
+        wait_for_server(port)
+        if args.warmup:
+            run_load(port, item_ids, args.clients, args.warmup, args.seed)
+        results = run_load(port, item_ids, args.clients, args.duration, args.seed)
+    finally:
+        server.terminate()
+        server.join(10)
+
+    overall = results['overall']
+    print(f'{overall["samples"]} requests in {overall["duration_s"]}s: {overall["throughput_rps"]} req/s, '
+          f'p50={overall["p50_ms"]}ms p95={overall["p95_ms"]}ms p99={overall["p99_ms"]}ms '
+          f'errors={overall["errors"]}')
+    for operation, summary in sorted(results['operations'].items()):
+        print(f'  {operation:12} {summary["throughput_rps"]:8.1f} req/s p50={summary["p50_ms"]:8.2f}ms '
+              f'p95={summary["p95_ms"]:8.2f}ms p99={summary["p99_ms"]:8.2f}ms errors={summary["errors"]}')
+
+    document = dict(results, meta=common.run_metadata(
+        scale=args.scale, clients=args.clients, duration=args.duration,
+        workers=args.workers, threads=args.threads, config=args.config
+    ))
+    common.write_results(args.output, document)
+
+    if args.baseline and args.save_baseline:
+        common.write_results(args.baseline, document)
+        print(f'Baseline written to {args.baseline}')
+    elif args.baseline:
+        failures = check_regressions(results, common.load_results(args.baseline), args.tolerance)
+        if failures:
+            print('\nRegressions against baseline:', file=sys.stderr)
+            for failure in failures:
+                print(f'  {failure}', file=sys.stderr)
+            return 1
+        print('\nNo regressions against baseline')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -139,6 +139,70 @@ def downgrade():
     os.environ['FLASK_APP'] = 'src.app:app'
     subprocess.run([str(VENV_FLASK), 'db', 'downgrade'])
 
+@cli.command()
+@click.option('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+@click.option('--locations', type=int, help='Number of locations (default: assets / 50)')
+@click.option('--audit-per-asset', default=3, help='Mean audit rows per asset')
+@click.option('--seed', default=42, help='Random seed')
+@click.option('--database-url', help='Target database (default: app config)')
+@click.option('--reset', is_flag=True, help='Drop and recreate tables first')
+def seed(scale, locations, audit_per_asset, seed, database_url, reset):
+    """Seed the database with deterministic synthetic data."""
+    cmd = [str(VENV_PYTHON), '-m', 'benchmarks.datagen',
+           '--scale', scale, '--audit-per-asset', str(audit_per_asset), '--seed', str(seed)]
+    if locations:
+        cmd.extend(['--locations', str(locations)])
+    if database_url:
+        cmd.extend(['--database-url', database_url])
+    if reset:
+        cmd.append('--reset')
+    
+    click.echo(f'Seeding {scale} assets...')
+    result = subprocess.run(cmd, cwd=ROOT_DIR)
+    sys.exit(result.returncode)
+
+@cli.command()
+@click.option('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+@click.option('--iterations', default=50, help='Requests per route')
+@click.option('--route', 'routes', multiple=True, help='Only run this endpoint (repeatable)')
+@click.option('--output', default='benchmarks/results/routes.json', help='JSON result file')
+@click.option('--compare', help='Baseline JSON file to compare against')
+def bench(scale, iterations, routes, output, compare):
+    """Run route benchmarks."""
+    cmd = [str(VENV_PYTHON), '-m', 'benchmarks.bench_routes',
+           '--scale', scale, '--iterations', str(iterations), '--output', output]
+    if routes:
+        cmd.extend(['--routes', *routes])
+    if compare:
+        cmd.extend(['--compare', compare])
+    
+    click.echo(f'Benchmarking routes at {scale} assets...')
+    result = subprocess.run(cmd, cwd=ROOT_DIR)
+    sys.exit(result.returncode)
+
+@cli.command()
+@click.option('--scale', default='10k', help='10k, 100k, 1m or an asset count')
+@click.option('--clients', default=16, help='Concurrent client threads')
+@click.option('--duration', default=30.0, help='Seconds of load')
+@click.option('--workers', default=2, help='Gunicorn workers')
+@click.option('--threads', default=4, help='Gunicorn threads per worker')
+@click.option('--baseline', default='benchmarks/loadtest_baseline.json', help='Baseline JSON to gate against')
+@click.option('--save-baseline', is_flag=True, help='Store this run as the new baseline')
+@click.option('--tolerance', default=0.2, help='Allowed regression ratio')
+def loadtest(scale, clients, duration, workers, threads, baseline, save_baseline, tolerance):
+    """Run the concurrent load test against gunicorn."""
+    cmd = [str(VENV_PYTHON), '-m', 'benchmarks.loadtest',
+           '--scale', scale, '--clients', str(clients), '--duration', str(duration),
+           '--workers', str(workers), '--threads', str(threads), '--tolerance', str(tolerance)]
+    if save_baseline or os.path.exists(ROOT_DIR / baseline):
+        cmd.extend(['--baseline', baseline])
+    if save_baseline:
+        cmd.append('--save-baseline')
+    
+    click.echo(f'Load testing with {clients} clients for {duration}s...')
+    result = subprocess.run(cmd, cwd=ROOT_DIR)
+    sys.exit(result.returncode)
+
 @cli.command()
 @click.option('--check/--no-check', default=True, help='Run checks before building')
 def build(check):
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Run scheduled maintenance jobs."""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+from src.app import create_app
+from src.utils.archive import archive_audit
+from src.utils.rollups import backfill, write_daily_rollup
+from src.utils.snapshots import write_due_snapshots
+
+def get_app(args):
+    """Create the app for a job."""
+    return create_app(args.config) if args.config else create_app()
+
+def run_rollup(args):
+    """Write the daily stats rollup and optionally backfill earlier days."""
+    app = get_app(args)
+    with app.app_context():
+        if args.backfill_from:
+            days = backfill(date.fromisoformat(args.backfill_from), date.today() - timedelta(days=1))
+            print(f"Backfilled {len(days)} daily rollups from the audit log")
+        day = date.fromisoformat(args.date) if args.date else date.today()
+        buckets = write_daily_rollup(day)
+        print(f"Wrote {buckets} rollup buckets for {day}")
+    return 0
+
+def run_archive(args):
+    """Move old audit entries to the compressed monthly archive."""
+    app = get_app(args)
+    with app.app_context():
+        cutoff = None
+        if args.retention_days is not None:
+            cutoff = datetime.utcnow() - timedelta(days=args.retention_days)
+        archived = archive_audit(cutoff=cutoff, batch_size=args.batch_size)
+        print(f"Archived {archived} audit entries")
+    return 0
+
+def run_snapshot(args):
+    """Snapshot assets with enough audit entries since their last snapshot."""
+    app = get_app(args)
+    with app.app_context():
+        written = write_due_snapshots(every=args.every)
+        print(f"Wrote {written} asset snapshots")
+    return 0
+
+def main(argv=None):
+    """Parse arguments and run a job."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--config', default=None, help='App config name (defaults to FLASK_ENV)')
+    subparsers = parser.add_subparsers(dest='job', required=True)
+    
+    rollup = subparsers.add_parser('rollup', help='Write daily stats rollups (schedule at end of day)')
+    rollup.add_argument('--date', help='Day to write from the live tables (YYYY-MM-DD, default today)')
+    rollup.add_argument('--backfill-from', help='Also reconstruct missing days since this date from the audit log')
+    rollup.set_defaults(func=run_rollup)
+    
+    archive = subparsers.add_parser('archive', help='Move audit entries past retention to archive files')
+    archive.add_argument('--retention-days', type=int, help='Override AUDIT_RETENTION_DAYS')
+    archive.add_argument('--batch-size', type=int, help='Override AUDIT_ARCHIVE_BATCH_SIZE')
+    archive.set_defaults(func=run_archive)
+    
+    snapshot = subparsers.add_parser('snapshot', help='Snapshot asset state for point-in-time queries')
+    snapshot.add_argument('--every', type=int, help='Override SNAPSHOT_EVERY')
+    snapshot.set_defaults(func=run_snapshot)
+    
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error running {args.job} job: {str(e)}", file=sys.stderr)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,79 @@
 #!/usr/bin/env python3
 """Migrate data from old database to new schema."""
+import argparse
+import hashlib
+import multiprocessing
 import os
+import queue
 import sys
+import time
 import pyodbc
+from collections import Counter, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, create_engine, func, insert, select, update
 from src.app import create_app, db
 from src.models.inventory import Inventory
 from src.models.location import Location
 from src.models.audit import AuditLog
+from src.models.migration import MigrationState, encode_key
+
+# Rows fetched from the legacy database and inserted per round trip
+BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+INVENTORY_DATE_FIELDS = ('date_assigned', 'date_decommissioned', 'purchase_date', 'warranty_expiry')
+# changed_at of legacy audit rows without a (valid) timestamp; fixed so reruns and verify map them alike
+UNDATED_AUDIT = datetime(1900, 1, 1)
+# Key ranges per worker in parallel mode; more than one evens out skewed ranges
+PARTITIONS_PER_WORKER = 4
+# Key range chunks compared by the verify command
+VERIFY_CHUNKS = 16
+# Differing keys printed per stage by the verify command
+VERIFY_MAX_KEYS = 50
+# Legacy keys per IN list when verify reads a chunk's new rows (below SQL Server's 2100 parameters)
+VERIFY_KEY_BATCH = 1000
+
+# Per-process state of a parallel migration worker
+_worker = {}
+
+# One key range of a stage to copy: MigrationState id, (low, high) and the last copied key
+Checkpoint = namedtuple('Checkpoint', 'id key_range high_water')
+
+class StageProgress:
+    """Row count and throughput reporting for one migration stage."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.count = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def add(self, count):
+        """Record a written batch."""
+        self.count += count
+        print(f"Processed {self.count} {self.stage} ({self.rate:.0f} rows/s)...")
+
+    def done(self):
+        """Print the stage summary."""
+        elapsed = time.perf_counter() - self.started
+        print(f"Migrated {self.count} {self.stage} in {elapsed:.1f}s ({self.rate:.0f} rows/s)")
+
+class QueuedProgress:
+    """Worker-side progress that forwards batch counts to the parent's ``StageProgress``."""
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.count = 0
+
+    def add(self, count):
+        self.count += count
+        self.updates.put(count)
+
+    def done(self):
+        pass
 
 def get_old_db_connection():
     """Get connection to old database."""
@@ -17,9 +82,185 @@ def get_old_db_connection():
         raise ValueError("OLD_DATABASE_URL environment variable not set")
     return pyodbc.connect(connection_string)
 
-def migrate_locations(old_conn, new_session):
-    """Migrate location data."""
+def get_new_db_engine():
+    """Get the engine for bulk writes to the new database.
+    
+    SQL Server targets get pyodbc's ``fast_executemany``, which sends each
+    multi-row insert as one parameter array instead of a round trip per row.
+    """
+    engine = db.engine
+    if engine.dialect.name == 'mssql' and engine.dialect.driver == 'pyodbc':
+        return create_engine(engine.url, fast_executemany=True)
+    return engine
+
+def fetch_batches(cursor, size=BATCH_SIZE):
+    """Yield the rows of an executed legacy cursor in batches of ``size``."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield rows
+
+def partition_ranges(old_conn, table, key, parts, after=None):
+    """Split a legacy table into about ``parts`` contiguous key ranges of similar row counts.
+    
+    Ranges are ``(low, high)`` with ``low <= key < high``; None is unbounded,
+    and the first range also takes rows whose key is NULL. With ``after``,
+    only rows whose key is greater are split.
+    """
+    if parts <= 1:
+        return [(None, None)]
+    cursor = old_conn.cursor()
+    cursor.execute(f"""
+        SELECT MIN(part_key)
+        FROM (
+            SELECT {key} AS part_key, NTILE({int(parts)}) OVER (ORDER BY {key}) AS part
+            FROM {table}
+            WHERE {key} IS NOT NULL{f" AND {key} > ?" if after is not None else ""}
+        ) tiles
+        GROUP BY part
+    """, *([after] if after is not None else []))
+    # Equal keys can span tiles, so only distinct lower bounds become edges
+    bounds = sorted({row[0] for row in cursor.fetchall()})[1:]
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+def legacy_rows(old_conn, table, key, partition=None, after=None):
+    """Execute an ordered scan of a legacy table, optionally limited to one key range.
+    
+    With ``after``, the scan continues past that key (NULL keys excluded).
+    """
+    conditions, params = [], []
+    if partition:
+        low, high = partition
+        if low is None and high is not None:
+            conditions.append(f"({key} < ? OR {key} IS NULL)")
+            params.append(high)
+        elif low is not None:
+            conditions.append(f"{key} >= ?")
+            params.append(low)
+            if high is not None:
+                conditions.append(f"{key} < ?")
+                params.append(high)
+    if after is not None:
+        conditions.append(f"{key} > ?")
+        params.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = old_conn.cursor()
+    cursor.execute(f"""
+        SELECT *
+        FROM {table}
+        {where}
+        ORDER BY {key}
+    """, *params)
+    return cursor
+
+def copy_rows(cursor, engine, table, convert, progress, key=None, checkpoint=None, upsert_key=None):
+    """Stream a legacy result set into ``table`` one multi-row write per batch.
+    
+    ``convert`` maps a legacy row dict to the insert values, or None to skip
+    the row. Only one batch is held in memory at a time. With a
+    ``checkpoint``, batches end on a change of the legacy ``key`` and each
+    moves the checkpoint's high-water mark in the same transaction. With
+    ``upsert_key``, rows are upserted on that target column instead of
+    inserted, so copying a row twice is harmless.
+    """
+    columns = [column[0] for column in cursor.description]
+    carry = []
+    for batch in fetch_batches(cursor):
+        rows = carry + [dict(zip(columns, row)) for row in batch]
+        carry = []
+        if checkpoint is not None:
+            # Hold back the rows sharing the last key; a resume restarts after a whole key
+            cut = len(rows)
+            while cut and rows[cut - 1][key] == rows[-1][key]:
+                cut -= 1
+            if cut:
+                rows, carry = rows[:cut], rows[cut:]
+            else:
+                carry, rows = rows, []
+        if rows:
+            _write_batch(engine, table, rows, convert, progress, key, checkpoint, upsert_key)
+    if carry:
+        _write_batch(engine, table, carry, convert, progress, key, checkpoint, upsert_key)
+    progress.done()
+    return progress.count
+
+def _write_batch(engine, table, rows, convert, progress, key, checkpoint, upsert_key):
+    values = [value for value in (convert(row) for row in rows) if value is not None]
+    with engine.begin() as conn:
+        if values and upsert_key:
+            upsert_rows(conn, table, values, upsert_key)
+        elif values:
+            conn.execute(insert(table), values)
+        if checkpoint is not None:
+            conn.execute(
+                update(MigrationState.__table__)
+                .where(MigrationState.__table__.c.id == checkpoint.id)
+                .values(high_water=encode_key(rows[-1][key]),
+                        rows_copied=MigrationState.__table__.c.rows_copied + len(values))
+            )
+    progress.add(len(values))
+
+def upsert_rows(conn, table, rows, key):
+    """Insert new rows and update changed ones, matching on the ``key`` column.
+    
+    Rows identical to the stored ones are left alone, so a delta sync only
+    writes what changed. Returns ``(inserted, updated)``.
+    """
+    by_key = {row[key]: row for row in rows}
+    columns = list(rows[0])
+    existing = {}
+    keys = list(by_key)
+    # Chunked to stay under SQL Server's 2100 parameter limit
+    for start in range(0, len(keys), 1000):
+        query = select(*[table.c[column] for column in columns]).where(table.c[key].in_(keys[start:start + 1000]))
+        existing.update((row[key], row) for row in conn.execute(query).mappings())
+
+    new = [row for row_key, row in by_key.items() if row_key not in existing]
+    changed = [
+        {f'b_{column}': value for column, value in row.items()}
+        for row_key, row in by_key.items()
+        if row_key in existing and any(existing[row_key][column] != row[column] for column in columns)
+    ]
+    if new:
+        conn.execute(insert(table), new)
+    if changed:
+        values = {column: bindparam(f'b_{column}') for column in columns if column != key}
+        if 'version_id' in table.c:
+            # Keep ETags handed out before the sync from matching
+            values['version_id'] = table.c.version_id + 1
+        conn.execute(update(table).where(table.c[key] == bindparam(f'b_{key}')).values(values), changed)
+    return len(new), len(changed)
+
+def _strip(value):
+    return value.strip() if value else None
+
+def _parse_datetime(value, fmt):
+    """Parse a legacy date string (or pass a driver datetime through); None when invalid."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(value, fmt) if value else None
+    except (ValueError, TypeError):
+        return None
+
+def location_key(site_name, room_number):
+    """Normalized ``site|room`` key of ``location_map``, or None when either part is blank."""
+    site_name = site_name.strip() if site_name else None
+    room_number = room_number.strip() if room_number else None
+    if not site_name or not room_number:
+        return None
+    return f"{site_name}|{room_number}"
+
+def migrate_locations(old_conn, engine):
+    """Migrate location data and return the ``site|room`` -> location id map.
+    
+    Rooms are deduplicated in memory, the missing ones are written with
+    multi-row inserts and the map is read back with a single query.
+    """
     print("Migrating locations...")
+    progress = StageProgress('locations')
     
     # Get unique locations from old database
     cursor = old_conn.cursor()
@@ -36,139 +277,394 @@ def migrate_locations(old_conn, new_session):
           AND room_number IS NOT NULL
     """)
     
-    location_map = {}  # Map old location info to new IDs
-    count = 0
+    rooms = {}
+    for batch in fetch_batches(cursor):
+        for row in batch:
+            key = location_key(row.site_name, row.room_number)
+            # Rows differing only in room details are one location; the first wins
+            if key is None or key in rooms:
+                continue
+            site_name, room_number = key.split('|', 1)
+            rooms[key] = {
+                'site_name': site_name,
+                'room_number': room_number,
+                'room_name': row.room_name.strip() if row.room_name else room_number,
+                'room_type': row.room_type.strip() if row.room_type else 'Office',
+                'floor': row.floor.strip() if row.floor else None,
+                'building': row.building.strip() if row.building else None
+            }
     
-    for row in cursor.fetchall():
-        site_name = row.site_name.strip() if row.site_name else None
-        room_number = row.room_number.strip() if row.room_number else None
-        
-        if not site_name or not room_number:
-            continue
-            
-        # Create new location
-        location = Location(
-            site_name=site_name,
-            room_number=room_number,
-            room_name=row.room_name.strip() if row.room_name else room_number,
-            room_type=row.room_type.strip() if row.room_type else 'Office',
-            floor=row.floor.strip() if row.floor else None,
-            building=row.building.strip() if row.building else None
-        )
-        new_session.add(location)
-        new_session.flush()  # Get ID without committing
-        
-        # Store mapping
-        location_map[f"{site_name}|{room_number}"] = location.id
-        count += 1
-        
-        if count % 100 == 0:
-            print(f"Processed {count} locations...")
+    table = Location.__table__
+    with engine.begin() as conn:
+        # Locations from a previous run are kept, so reruns are idempotent
+        existing = {
+            location_key(site_name, room_number)
+            for site_name, room_number in conn.execute(select(table.c.site_name, table.c.room_number))
+        }
+        missing = [values for key, values in rooms.items() if key not in existing]
+        for start in range(0, len(missing), BATCH_SIZE):
+            conn.execute(insert(table), missing[start:start + BATCH_SIZE])
+            progress.add(len(missing[start:start + BATCH_SIZE]))
+        location_map = load_location_map(conn)
     
-    new_session.commit()
-    print(f"Migrated {count} locations")
+    progress.done()
     return location_map
 
-def migrate_inventory(old_conn, new_session, location_map):
-    """Migrate inventory data."""
-    print("Migrating inventory items...")
-    
-    cursor = old_conn.cursor()
-    cursor.execute("""
-        SELECT *
-        FROM formatted_company_inventory
-        ORDER BY asset_tag
-    """)
+def load_location_map(conn):
+    """Read the ``site|room`` -> location id map from the new database in one query."""
+    table = Location.__table__
+    return {
+        location_key(site_name, room_number): id
+        for id, site_name, room_number in conn.execute(select(table.c.id, table.c.site_name, table.c.room_number))
+    }
+
+def inventory_values(data, location_map):
+    """Map a legacy inventory row to insert values for the new schema."""
+    # Get location ID from mapping
+    location_id = location_map.get(location_key(data.get('site_name'), data.get('room_number')))
     
-    columns = [column[0] for column in cursor.description]
-    count = 0
+    values = {
+        'asset_tag': data['asset_tag'].strip(),
+        'asset_type': data['asset_type'].strip() if data['asset_type'] else 'Unknown',
+        'manufacturer': _strip(data['manufacturer']),
+        'model': _strip(data['model']),
+        'serial_number': _strip(data['serial_number']),
+        'status': data['status'].strip() if data['status'] else 'active',
+        'assigned_to': _strip(data['assigned_to']),
+        'location_id': location_id,
+        'is_loaner': bool(data.get('is_loaner')),
+        'notes': _strip(data.get('notes'))
+    }
+    for date_field in INVENTORY_DATE_FIELDS:
+        values[date_field] = _parse_datetime(data.get(date_field), '%Y-%m-%d')
+    return values
+
+def audit_values(data):
+    """Map a legacy audit row to insert values for the new schema."""
+    return {
+        'action_type': data['action_type'].strip(),
+        'field_name': data['field_name'].strip(),
+        'changed_by': data['changed_by'].strip(),
+        'old_value': _strip(data['old_value']),
+        'new_value': _strip(data['new_value']),
+        'asset_tag': _strip(data.get('asset_tag')),
+        'location_id': data.get('location_id'),
+        'changed_at': _parse_datetime(data['changed_at'], '%Y-%m-%d %H:%M:%S') or UNDATED_AUDIT,
+        'ip_address': data.get('ip_address'),
+        'user_agent': data.get('user_agent')
+    }
+
+def migrate_inventory(old_conn, engine, location_map, checkpoint=None, progress=None):
+    """Migrate inventory data, optionally one checkpointed asset_tag range."""
+    key_range, after = (checkpoint.key_range, checkpoint.high_water) if checkpoint else (None, None)
+    cursor = legacy_rows(old_conn, 'formatted_company_inventory', 'asset_tag', key_range, after)
+    return copy_rows(
+        cursor, engine, Inventory.__table__,
+        lambda data: inventory_values(data, location_map),
+        progress or StageProgress('inventory items'),
+        key='asset_tag', checkpoint=checkpoint, upsert_key='asset_tag'
+    )
+
+def migrate_audit_log(old_conn, engine, checkpoint=None, progress=None):
+    """Migrate audit log data, optionally one checkpointed changed_at range."""
+    key_range, after = (checkpoint.key_range, checkpoint.high_water) if checkpoint else (None, None)
+    cursor = legacy_rows(old_conn, 'audit_log', 'changed_at', key_range, after)
+    return copy_rows(
+        cursor, engine, AuditLog.__table__, audit_values,
+        progress or StageProgress('audit log entries'),
+        key='changed_at', checkpoint=checkpoint
+    )
+
+# Checkpointed stages: name -> (legacy table, key, progress label, append-only).
+# Append-only stages sync deltas past their high-water mark; the others are
+# rescanned and upserted, since legacy rows change in place.
+STAGES = {
+    'inventory': ('formatted_company_inventory', 'asset_tag', 'inventory items', False),
+    'audit': ('audit_log', 'changed_at', 'audit log entries', True)
+}
+
+def plan_stage(old_conn, stage, parts, resume=False, incremental=False):
+    """Get the checkpoints still to copy for a stage, recording new ones as needed.
     
-    for row in cursor.fetchall():
-        data = dict(zip(columns, row))
-        
-        # Get location ID from mapping
-        location_id = None
-        if data.get('site_name') and data.get('room_number'):
-            location_key = f"{data['site_name'].strip()}|{data['room_number'].strip()}"
-            location_id = location_map.get(location_key)
-        
-        # Create new inventory item
-        item = Inventory(
-            asset_tag=data['asset_tag'].strip(),
-            asset_type=data['asset_type'].strip() if data['asset_type'] else 'Unknown',
-            manufacturer=data['manufacturer'].strip() if data['manufacturer'] else None,
-            model=data['model'].strip() if data['model'] else None,
-            serial_number=data['serial_number'].strip() if data['serial_number'] else None,
-            status=data['status'].strip() if data['status'] else 'active',
-            assigned_to=data['assigned_to'].strip() if data['assigned_to'] else None,
-            location_id=location_id,
-            is_loaner=bool(data.get('is_loaner')),
-            notes=data['notes'].strip() if data.get('notes') else None
+    ``resume`` continues the unfinished ranges of the last run. ``incremental``
+    starts a new run once the last one has finished; an append-only stage
+    only covers keys past its high-water mark. A plain run refuses to start
+    over recorded state, which would duplicate the append-only rows.
+    """
+    table, key, _, append_only = STAGES[stage]
+    states = MigrationState.query.filter_by(stage=stage).order_by(MigrationState.id).all()
+    if states and resume:
+        return [Checkpoint(state.id, state.key_range, state.get_high_water())
+                for state in states if state.finished_at is None]
+    if states and not incremental:
+        raise ValueError(f"Migration state exists for {stage}; rerun with --resume or --incremental")
+    if any(state.finished_at is None for state in states):
+        # Starting past the highest mark would skip the rest of the unfinished ranges
+        raise ValueError(f"The last {stage} run did not finish; rerun with --resume before --incremental")
+
+    after = None
+    if append_only:
+        marks = [state.get_high_water() for state in states if state.high_water is not None]
+        after = max(marks) if marks else None
+    for state in states:
+        db.session.delete(state)
+    db.session.flush()
+    new_states = [
+        MigrationState(stage=stage, range_start=encode_key(low), range_end=encode_key(high),
+                       high_water=encode_key(after) if after is not None else None)
+        for low, high in partition_ranges(old_conn, table, key, parts, after)
+    ]
+    db.session.add_all(new_states)
+    db.session.commit()
+    return [Checkpoint(state.id, state.key_range, after) for state in new_states]
+
+def run_checkpoint(stage, checkpoint, old_conn, engine, location_map, progress):
+    """Copy one checkpointed range of a stage and mark it finished; returns the row count."""
+    if stage == 'inventory':
+        count = migrate_inventory(old_conn, engine, location_map, checkpoint, progress)
+    else:
+        count = migrate_audit_log(old_conn, engine, checkpoint, progress)
+    with engine.begin() as conn:
+        conn.execute(
+            update(MigrationState.__table__)
+            .where(MigrationState.__table__.c.id == checkpoint.id)
+            .values(finished_at=datetime.utcnow())
         )
-        
-        # Handle dates
-        for date_field in ['date_assigned', 'date_decommissioned', 'purchase_date', 'warranty_expiry']:
-            if data.get(date_field):
-                try:
-                    setattr(item, date_field, datetime.strptime(data[date_field], '%Y-%m-%d'))
-                except (ValueError, TypeError):
-                    pass
-        
-        new_session.add(item)
-        count += 1
-        
-        if count % 100 == 0:
-            print(f"Processed {count} items...")
-            new_session.commit()  # Commit in batches
+    return count
+
+def migrate_stages(old_conn, engine, location_map, workers=1, resume=False, incremental=False):
+    """Migrate the inventory and audit stages, serially or as key ranges across a process pool.
     
-    new_session.commit()
-    print(f"Migrated {count} inventory items")
+    In parallel mode each worker opens its own legacy and target connections;
+    ``location_map`` is built beforehand and handed to every worker once,
+    read-only.
+    """
+    pool = updates = None
+    if workers > 1:
+        updates = multiprocessing.Queue()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(location_map, updates))
+    try:
+        for stage, (_, _, label, _) in STAGES.items():
+            checkpoints = plan_stage(old_conn, stage, workers * PARTITIONS_PER_WORKER if pool else 1,
+                                     resume, incremental)
+            if not checkpoints:
+                print(f"Skipping {label}: already migrated")
+                continue
+            progress = StageProgress(label)
+            if pool:
+                print(f"Migrating {label} ({len(checkpoints)} ranges, {workers} workers)...")
+                futures = [pool.submit(_migrate_partition, stage, checkpoint) for checkpoint in checkpoints]
+                _wait_for_partitions(futures, updates, progress)
+            else:
+                print(f"Migrating {label}...")
+                for checkpoint in checkpoints:
+                    run_checkpoint(stage, checkpoint, old_conn, engine, location_map, progress)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+# Verified stages: name -> (legacy table, normalized legacy key, new table, new key column, label)
+VERIFY_STAGES = {
+    'inventory': ('formatted_company_inventory', 'LTRIM(RTRIM(asset_tag))', Inventory.__table__, 'asset_tag',
+                  'inventory items'),
+    'audit': ('audit_log', 'changed_at', AuditLog.__table__, 'changed_at', 'audit log entries')
+}
 
-def migrate_audit_log(old_conn, new_session):
-    """Migrate audit log data."""
-    print("Migrating audit log...")
+def verify(old_conn, engine, workers=1, chunks=VERIFY_CHUNKS):
+    """Compare the legacy and new databases chunk by chunk; returns the number of differing keys.
     
-    cursor = old_conn.cursor()
-    cursor.execute("""
-        SELECT *
-        FROM audit_log
-        ORDER BY changed_at
-    """)
+    Each key range chunk is reduced on both sides to a row count and an
+    order-independent hash of the normalized columns (rows mapped as the
+    migration maps them). Only chunks whose summaries differ are compared
+    key by key. New rows whose keys are not in the legacy table at all are
+    counted separately.
+    """
+    with engine.connect() as conn:
+        location_map = load_location_map(conn)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(location_map, None))
+    differing = 0
+    try:
+        for stage, (table, key, new_table, _, label) in VERIFY_STAGES.items():
+            print(f"Verifying {label}...")
+            ranges = partition_ranges(old_conn, table, key, chunks)
+            if pool:
+                results = list(pool.map(_verify_partition, [stage] * len(ranges), ranges))
+            else:
+                results = [verify_chunk(stage, key_range, old_conn, engine, location_map) for key_range in ranges]
+            
+            legacy_rows_total = sum(result['legacy_rows'] for result in results)
+            new_rows_total = sum(result['new_rows'] for result in results)
+            with engine.connect() as conn:
+                unmatched = conn.scalar(select(func.count()).select_from(new_table)) - new_rows_total
+            keys = [key for result in results for key in result['differing_keys']]
+            mismatched = sum(1 for result in results if result['differing_keys'])
+            print(f"{label}: {legacy_rows_total} legacy rows, {new_rows_total + unmatched} new rows, "
+                  f"{mismatched} of {len(results)} chunks differ")
+            for key, legacy_count, new_count in keys[:VERIFY_MAX_KEYS]:
+                print(f"  {key}: {legacy_count} legacy-only, {new_count} new-only rows")
+            if len(keys) > VERIFY_MAX_KEYS:
+                print(f"  ... and {len(keys) - VERIFY_MAX_KEYS} more keys")
+            if unmatched:
+                print(f"  {unmatched} new rows have no legacy key")
+            differing += len(keys) + unmatched
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return differing
+
+def verify_chunk(stage, key_range, old_conn, engine, location_map):
+    """Summarize one chunk on both sides and, on a mismatch, find the differing keys.
     
-    columns = [column[0] for column in cursor.description]
-    count = 0
+    Differing keys are ``(key, legacy rows, new rows)`` counting the rows of
+    each side that have no identical counterpart on the other.
     
-    for row in cursor.fetchall():
-        data = dict(zip(columns, row))
-        
-        entry = AuditLog(
-            action_type=data['action_type'].strip(),
-            field_name=data['field_name'].strip(),
-            changed_by=data['changed_by'].strip(),
-            old_value=data['old_value'].strip() if data['old_value'] else None,
-            new_value=data['new_value'].strip() if data['new_value'] else None,
-            asset_tag=data['asset_tag'].strip() if data.get('asset_tag') else None,
-            location_id=data.get('location_id'),
-            changed_at=datetime.strptime(data['changed_at'], '%Y-%m-%d %H:%M:%S')
-                if data['changed_at'] else datetime.utcnow(),
-            ip_address=data.get('ip_address'),
-            user_agent=data.get('user_agent')
-        )
-        
-        new_session.add(entry)
-        count += 1
-        
-        if count % 1000 == 0:
-            print(f"Processed {count} audit entries...")
-            new_session.commit()  # Commit in batches
+    The chunk's new rows are selected by the exact keys of its legacy rows:
+    range bounds would compare under each database's own collation, and a
+    case-insensitive legacy ordering does not match a binary one.
+    """
+    keys = set()
+    legacy_count, legacy_hash = _summarize(_legacy_digests(stage, key_range, old_conn, location_map), keys)
+    new_count, new_hash = _summarize(_new_digests(stage, keys, engine))
+    result = {'legacy_rows': legacy_count, 'new_rows': new_count, 'differing_keys': []}
+    if (legacy_count, legacy_hash) == (new_count, new_hash):
+        return result
     
-    new_session.commit()
-    print(f"Migrated {count} audit log entries")
+    legacy = Counter(_legacy_digests(stage, key_range, old_conn, location_map))
+    new = Counter(_new_digests(stage, keys, engine))
+    missing, extra = Counter(), Counter()
+    for (key, _), count in (legacy - new).items():
+        missing[key] += count
+    for (key, _), count in (new - legacy).items():
+        extra[key] += count
+    result['differing_keys'] = [(key, missing[key], extra[key])
+                                for key in sorted(set(missing) | set(extra), key=str)]
+    return result
+
+def _legacy_digests(stage, key_range, old_conn, location_map):
+    """Yield (key, row digest) for the legacy rows of a chunk, normalized as migrated."""
+    table, key, new_table, key_column, _ = VERIFY_STAGES[stage]
+    columns = [column.key for column in _verified_columns(new_table)]
+    cursor = legacy_rows(old_conn, table, key, key_range)
+    names = [column[0] for column in cursor.description]
+    for batch in fetch_batches(cursor):
+        for row in batch:
+            data = dict(zip(names, row))
+            values = inventory_values(data, location_map) if stage == 'inventory' else audit_values(data)
+            yield values[key_column], _digest(values, columns)
+
+def _new_digests(stage, keys, engine):
+    """Yield (key, row digest) for the new database's rows with the given (mapped) keys."""
+    _, _, table, key_column, _ = VERIFY_STAGES[stage]
+    columns = _verified_columns(table)
+    key = table.c[key_column]
+    values = sorted((value for value in keys if value is not None), key=str)
+    queries = [select(*columns).where(key.in_(values[start:start + VERIFY_KEY_BATCH]))
+               for start in range(0, len(values), VERIFY_KEY_BATCH)]
+    if None in keys:
+        queries.append(select(*columns).where(key.is_(None)))
+    with engine.connect() as conn:
+        for query in queries:
+            result = conn.execution_options(stream_results=True).execute(query)
+            for rows in result.mappings().partitions(BATCH_SIZE):
+                for row in rows:
+                    yield row[key_column], _digest(row, [column.key for column in columns])
+
+def _verified_columns(table):
+    """Columns the migration writes (everything but generated ids, timestamps and row versions)."""
+    # Legacy rows have no version, and incremental syncs bump it
+    skipped = {'id', 'created_at', 'updated_at', 'version_id', 'current_checkout_id'}
+    return [column for column in table.columns if column.key not in skipped]
+
+def _digest(values, columns):
+    """64-bit hash of a row's normalized column values."""
+    parts = []
+    for column in columns:
+        value = values[column]
+        if value is None:
+            parts.append('\0')
+        elif isinstance(value, bool):
+            parts.append(str(int(value)))
+        elif isinstance(value, datetime):
+            parts.append(value.isoformat())
+        else:
+            parts.append(str(value))
+    return int.from_bytes(hashlib.blake2b('\x1f'.join(parts).encode(), digest_size=8).digest(), 'big')
 
-def main():
+def _summarize(digests, keys=None):
+    """Row count and order-independent sum of row digests, adding the keys seen to ``keys``."""
+    count = total = 0
+    for key, digest in digests:
+        if keys is not None:
+            keys.add(key)
+        count += 1
+        total = (total + digest) % 2 ** 64
+    return count, total
+
+def _verify_partition(stage, key_range):
+    return verify_chunk(stage, key_range, _worker['old_conn'], _worker['engine'], _worker['location_map'])
+
+def _init_worker(location_map, updates):
+    app = create_app()
+    context = app.app_context()
+    context.push()
+    _worker.update(
+        context=context,
+        old_conn=get_old_db_connection(),
+        engine=get_new_db_engine(),
+        location_map=location_map,
+        updates=updates
+    )
+
+def _migrate_partition(stage, checkpoint):
+    """Copy one checkpointed range of a stage inside a worker; returns the row count."""
+    return run_checkpoint(stage, checkpoint, _worker['old_conn'], _worker['engine'], _worker['location_map'],
+                          QueuedProgress(_worker['updates']))
+
+def _wait_for_partitions(futures, updates, progress):
+    """Merge worker progress until every range is done; re-raises the first worker error."""
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+            _drain(updates, progress)
+    except Exception:
+        for future in pending:
+            future.cancel()
+        raise
+    _drain(updates, progress)
+    # Late queue messages would skew the total, so use the workers' own counts
+    progress.count = sum(future.result() for future in futures)
+    progress.done()
+
+def _drain(updates, progress):
+    while True:
+        try:
+            progress.add(updates.get_nowait())
+        except queue.Empty:
+            return
+
+def main(argv=None):
     """Main migration function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('command', nargs='?', default='migrate', choices=['migrate', 'verify'],
+                        help='Migrate the data (default) or verify a finished migration')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for the inventory and audit stages (default 1: serial)')
+    parser.add_argument('--chunks', type=int, default=VERIFY_CHUNKS,
+                        help='Key range chunks compared by verify')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--resume', action='store_true',
+                      help='Continue an interrupted run from its checkpoints')
+    mode.add_argument('--incremental', action='store_true',
+                      help='Sync changes since the last run (e.g. nightly)')
+    args = parser.parse_args(argv)
+    
     try:
-        print("Starting data migration...")
+        print("Verifying data migration..." if args.command == 'verify' else "Starting data migration...")
         
         # Create Flask app context
         app = create_app()
@@ -176,14 +672,26 @@ def main():
         with app.app_context():
             # Connect to old database
             old_conn = get_old_db_connection()
+            engine = get_new_db_engine()
+            
+            if args.command == 'verify':
+                try:
+                    differing = verify(old_conn, engine, args.workers, args.chunks)
+                    print("Verification passed!" if not differing else f"Verification found {differing} differing keys")
+                    return 1 if differing else 0
+                except Exception as e:
+                    print(f"Error during verification: {str(e)}", file=sys.stderr)
+                    return 1
+                finally:
+                    old_conn.close()
+                    if engine is not db.engine:
+                        engine.dispose()
             
             # Start migration
-            db.session.execute(text('BEGIN'))
             try:
                 # Migrate in order: locations -> inventory -> audit
-                location_map = migrate_locations(old_conn, db.session)
-                migrate_inventory(old_conn, db.session, location_map)
-                migrate_audit_log(old_conn, db.session)
+                location_map = migrate_locations(old_conn, engine)
+                migrate_stages(old_conn, engine, location_map, args.workers, args.resume, args.incremental)
                 
                 print("Migration completed successfully!")
                 return 0
@@ -195,6 +703,8 @@ def main():
             
             finally:
                 old_conn.close()
+                if engine is not db.engine:
+                    engine.dispose()
                 
     except Exception as e:
         print(f"Error setting up migration: {str(e)}", file=sys.stderr)
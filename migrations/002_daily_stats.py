@@ -0,0 +1,36 @@
+"""Add daily stats rollups
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create daily_stats table
+    op.create_table('daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('asset_type', sa.String(length=50), nullable=False),
+        sa.Column('site_name', sa.String(length=100), nullable=False),
+        sa.Column('asset_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('decommissioned_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'status', 'asset_type', 'site_name', name='uix_daily_stats_bucket')
+    )
+    op.create_index('ix_daily_stats_day', 'daily_stats', ['day'])
+
+def downgrade():
+    op.drop_index('ix_daily_stats_day', table_name='daily_stats')
+    op.drop_table('daily_stats')
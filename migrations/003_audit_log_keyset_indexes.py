@@ -0,0 +1,35 @@
+"""Add composite audit log indexes for keyset pagination
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Composite indexes ending in (changed_at, id) replace the single-column ones
+    op.create_index('ix_audit_log_changed_at_id', 'audit_log', ['changed_at', 'id'])
+    op.create_index('ix_audit_log_asset_tag_changed_at', 'audit_log', ['asset_tag', 'changed_at', 'id'])
+    op.create_index('ix_audit_log_changed_by_changed_at', 'audit_log', ['changed_by', 'changed_at', 'id'])
+    op.create_index('ix_audit_log_location_id_changed_at', 'audit_log', ['location_id', 'changed_at', 'id'])
+    op.create_index('ix_audit_log_action_type_changed_at', 'audit_log', ['action_type', 'changed_at', 'id'])
+    op.drop_index('ix_audit_log_asset_tag', table_name='audit_log')
+    op.drop_index('ix_audit_log_location_id', table_name='audit_log')
+    op.drop_index('ix_audit_log_changed_at', table_name='audit_log')
+
+def downgrade():
+    op.create_index('ix_audit_log_asset_tag', 'audit_log', ['asset_tag'])
+    op.create_index('ix_audit_log_location_id', 'audit_log', ['location_id'])
+    op.create_index('ix_audit_log_changed_at', 'audit_log', ['changed_at'])
+    op.drop_index('ix_audit_log_action_type_changed_at', table_name='audit_log')
+    op.drop_index('ix_audit_log_location_id_changed_at', table_name='audit_log')
+    op.drop_index('ix_audit_log_changed_by_changed_at', table_name='audit_log')
+    op.drop_index('ix_audit_log_asset_tag_changed_at', table_name='audit_log')
+    op.drop_index('ix_audit_log_changed_at_id', table_name='audit_log')
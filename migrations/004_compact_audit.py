@@ -0,0 +1,56 @@
+"""Add compact audit change sets and dictionary tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create dictionary tables
+    op.create_table('audit_users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table('audit_user_agents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_agent', sa.String(length=200), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_agent')
+    )
+    
+    # Create audit_changes table
+    op.create_table('audit_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('action_type', sa.String(length=20), nullable=False),
+        sa.Column('asset_tag', sa.String(length=50)),
+        sa.Column('location_id', sa.Integer()),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('user_agent_id', sa.Integer()),
+        sa.Column('ip_address', sa.String(length=45)),
+        sa.Column('changes', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['audit_users.id']),
+        sa.ForeignKeyConstraint(['user_agent_id'], ['audit_user_agents.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_changes_changed_at_id', 'audit_changes', ['changed_at', 'id'])
+    op.create_index('ix_audit_changes_asset_tag_changed_at', 'audit_changes', ['asset_tag', 'changed_at', 'id'])
+    op.create_index('ix_audit_changes_user_id_changed_at', 'audit_changes', ['user_id', 'changed_at', 'id'])
+    op.create_index('ix_audit_changes_location_id_changed_at', 'audit_changes', ['location_id', 'changed_at', 'id'])
+    op.create_index('ix_audit_changes_action_type_changed_at', 'audit_changes', ['action_type', 'changed_at', 'id'])
+
+def downgrade():
+    op.drop_table('audit_changes')
+    op.drop_table('audit_user_agents')
+    op.drop_table('audit_users')
@@ -0,0 +1,32 @@
+"""Add asset state snapshots
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create asset_snapshots table
+    op.create_table('asset_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('asset_tag', sa.String(length=50), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.Column('state', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_asset_snapshots_asset_tag_taken_at', 'asset_snapshots', ['asset_tag', 'taken_at'])
+
+def downgrade():
+    op.drop_index('ix_asset_snapshots_asset_tag_taken_at', table_name='asset_snapshots')
+    op.drop_table('asset_snapshots')
@@ -0,0 +1,34 @@
+"""Add legacy migration state
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create migration_state table
+    op.create_table('migration_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stage', sa.String(length=50), nullable=False),
+        sa.Column('range_start', sa.String(length=200), nullable=False),
+        sa.Column('range_end', sa.String(length=200), nullable=False),
+        sa.Column('high_water', sa.String(length=200), nullable=True),
+        sa.Column('rows_copied', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stage', 'range_start', name='uix_migration_state_range')
+    )
+
+def downgrade():
+    op.drop_table('migration_state')
@@ -0,0 +1,27 @@
+"""Add row versions for optimistic concurrency
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# Tables of the models using VersionedMixin
+TABLES = ('location', 'inventory')
+
+def upgrade():
+    # Existing rows start at version 1
+    for table in TABLES:
+        op.add_column(table, sa.Column('version_id', sa.Integer(), nullable=False, server_default='1'))
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_column(table, 'version_id')
@@ -4,7 +4,6 @@ import os
 import sys
 import multiprocessing
 import gunicorn.app.base
-from src.app import create_app
 
 class StandaloneApplication(gunicorn.app.base.BaseApplication):
     """Gunicorn application for production deployment."""
@@ -31,9 +30,80 @@ def get_workers():
     # We'll use 3x as a middle ground
     return cores * 3
 
+def get_options(**overrides):
+    """Build gunicorn options; keyword arguments override the defaults."""
+    options = {
+        'bind': '0.0.0.0:8000',
+        'workers': get_workers(),
+        'worker_class': 'sync',
+        'threads': 4,
+        'timeout': 120,
+        'keepalive': 5,
+        'max_requests': 1000,
+        'max_requests_jitter': 50,
+        'accesslog': 'logs/access.log',
+        'errorlog': 'logs/error.log',
+        'loglevel': 'info',
+        'capture_output': True,
+        'enable_stdio_inheritance': True,
+        'preload_app': True,
+        'worker_tmp_dir': '/dev/shm'  # Use RAM for temp files
+    }
+    options.update(overrides)
+    return options
+
+def pool_settings(options):
+    """Size each worker's connection pool to its thread layout.
+
+    Every worker process has its own pool, so the pool only needs one
+    connection per thread plus a little headroom; the database sees at most
+    workers x (pool size + overflow) connections.
+    """
+    threads = options.get('threads') or 1
+    return {
+        'DB_POOL_SIZE': threads,
+        'DB_MAX_OVERFLOW': max(1, threads // 2)
+    }
+
+def lifecycle_hooks(app):
+    """Gunicorn server hooks managing database connections across forks and recycles."""
+    from src.utils.audit import flush_audit_writer
+    from src.utils.cache import warm_up
+    from src.utils.db import dispose_engines, pool_status
+
+    def post_fork(server, worker):
+        # Never reuse sockets inherited from the preloading master
+        dispose_engines(app, close=False)
+        worker.log.info(f'Worker {worker.pid} pools after fork: {pool_status(app)}')
+
+    def post_worker_init(worker):
+        # Pool, statement cache and read caches are primed before the first request
+        elapsed = warm_up(app)
+        worker.log.info(f'Worker {worker.pid} warmed up in {elapsed * 1000:.0f} ms: {pool_status(app)}')
+
+    def worker_exit(server, worker):
+        worker.log.info(f'Worker {worker.pid} exiting after {worker.nr} requests: {pool_status(app)}')
+        # Buffered audit rows must reach the database before the pool closes
+        flush_audit_writer(app)
+        dispose_engines(app)
+
+    return {
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit
+    }
+
 def main():
     """Main production server function."""
     try:
+        # Gunicorn configuration
+        options = get_options()
+        
+        # Pool sizing is read from the environment when the config is imported
+        for key, value in pool_settings(options).items():
+            os.environ.setdefault(key, str(value))
+        from src.app import create_app
+        
         # Create app with production config
         app = create_app('production')
         
@@ -52,24 +122,10 @@ def main():
                   file=sys.stderr)
             return 1
         
-        # Gunicorn configuration
-        options = {
-            'bind': '0.0.0.0:8000',
-            'workers': get_workers(),
-            'worker_class': 'sync',
-            'threads': 4,
-            'timeout': 120,
-            'keepalive': 5,
-            'max_requests': 1000,
-            'max_requests_jitter': 50,
-            'accesslog': 'logs/access.log',
-            'errorlog': 'logs/error.log',
-            'loglevel': 'info',
-            'capture_output': True,
-            'enable_stdio_inheritance': True,
-            'preload_app': True,
-            'worker_tmp_dir': '/dev/shm'  # Use RAM for temp files
-        }
+        # Close anything opened during app creation before workers fork
+        from src.utils.db import dispose_engines
+        dispose_engines(app)
+        options.update(lifecycle_hooks(app))
         
         # Ensure log directory exists
         if not os.path.exists('logs'):
@@ -13,12 +13,70 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///instance/inventory.db')
     
+    # Read replica (GET endpoints read from it; writes always go to the primary)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
+    # Database engine profile ('auto' picks one from the database URL scheme)
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'auto')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Azure SQL drops idle connections after 30 min
+    DB_POOL_WARM_CONNECTIONS = int(os.environ.get('DB_POOL_WARM_CONNECTIONS', 0))  # 0 warms the whole pool
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_OPTIMIZE_INTERVAL = int(os.environ.get('SQLITE_OPTIMIZE_INTERVAL', 3600))
+    
     # Azure AD config
     CLIENT_ID = os.environ.get('CLIENT_ID')
     CLIENT_SECRET = os.environ.get('CLIENT_SECRET')
     AUTHORITY = os.environ.get('AUTHORITY')
     SCOPE = os.environ.get('SCOPE', []).split(',') if os.environ.get('SCOPE') else []
     
+    # Read cache for dashboard payloads (0 disables)
+    READ_CACHE_TTL = int(os.environ.get('READ_CACHE_TTL', 30))
+    SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 10))  # seconds a coalesced request waits
+    
+    # Stale-while-revalidate for dashboard stats: refresh in the background past
+    # the soft TTL, recompute synchronously only past the hard TTL (0 disables)
+    SWR_SOFT_TTL = int(os.environ.get('SWR_SOFT_TTL', 5))
+    SWR_HARD_TTL = int(os.environ.get('SWR_HARD_TTL', 60))
+    
+    # Audit capture: 'sync' writes each flush's rows in the same transaction,
+    # 'async' buffers committed rows and writes them in batches. AUDIT_FORMAT
+    # 'compact' stores one change set per entity change instead of one row per field.
+    ENABLE_AUDIT_LOGGING = os.environ.get('ENABLE_AUDIT_LOGGING', 'true').lower() == 'true'
+    AUDIT_WRITER = os.environ.get('AUDIT_WRITER', 'sync')
+    AUDIT_FORMAT = os.environ.get('AUDIT_FORMAT', 'rows')
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2.0))
+    
+    # Audit entries older than the retention window move to monthly archive files
+    AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', 365))
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR')  # defaults to <instance>/audit-archive
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.environ.get('AUDIT_ARCHIVE_BATCH_SIZE', 5000))
+    
+    # Audit log listings (keyset-paginated)
+    AUDIT_PAGE_SIZE = int(os.environ.get('AUDIT_PAGE_SIZE', 50))
+    AUDIT_MAX_PAGE_SIZE = int(os.environ.get('AUDIT_MAX_PAGE_SIZE', 500))
+    
+    # Reconstruct missing daily rollups from the audit log when trends are read
+    TRENDS_BACKFILL = os.environ.get('TRENDS_BACKFILL', 'true').lower() == 'true'
+    
+    # Rows per statement for filter-driven bulk updates and deletes
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 1000))
+    
+    # Snapshot an asset's state every N audit entries to bound point-in-time replays
+    SNAPSHOT_EVERY = int(os.environ.get('SNAPSHOT_EVERY', 50))
+    
+    # Profiling config (admin-only, triggered per request with X-Profile: 1)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'true').lower() == 'true'
+    PROFILER = os.environ.get('PROFILER', 'cprofile')  # or 'sampling' when pyinstrument is installed
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')  # defaults to <instance>/profiles
+    PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', 30))
+    
     @staticmethod
     def init_app(app):
         """Initialize application."""
@@ -38,6 +96,9 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SERVER_NAME = 'localhost'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    READ_CACHE_TTL = 0
+    SWR_HARD_TTL = 0
+    TRENDS_BACKFILL = False
     
     # Test Azure AD config
     CLIENT_ID = 'test-client-id'
@@ -67,6 +128,73 @@ class ProductionConfig(Config):
         app.logger.info(f'Debug mode: {app.debug}')
         app.logger.info(f'Database URL: {app.config["SQLALCHEMY_DATABASE_URI"]}')
 
+def _sqlite_profile(cfg, uri):
+    """SQLite: WAL so readers never block on the writer, bounded waits on locks."""
+    engine_options = {
+        # sqlite3 waits this long for a lock before raising "database is locked"
+        'connect_args': {'timeout': cfg.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}
+    }
+    if uri.rstrip('/') != 'sqlite:' and ':memory:' not in uri:
+        # File databases use a regular queue pool; in-memory ones a per-thread pool
+        engine_options.update({
+            'pool_size': cfg.get('DB_POOL_SIZE', 10),
+            'max_overflow': cfg.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': cfg.get('DB_POOL_TIMEOUT', 30)
+        })
+    return {
+        'engine_options': engine_options,
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'busy_timeout': cfg.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+            'synchronous': 'NORMAL',
+            'mmap_size': cfg.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+            'cache_size': -cfg.get('SQLITE_CACHE_SIZE_KB', 64 * 1024),  # negative means KiB
+            'temp_store': 'MEMORY',
+            'foreign_keys': 'ON'
+        },
+        'optimize_interval': cfg.get('SQLITE_OPTIMIZE_INTERVAL', 3600)
+    }
+
+def _mssql_profile(cfg, uri):
+    """SQL Server via pyodbc: pooled, pre-pinged and recycled before Azure drops idle sockets."""
+    return {
+        'engine_options': {
+            'pool_size': cfg.get('DB_POOL_SIZE', 10),
+            'max_overflow': cfg.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': cfg.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': cfg.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+            'fast_executemany': True
+        }
+    }
+
+def _default_profile(cfg, uri):
+    """Any other server backend."""
+    return {
+        'engine_options': {
+            'pool_size': cfg.get('DB_POOL_SIZE', 10),
+            'max_overflow': cfg.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': cfg.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': cfg.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True
+        }
+    }
+
+ENGINE_PROFILES = {
+    'sqlite': _sqlite_profile,
+    'mssql': _mssql_profile,
+    'default': _default_profile
+}
+
+def get_engine_profile(cfg, uri=None):
+    """Get engine profile (engine options, SQLite pragmas) for a config mapping."""
+    uri = uri or cfg.get('SQLALCHEMY_DATABASE_URI', '')
+    name = cfg.get('DB_ENGINE_PROFILE') or 'auto'
+    if name == 'auto':
+        backend = uri.split(':', 1)[0].split('+', 1)[0]
+        name = backend if backend in ENGINE_PROFILES else 'default'
+    return ENGINE_PROFILES.get(name, _default_profile)(cfg, uri)
+
 config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
@@ -3,14 +3,17 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
 from sqlite3 import Connection as SQLite3Connection
+from .session import RoutingSession
 
 # Initialize SQLAlchemy with session options
 db = SQLAlchemy(session_options={
+    'class_': RoutingSession,
     'expire_on_commit': False,
     'autoflush': True
 })
 
-# Enable SQLite foreign key support
+# Enable SQLite foreign key support on every engine, including ones created
+# outside init_db (scripts, benchmarks). Other pragmas come from the engine profile.
 @event.listens_for(Engine, "connect")
 def _set_sqlite_pragma(dbapi_connection, connection_record):
     if isinstance(dbapi_connection, SQLite3Connection):
@@ -21,6 +24,10 @@ def _set_sqlite_pragma(dbapi_connection, connection_record):
 # Import models after db initialization to avoid circular imports
 from .location import Location  # noqa: E402
 from .inventory import Inventory  # noqa: E402
-from .audit import AuditLog  # noqa: E402
+from .audit import AuditLog, AuditChange, AuditUser, AuditUserAgent  # noqa: E402
+from .stats import DailyStat  # noqa: E402
+from .snapshot import AssetSnapshot  # noqa: E402
+from .migration import MigrationState  # noqa: E402
 
-__all__ = ['db', 'Location', 'Inventory', 'AuditLog']
+__all__ = ['db', 'Location', 'Inventory', 'AuditLog', 'AuditChange', 'AuditUser', 'AuditUserAgent', 'DailyStat', 'AssetSnapshot',
+           'MigrationState']
@@ -1,9 +1,67 @@
-"""Audit log model."""
+"""Audit log models."""
+import base64
+import heapq
+import json
 from datetime import datetime
+from sqlalchemy import and_, or_
 from .base import BaseModel, db
 
+# Sources merged into one listing; the rank breaks ties on equal timestamps
+ROWS, COMPACT = 'r', 'c'
+RANKS = {ROWS: 0, COMPACT: 1}
+
+def encode_cursor(changed_at, id, source=ROWS):
+    """Encode a keyset position as an opaque cursor string."""
+    raw = f'{changed_at.isoformat()}|{id}|{source}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor into (changed_at, id, source); raises ValueError when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parts = raw.split('|')
+        source = parts.pop() if len(parts) == 3 else ROWS
+        changed_at, id = parts
+        if source not in RANKS:
+            raise ValueError(source)
+        return datetime.fromisoformat(changed_at), int(id), source
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def _after_cursor(model, source, cursor):
+    """Keyset condition for rows of one source that sort after the cursor.
+
+    The merged order is (changed_at, source rank, id) descending; spelled
+    out rather than a row-value comparison, which SQL Server lacks.
+    """
+    changed_at, id, cursor_source = cursor
+    rank, cursor_rank = RANKS[source], RANKS[cursor_source]
+    if rank < cursor_rank:
+        return model.changed_at <= changed_at
+    if rank > cursor_rank:
+        return model.changed_at < changed_at
+    return or_(model.changed_at < changed_at, and_(model.changed_at == changed_at, model.id < id))
+
+def page_from_records(records, limit):
+    """Cut merged records into one page of entries and the cursor for the next page.
+
+    Records are ``(changed_at, rank, id, entries)`` tuples from any source;
+    they are ordered newest first and never split.
+    """
+    records = sorted(records, key=lambda record: record[:3], reverse=True)
+    entries = []
+    taken = 0
+    for taken, (_, _, _, record_entries) in enumerate(records, 1):
+        entries.extend(record_entries)
+        if limit and len(entries) >= limit:
+            break
+    if not limit or taken == len(records):
+        return entries, None
+    changed_at, rank, id, _ = records[taken - 1]
+    return entries, encode_cursor(changed_at, id, COMPACT if rank else ROWS)
+
 class AuditLog(BaseModel):
-    """Audit log model."""
+    """Audit log model (one row per changed field)."""
     __tablename__ = 'audit_log'
 
     action_type = db.Column(db.String(50), nullable=False)
@@ -17,18 +75,194 @@ class AuditLog(BaseModel):
     ip_address = db.Column(db.String(50))
     user_agent = db.Column(db.String(200))
 
+    # Every listing is ordered by (changed_at, id), optionally after one equality
+    # filter, so each filter gets an index ending in those columns
+    __table_args__ = (
+        db.Index('ix_audit_log_changed_at_id', 'changed_at', 'id'),
+        db.Index('ix_audit_log_asset_tag_changed_at', 'asset_tag', 'changed_at', 'id'),
+        db.Index('ix_audit_log_changed_by_changed_at', 'changed_by', 'changed_at', 'id'),
+        db.Index('ix_audit_log_location_id_changed_at', 'location_id', 'changed_at', 'id'),
+        db.Index('ix_audit_log_action_type_changed_at', 'action_type', 'changed_at', 'id'),
+    )
+
     @classmethod
-    def get_inventory_history(cls, asset_tag):
-        """Get audit history for an inventory item."""
-        return cls.query.filter_by(asset_tag=asset_tag).order_by(cls.changed_at.desc()).all()
+    def get_inventory_history(cls, asset_tag, limit=None):
+        """Get audit history for an inventory item as per-field entries."""
+        return cls.get_page(limit, asset_tag=asset_tag)[0]
 
     @classmethod
-    def get_user_actions(cls, user_email):
-        """Get audit history for a user."""
-        return cls.query.filter_by(changed_by=user_email).order_by(cls.changed_at.desc()).all()
+    def get_user_actions(cls, user_email, limit=None):
+        """Get audit history for a user as per-field entries."""
+        return cls.get_page(limit, changed_by=user_email)[0]
+
+    @classmethod
+    def get_page(cls, limit, cursor=None, **filters):
+        """Get one page of per-field entries, newest first, and the cursor for the next page.
+
+        Entries come from both the per-field rows and the compact change sets
+        (expanded to per-field entries). Pages continue from ``cursor`` with a
+        keyset condition on (changed_at, id) instead of an offset, so every
+        page costs the same. A change set is never split across pages, so a
+        page can exceed ``limit`` by a few entries. The next cursor is None on
+        the last page; without a ``limit`` everything is returned. Filters are
+        ``asset_tag``, ``changed_by``, ``action_type``, ``location_id``,
+        ``since`` and ``until``.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        return page_from_records(cls.get_records(limit + 1 if limit else None, position, **filters), limit)
+
+    @classmethod
+    def get_records(cls, fetch, position=None, asset_tag=None, changed_by=None, action_type=None,
+                    location_id=None, since=None, until=None):
+        """Get up to ``fetch`` records per storage format after a decoded cursor position.
+
+        A record is ``(changed_at, rank, id, entries)``; see ``page_from_records``.
+        """
+        query = cls.query
+        if asset_tag:
+            query = query.filter(cls.asset_tag == asset_tag)
+        if changed_by:
+            query = query.filter(cls.changed_by == changed_by)
+        if action_type:
+            query = query.filter(cls.action_type == action_type)
+        if location_id is not None:
+            query = query.filter(cls.location_id == location_id)
+        if since:
+            query = query.filter(cls.changed_at >= since)
+        if until:
+            query = query.filter(cls.changed_at < until)
+        if position:
+            query = query.filter(_after_cursor(cls, ROWS, position))
+        rows = query.order_by(cls.changed_at.desc(), cls.id.desc()).limit(fetch).all()
+
+        changes = AuditChange.get_filtered(
+            fetch, position, asset_tag=asset_tag, changed_by=changed_by, action_type=action_type,
+            location_id=location_id, since=since, until=until
+        )
+
+        records = [(row.changed_at, RANKS[ROWS], row.id, [row]) for row in rows]
+        records += [(change.changed_at, RANKS[COMPACT], change.id, change.entries()) for change in changes]
+        return records
+
+    @classmethod
+    def iter_field_changes(cls, since, fields):
+        """Yield (asset_tag, field_name, old_value, changed_at) for inventory updates, newest first.
+
+        Streams both storage formats and merges them by time.
+        """
+        rows = (
+            db.session.query(cls.asset_tag, cls.field_name, cls.old_value, cls.changed_at)
+            .filter(cls.changed_at >= since, cls.field_name.in_(fields))
+            .order_by(cls.changed_at.desc())
+            .yield_per(5000)
+        )
+        compact = (
+            (asset_tag, field_name, values[0], changed_at)
+            for asset_tag, changes, changed_at in (
+                db.session.query(AuditChange.asset_tag, AuditChange.changes, AuditChange.changed_at)
+                .filter(AuditChange.changed_at >= since, AuditChange.asset_tag.isnot(None),
+                        AuditChange.action_type == 'UPDATE')
+                .order_by(AuditChange.changed_at.desc())
+                .yield_per(5000)
+            )
+            for field_name, values in json.loads(changes).items()
+            if field_name in fields
+        )
+        return heapq.merge(rows, compact, key=lambda change: change[3], reverse=True)
 
     def to_dict(self):
         """Convert model to dictionary."""
         data = super().to_dict()
         data['changed_at'] = self.changed_at.isoformat() if self.changed_at else None
+        change_id = getattr(self, 'change_id', None)
+        if change_id is not None:
+            data['change_id'] = change_id
+        if getattr(self, 'archived', False):
+            data['archived'] = True
         return data
+
+class AuditUser(db.Model):
+    """Dictionary of users referenced by compact audit change sets."""
+    __tablename__ = 'audit_users'
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(100), nullable=False, unique=True)
+
+class AuditUserAgent(db.Model):
+    """Dictionary of user agent strings referenced by compact audit change sets."""
+    __tablename__ = 'audit_user_agents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_agent = db.Column(db.String(200), nullable=False, unique=True)
+
+class AuditChange(db.Model):
+    """Compact audit log: one row per entity change with a JSON field diff.
+
+    ``changes`` maps each field to ``[old, new]``; creates and deletes use
+    the ``item`` field with a JSON snapshot, as the per-field format does.
+    Users and user agents are stored once in dictionary tables. Rows carry
+    no created/updated timestamps, only ``changed_at``.
+    """
+    __tablename__ = 'audit_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    action_type = db.Column(db.String(20), nullable=False)
+    asset_tag = db.Column(db.String(50))
+    location_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer, db.ForeignKey('audit_users.id'), nullable=False)
+    user_agent_id = db.Column(db.Integer, db.ForeignKey('audit_user_agents.id'))
+    ip_address = db.Column(db.String(45))
+    changes = db.Column(db.Text, nullable=False)
+
+    user = db.relationship(AuditUser, lazy='joined')
+    agent = db.relationship(AuditUserAgent, lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_audit_changes_changed_at_id', 'changed_at', 'id'),
+        db.Index('ix_audit_changes_asset_tag_changed_at', 'asset_tag', 'changed_at', 'id'),
+        db.Index('ix_audit_changes_user_id_changed_at', 'user_id', 'changed_at', 'id'),
+        db.Index('ix_audit_changes_location_id_changed_at', 'location_id', 'changed_at', 'id'),
+        db.Index('ix_audit_changes_action_type_changed_at', 'action_type', 'changed_at', 'id'),
+    )
+
+    @classmethod
+    def get_filtered(cls, limit, position=None, asset_tag=None, changed_by=None, action_type=None,
+                     location_id=None, since=None, until=None):
+        """Get change sets newest first, continuing after a decoded cursor position."""
+        query = cls.query
+        if asset_tag:
+            query = query.filter(cls.asset_tag == asset_tag)
+        if changed_by:
+            query = query.join(AuditUser, cls.user_id == AuditUser.id).filter(AuditUser.email == changed_by)
+        if action_type:
+            query = query.filter(cls.action_type == action_type)
+        if location_id is not None:
+            query = query.filter(cls.location_id == location_id)
+        if since:
+            query = query.filter(cls.changed_at >= since)
+        if until:
+            query = query.filter(cls.changed_at < until)
+        if position:
+            query = query.filter(_after_cursor(cls, COMPACT, position))
+        return query.order_by(cls.changed_at.desc(), cls.id.desc()).limit(limit).all()
+
+    def entries(self):
+        """Expand into transient per-field ``AuditLog`` entries (never added to the session)."""
+        entries = []
+        for field_name, (old_value, new_value) in json.loads(self.changes).items():
+            entry = AuditLog(
+                action_type=self.action_type,
+                field_name=field_name,
+                changed_by=self.user.email,
+                old_value=old_value,
+                new_value=new_value,
+                asset_tag=self.asset_tag,
+                location_id=self.location_id,
+                changed_at=self.changed_at,
+                ip_address=self.ip_address,
+                user_agent=self.agent.user_agent if self.agent else None
+            )
+            entry.change_id = self.id
+            entries.append(entry)
+        return entries
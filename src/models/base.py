@@ -1,9 +1,25 @@
 """Base model for all database models."""
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import declared_attr
 from flask import current_app
 from . import db
 
+# Columns maintained by the model rather than set from input
+PROTECTED = ('id', 'created_at', 'updated_at', 'version_id')
+
+class VersionedMixin:
+    """Row version for optimistic concurrency, exposed as the ETag for If-Match checks.
+
+    ORM updates and deletes require the loaded version (StaleDataError
+    otherwise); set-based writes must bump it themselves.
+    """
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {'version_id_col': cls.version_id}
+
 class BaseModel(db.Model):
     """Abstract base model class."""
     __abstract__ = True
@@ -58,10 +74,10 @@ class BaseModel(db.Model):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
     def update(self, **kwargs):
-        """Update model attributes."""
+        """Update model attributes; only columns whose value changed are written."""
         try:
             for key, value in kwargs.items():
-                if hasattr(self, key):
+                if key in self.__table__.columns and key not in PROTECTED and getattr(self, key) != value:
                     setattr(self, key, value)
             db.session.commit()
             return self
@@ -1,8 +1,8 @@
 """Inventory model."""
 from datetime import datetime
-from .base import BaseModel, db
+from .base import BaseModel, VersionedMixin, db
 
-class Inventory(BaseModel):
+class Inventory(VersionedMixin, BaseModel):
     """Inventory model."""
     __tablename__ = 'inventory'
 
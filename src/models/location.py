@@ -1,7 +1,7 @@
 """Location model."""
-from .base import BaseModel, db
+from .base import BaseModel, VersionedMixin, db
 
-class Location(BaseModel):
+class Location(VersionedMixin, BaseModel):
     """Location model."""
     __tablename__ = 'location'
 
@@ -0,0 +1,46 @@
+"""Legacy data migration state model."""
+import json
+from datetime import datetime
+from .base import BaseModel, db
+
+def encode_key(value):
+    """Encode a legacy key value (string, number or datetime) as JSON text."""
+    if isinstance(value, datetime):
+        return json.dumps({'datetime': value.isoformat()})
+    return json.dumps(value)
+
+def decode_key(text):
+    """Decode a key value stored by ``encode_key``."""
+    value = json.loads(text) if text is not None else None
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['datetime'])
+    return value
+
+class MigrationState(BaseModel):
+    """Progress of one key range of a legacy migration stage.
+
+    ``high_water`` is the last key copied; the copy of a batch and the move
+    of the high-water mark commit together, so a rerun continues after it.
+    Range bounds and the mark are stored with ``encode_key``.
+    """
+    __tablename__ = 'migration_state'
+
+    stage = db.Column(db.String(50), nullable=False)
+    range_start = db.Column(db.String(200), nullable=False)
+    range_end = db.Column(db.String(200), nullable=False)
+    high_water = db.Column(db.String(200))
+    rows_copied = db.Column(db.Integer, nullable=False, default=0)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('stage', 'range_start', name='uix_migration_state_range'),
+    )
+
+    @property
+    def key_range(self):
+        """The ``(low, high)`` key range, None meaning unbounded."""
+        return decode_key(self.range_start), decode_key(self.range_end)
+
+    def get_high_water(self):
+        """Last copied key, or None when nothing has been copied yet."""
+        return decode_key(self.high_water)
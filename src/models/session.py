@@ -0,0 +1,40 @@
+"""Database session with read/write routing."""
+import time
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+STICKY_SESSION_KEY = 'db_primary_until'
+
+class RoutingSession(Session):
+    """Session that sends reads from read-only requests to the replica bind.
+
+    Routes opt in with the ``read_replica`` decorator. Flushes and DML always
+    use the primary, and after a user's own write their reads stay on the
+    primary for ``REPLICA_STICKY_SECONDS`` so they see what they just wrote.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                _mark_write()
+            elif _use_replica():
+                engine = self._db.engines.get(REPLICA_BIND)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _use_replica():
+    """Whether reads in the current context may go to the replica."""
+    if not has_request_context() or not g.get('db_read_only'):
+        return False
+    return session.get(STICKY_SESSION_KEY, 0) < time.time()
+
+def _mark_write():
+    """Pin this user's reads to the primary for a while after a write."""
+    if not has_request_context():
+        return
+    sticky = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    if sticky:
+        session[STICKY_SESSION_KEY] = time.time() + sticky
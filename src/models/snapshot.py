@@ -0,0 +1,36 @@
+"""Asset state snapshot model."""
+import json
+from .base import BaseModel, db
+
+class AssetSnapshot(BaseModel):
+    """Full audited state of an asset as of its last applied audit entry."""
+    __tablename__ = 'asset_snapshots'
+
+    asset_tag = db.Column(db.String(50), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False)
+    state = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_asset_snapshots_asset_tag_taken_at', 'asset_tag', 'taken_at'),
+    )
+
+    @classmethod
+    def nearest(cls, asset_tag, ts):
+        """Get the latest snapshot at or before ``ts`` and the earliest one after it."""
+        before = (
+            cls.query.filter(cls.asset_tag == asset_tag, cls.taken_at <= ts)
+            .order_by(cls.taken_at.desc())
+            .first()
+        )
+        after = None
+        if before is None:
+            after = (
+                cls.query.filter(cls.asset_tag == asset_tag, cls.taken_at > ts)
+                .order_by(cls.taken_at)
+                .first()
+            )
+        return before, after
+
+    def get_state(self):
+        """Decoded state dictionary."""
+        return json.loads(self.state)
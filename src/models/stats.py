@@ -0,0 +1,40 @@
+"""Daily statistics rollup model."""
+from sqlalchemy import func
+from .base import BaseModel, db
+
+class DailyStat(BaseModel):
+    """Daily inventory counts per status, asset type and site."""
+    __tablename__ = 'daily_stats'
+
+    day = db.Column(db.Date, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    asset_type = db.Column(db.String(50), nullable=False)
+    site_name = db.Column(db.String(100), nullable=False)
+    asset_count = db.Column(db.Integer, nullable=False, default=0)
+    decommissioned_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'status', 'asset_type', 'site_name', name='uix_daily_stats_bucket'),
+    )
+
+    @classmethod
+    def get_days(cls, start, end):
+        """Get the set of days with a stored rollup in a date range."""
+        rows = db.session.query(cls.day).filter(cls.day.between(start, end)).distinct().all()
+        return {day for (day,) in rows}
+
+    @classmethod
+    def get_series(cls, start, end, column, status=None, exclude_status=None, asset_type=None,
+                   site_name=None, by_site=False):
+        """Sum a count column per day (and optionally per site) over a date range."""
+        keys = [cls.day, cls.site_name] if by_site else [cls.day]
+        query = db.session.query(*keys, func.sum(column)).filter(cls.day.between(start, end))
+        if status:
+            query = query.filter(cls.status == status)
+        if exclude_status:
+            query = query.filter(cls.status != exclude_status)
+        if asset_type:
+            query = query.filter(cls.asset_type == asset_type)
+        if site_name:
+            query = query.filter(cls.site_name == site_name)
+        return query.group_by(*keys).order_by(cls.day).all()
@@ -1,15 +1,47 @@
 """Inventory routes."""
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import DateTime, case, insert, literal_column, select, true, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from ..models import db
 from ..models.inventory import Inventory
 from ..models.location import Location
+from ..utils import audit
+from ..utils.archive import get_history_page
 from ..utils.auth import requires_auth, requires_roles
+from ..utils.bulk import delete_inventory, transition_inventory
+from ..utils.cache import cached, coalesced
+from ..utils.db import read_replica
+from ..utils.etag import if_match_fails, with_etag
+from ..utils.pagination import page_size, time_range
+from ..utils.profiling import profiled
+from ..utils.snapshots import snapshot_in_background, state_as_of
+from ..utils.upsert import GENERATED, coerce, upsert
 
 bp = Blueprint('inventory', __name__, url_prefix='/api/inventory')
 
+# Columns returned by item writes, in ``to_dict`` order
+ITEM_COLUMNS = tuple(Inventory.__table__.columns)
+LOCATION_SUMMARY = (Location.id, Location.site_name, Location.room_number, Location.room_name)
+# The location summary as correlated subqueries, so writes return it in the same statement.
+# Spelled out because RETURNING renders columns without their table.
+LOCATION_FIELDS = tuple(
+    select(literal_column(f'location.{column.key}', column.type))
+    .select_from(Location.__table__)
+    .where(literal_column('location.id') == literal_column('inventory.location_id'))
+    .scalar_subquery()
+    .label(f'location__{column.key}')
+    for column in LOCATION_SUMMARY
+)
+# Conditional updates tried before giving up on a row that keeps changing
+UPDATE_ATTEMPTS = 3
+
 @bp.route('', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
+@coalesced
 def get_inventory():
     """Get all inventory items."""
     try:
@@ -30,22 +62,109 @@ def get_inventory():
         current_app.logger.error(f'Error getting inventory: {str(e)}')
         return jsonify({'error': 'Internal Server Error'}), 500
 
+@bp.route('/types', methods=['GET'])
+@requires_auth
+@profiled
+@read_replica
+@coalesced
+def get_asset_types():
+    """Get distinct asset types for filter lists."""
+    try:
+        return jsonify(_asset_types_payload())
+    except Exception as e:
+        current_app.logger.error(f'Error getting asset types: {str(e)}')
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+@cached('asset_types', warm=True)
+def _asset_types_payload():
+    """Build the distinct asset type list."""
+    rows = db.session.query(Inventory.asset_type).distinct().order_by(Inventory.asset_type).all()
+    return [asset_type for (asset_type,) in rows]
+
 @bp.route('/<int:id>', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
 def get_inventory_item(id):
     """Get inventory item by ID."""
     try:
         item = Inventory.query.get(id)
         if not item:
             return jsonify({'error': 'Item not found'}), 404
-        return jsonify(item.to_dict())
+        return with_etag(jsonify(item.to_dict()), item.version_id)
     except Exception as e:
         current_app.logger.error(f'Error getting inventory item {id}: {str(e)}')
         return jsonify({'error': 'Internal Server Error'}), 500
 
+@bp.route('/<int:id>/history', methods=['GET'])
+@requires_auth
+@profiled
+@read_replica
+def get_inventory_history(id):
+    """Get a page of audit history for an inventory item."""
+    try:
+        item = db.session.get(Inventory, id)
+        if not item:
+            return jsonify({'error': 'Item not found'}), 404
+        try:
+            since, until = time_range(request.args)
+            logs, next_cursor = get_history_page(
+                page_size(request.args),
+                cursor=request.args.get('cursor'),
+                asset_tag=item.asset_tag,
+                action_type=request.args.get('action_type'),
+                since=since,
+                until=until
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'items': [log.to_dict() for log in logs],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        current_app.logger.error(f'Error getting history for inventory item {id}: {str(e)}')
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+@bp.route('/<int:id>/as-of', methods=['GET'])
+@requires_auth
+@profiled
+@read_replica
+def get_inventory_as_of(id):
+    """Get an inventory item's state at a point in time (``?ts=`` ISO timestamp)."""
+    try:
+        item = db.session.get(Inventory, id)
+        if not item:
+            return jsonify({'error': 'Item not found'}), 404
+        if not request.args.get('ts'):
+            return jsonify({'error': 'ts is required'}), 400
+        try:
+            ts = datetime.fromisoformat(request.args['ts'])
+        except ValueError:
+            return jsonify({'error': f"Invalid ts: {request.args['ts']}"}), 400
+        
+        state, replayed = state_as_of(item, ts)
+        if replayed > current_app.config.get('SNAPSHOT_EVERY', 50):
+            snapshot_in_background(item.asset_tag)
+        if state is None:
+            return jsonify({'error': 'Item did not exist at that time'}), 404
+        
+        location = db.session.get(Location, state['location_id']) if state.get('location_id') else None
+        return jsonify({
+            'id': item.id,
+            'as_of': ts.isoformat(),
+            'state': state,
+            'location': location.to_dict() if location else None,
+            'replayed': replayed
+        })
+    except Exception as e:
+        current_app.logger.error(f'Error getting inventory item {id} as of {request.args.get("ts")}: {str(e)}')
+        return jsonify({'error': 'Internal Server Error'}), 500
+
 @bp.route('', methods=['POST'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def create_inventory_item():
     """Create new inventory item."""
     try:
@@ -53,50 +172,83 @@ def create_inventory_item():
         if not data or not all(k in data for k in ('asset_tag', 'asset_type', 'location_id')):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Verify location exists
-        location = Location.query.get(data['location_id'])
-        if not location:
-            return jsonify({'error': 'Location not found'}), 404
-        
-        # Check for duplicate asset tag
-        if Inventory.query.filter_by(asset_tag=data['asset_tag']).first():
-            return jsonify({'error': 'Asset tag already exists'}), 400
+        unknown = set(data) - set(Inventory.__table__.columns.keys()) | (set(data) & set(GENERATED))
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(sorted(unknown))}'}), 400
+        try:
+            data = _parse_dates(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        item = Inventory(**data)
-        db.session.add(item)
+        # The location and duplicate checks are left to the foreign key and unique constraints
+        row = db.session.execute(_returning(insert(Inventory).values(**data))).one()
+        audit.record(db.session, audit.change_rows(Inventory, 'CREATE', row._asdict(), changed_at=row.created_at))
+        response = _item_response(row)
         db.session.commit()
         
-        return jsonify(item.to_dict()), 201
+        return with_etag(jsonify(response), row.version_id), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        return _constraint_error(e)
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'Error creating inventory item: {str(e)}')
         return jsonify({'error': 'Internal Server Error'}), 500
 
-@bp.route('/<int:id>', methods=['PUT'])
+@bp.route('/<int:id>', methods=['PUT', 'PATCH'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def update_inventory_item(id):
-    """Update inventory item."""
+    """Update the given fields of an inventory item, writing only the changed columns.
+    
+    The update is conditional on the version just read, so concurrent edits
+    are never silently overwritten. With ``If-Match``, a stale ETag gets 412;
+    without it, a lost race is retried.
+    """
     try:
-        item = Inventory.query.get(id)
-        if not item:
-            return jsonify({'error': 'Item not found'}), 404
-        
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        # Check location if provided
-        if 'location_id' in data:
-            location = Location.query.get(data['location_id'])
-            if not location:
-                return jsonify({'error': 'Location not found'}), 404
+        # Unknown fields are ignored
+        values = {key: value for key, value in data.items() if key in Inventory.__table__.columns and key not in GENERATED}
+        try:
+            values = _parse_dates(values)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Update fields
-        for key, value in data.items():
-            if hasattr(item, key):
-                setattr(item, key, value)
+        for attempt in range(UPDATE_ATTEMPTS):
+            old = db.session.execute(select(*ITEM_COLUMNS, *LOCATION_FIELDS).where(Inventory.id == id)).first()
+            if old is None:
+                return jsonify({'error': 'Item not found'}), 404
+            if if_match_fails(old.version_id):
+                return jsonify({'error': 'Item was modified by someone else'}), 412
+            
+            changes = {key: value for key, value in values.items() if getattr(old, key) != value}
+            if not changes:
+                return with_etag(jsonify(_item_response(old)), old.version_id)
+            
+            row = db.session.execute(_returning(
+                update(Inventory)
+                .where(Inventory.id == id, Inventory.version_id == old.version_id)
+                .values(dict(changes, version_id=Inventory.version_id + 1))
+            )).first()
+            if row is not None:
+                break
+            db.session.rollback()
+            if request.if_match:
+                return jsonify({'error': 'Item was modified by someone else'}), 412
+        else:
+            return jsonify({'error': 'Item is being modified concurrently, try again'}), 409
         
+        changes = {key: (getattr(old, key), getattr(row, key)) for key in changes}
+        audit.record(db.session, audit.change_rows(Inventory, 'UPDATE', row._asdict(), changes, changed_at=row.updated_at))
+        response = _item_response(row)
         db.session.commit()
-        return jsonify(item.to_dict())
+        
+        return with_etag(jsonify(response), row.version_id)
+    except IntegrityError as e:
+        db.session.rollback()
+        return _constraint_error(e)
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'Error updating inventory item {id}: {str(e)}')
@@ -105,16 +257,23 @@ def update_inventory_item(id):
 @bp.route('/<int:id>', methods=['DELETE'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def delete_inventory_item(id):
     """Delete inventory item."""
     try:
         item = Inventory.query.get(id)
         if not item:
             return jsonify({'error': 'Item not found'}), 404
+        if if_match_fails(item.version_id):
+            return jsonify({'error': 'Item was modified by someone else'}), 412
         
         db.session.delete(item)
         db.session.commit()
         return jsonify({'message': 'Item deleted successfully'})
+    except StaleDataError:
+        # Another update committed between the read and the delete
+        db.session.rollback()
+        return jsonify({'error': 'Item was modified by someone else'}), 412
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'Error deleting inventory item {id}: {str(e)}')
@@ -123,17 +282,25 @@ def delete_inventory_item(id):
 @bp.route('/<int:id>/toggle-loaner', methods=['POST'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def toggle_loaner(id):
     """Toggle loaner status of inventory item."""
     try:
-        item = Inventory.query.get(id)
-        if not item:
+        row = db.session.execute(_returning(
+            update(Inventory)
+            .where(Inventory.id == id)
+            .values(is_loaner=case((Inventory.is_loaner == true(), False), else_=True), version_id=Inventory.version_id + 1)
+        )).first()
+        if row is None:
+            db.session.rollback()
             return jsonify({'error': 'Item not found'}), 404
         
-        item.is_loaner = not item.is_loaner
+        changes = {'is_loaner': (not row.is_loaner, row.is_loaner)}
+        audit.record(db.session, audit.change_rows(Inventory, 'UPDATE', row._asdict(), changes, changed_at=row.updated_at))
+        response = _item_response(row)
         db.session.commit()
         
-        return jsonify(item.to_dict())
+        return with_etag(jsonify(response), row.version_id)
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'Error toggling loaner status for item {id}: {str(e)}')
@@ -142,13 +309,17 @@ def toggle_loaner(id):
 @bp.route('/bulk', methods=['POST'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def bulk_create():
-    """Bulk create inventory items."""
+    """Bulk create inventory items (``?upsert=true`` inserts or updates by asset tag)."""
     try:
         data = request.get_json()
         if not data or 'items' not in data:
             return jsonify({'error': 'Missing items array'}), 400
         
+        if request.args.get('upsert', '').lower() == 'true':
+            return _bulk_upsert(data['items'])
+        
         created = []
         for item_data in data['items']:
             # Verify location exists
@@ -171,9 +342,120 @@ def bulk_create():
         current_app.logger.error(f'Error in bulk create: {str(e)}')
         return jsonify({'error': 'Internal Server Error'}), 500
 
+@bp.route('/bulk-transition', methods=['POST'])
+@requires_auth
+@requires_roles('admin')
+@profiled
+def bulk_transition():
+    """Move every inventory item matching a filter to a new status."""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('filter'), dict) or not data.get('status'):
+            return jsonify({'error': 'Missing filter or status'}), 400
+        
+        try:
+            updated = transition_inventory(data['filter'], data['status'])
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        return jsonify({'updated': updated, 'status': data['status']})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error in bulk transition: {str(e)}')
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+@bp.route('/bulk', methods=['DELETE'])
+@requires_auth
+@requires_roles('admin')
+@profiled
+def bulk_delete():
+    """Delete every inventory item matching a filter."""
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('filter'), dict):
+            return jsonify({'error': 'Missing filter'}), 400
+        
+        try:
+            deleted = delete_inventory(data['filter'])
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        return jsonify({'deleted': deleted})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error in bulk delete: {str(e)}')
+        return jsonify({'error': 'Internal Server Error'}), 500
+
+def _parse_dates(values):
+    """Copy of item values with ISO timestamp strings parsed for the datetime columns; raises ValueError."""
+    return {
+        key: datetime.fromisoformat(value)
+        if isinstance(value, str) and isinstance(Inventory.__table__.c[key].type, DateTime) else value
+        for key, value in values.items()
+    }
+
+def _returning(statement):
+    """Return the item row and, where the dialect allows subqueries there, its location summary."""
+    if db.session.get_bind().dialect.name == 'mssql':
+        # OUTPUT clauses cannot hold subqueries; _item_response reads the location instead
+        return statement.returning(*ITEM_COLUMNS)
+    return statement.returning(*ITEM_COLUMNS, *LOCATION_FIELDS)
+
+def _item_response(row):
+    """Serialize a returned inventory row like ``Inventory.to_dict``."""
+    data = row._asdict()
+    location = {column.key: data.pop(f'location__{column.key}') for column in LOCATION_SUMMARY
+                if f'location__{column.key}' in data}
+    if not location:
+        summary = db.session.execute(select(*LOCATION_SUMMARY).where(Location.id == row.location_id)).first()
+        location = summary._asdict() if summary is not None else {}
+    if location.get('id') is not None:
+        data['location'] = location
+    return data
+
+def _constraint_error(e):
+    """Map a constraint violation of an item write to a 404 (unknown location) or 400 response."""
+    message = str(e.orig).lower()
+    if 'foreign key' in message:
+        return jsonify({'error': 'Location not found'}), 404
+    if 'serial_number' in message:
+        return jsonify({'error': 'Serial number already exists'}), 400
+    if 'asset_tag' in message:
+        return jsonify({'error': 'Asset tag already exists'}), 400
+    if 'unique' in message or 'duplicate' in message:
+        return jsonify({'error': 'Asset tag or serial number already exists'}), 400
+    current_app.logger.error(f'Integrity error writing inventory item: {str(e)}')
+    return jsonify({'error': 'Item violates a constraint (missing required fields?)'}), 400
+
+def _bulk_upsert(items):
+    """Apply a feed of items in a few set-based statements and return the counts."""
+    try:
+        location_ids = {coerce(Inventory.__table__.c.location_id, item.get('location_id')) for item in items if isinstance(item, dict)}
+        found = set()
+        ids = list(location_ids - {None})
+        for start in range(0, len(ids), 1000):
+            found.update(db.session.scalars(select(Location.id).where(Location.id.in_(ids[start:start + 1000]))))
+        missing = location_ids - found - {None}
+        if missing:
+            return jsonify({'error': f'Location not found: {sorted(missing, key=str)[0]}'}), 404
+        
+        counts = upsert(db.session, Inventory, items, ('asset_tag',))
+        db.session.commit()
+        return jsonify(counts)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError as e:
+        db.session.rollback()
+        current_app.logger.error(f'Integrity error in bulk upsert: {str(e)}')
+        return jsonify({'error': 'Items violate a constraint (missing required fields or duplicate serial number)'}), 400
+
 @bp.route('/bulk', methods=['PUT'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def bulk_update():
     """Bulk update inventory items."""
     try:
@@ -198,7 +480,7 @@ def bulk_update():
             
             # Update fields
             for key, value in item_data.items():
-                if hasattr(item, key) and key != 'id':
+                if hasattr(item, key) and key not in GENERATED:
                     setattr(item, key, value)
             
             updated.append(item)
@@ -1,30 +1,47 @@
 """Location routes."""
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for
+from sqlalchemy.orm.exc import StaleDataError
+from ..models import db
 from ..models.location import Location
 from ..utils.auth import requires_auth, requires_roles
+from ..utils.bulk import delete_location_cascade, get_job, start_location_delete
+from ..utils.cache import cached, coalesced
+from ..utils.db import read_replica
+from ..utils.etag import if_match_fails, with_etag
+from ..utils.profiling import profiled
+from ..utils.upsert import upsert
 
 bp = Blueprint('location', __name__, url_prefix='/api/locations')
 
 @bp.route('', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
+@coalesced
 def get_locations():
     """Get all locations."""
     try:
-        locations = Location.get_all()
-        return jsonify([loc.to_dict() for loc in locations])
+        return jsonify(_locations_payload())
     except Exception as e:
         current_app.logger.error(f'Error getting locations: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
 
+@cached('locations', warm=True)
+def _locations_payload():
+    """Build the location list payload."""
+    return [loc.to_dict() for loc in Location.get_all()]
+
 @bp.route('/<int:id>', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
 def get_location(id):
     """Get location by ID."""
     try:
         location = Location.get_by_id(id)
         if not location:
             return {'error': 'Location not found'}, 404
-        return jsonify(location.to_dict())
+        return with_etag(jsonify(location.to_dict()), location.version_id)
     except Exception as e:
         current_app.logger.error(f'Error getting location {id}: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
@@ -32,13 +49,24 @@ def get_location(id):
 @bp.route('', methods=['POST'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def create_location():
-    """Create new location."""
+    """Create new location (``?upsert=true`` updates an existing site and room instead)."""
     try:
         data = request.get_json()
         if not data or not all(k in data for k in ('site_name', 'room_number')):
             return {'error': 'Missing required fields'}, 400
         
+        if request.args.get('upsert', '').lower() == 'true':
+            try:
+                counts = upsert(db.session, Location, [data], ('site_name', 'room_number'))
+            except ValueError as e:
+                db.session.rollback()
+                return {'error': str(e)}, 400
+            db.session.commit()
+            location = Location.query.filter_by(site_name=data['site_name'], room_number=data['room_number']).first()
+            return jsonify(dict(counts, location=location.to_dict())), 201 if counts['inserted'] else 200
+        
         location = Location(**data)
         location.save()
         
@@ -47,20 +75,26 @@ def create_location():
         current_app.logger.error(f'Error creating location: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
 
-@bp.route('/<int:id>', methods=['PUT'])
+@bp.route('/<int:id>', methods=['PUT', 'PATCH'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def update_location(id):
-    """Update location."""
+    """Update the given fields of a location (412 when ``If-Match`` is stale)."""
     try:
         location = Location.get_by_id(id)
         if not location:
             return {'error': 'Location not found'}, 404
+        if if_match_fails(location.version_id):
+            return {'error': 'Location was modified by someone else'}, 412
         
-        data = request.get_json()
+        data = request.get_json() or {}
         location.update(**data)
         
-        return jsonify(location.to_dict())
+        return with_etag(jsonify(location.to_dict()), location.version_id)
+    except StaleDataError:
+        # Another update committed between the read and this one
+        return {'error': 'Location was modified by someone else'}, 412
     except Exception as e:
         current_app.logger.error(f'Error updating location {id}: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
@@ -68,15 +102,32 @@ def update_location(id):
 @bp.route('/<int:id>', methods=['DELETE'])
 @requires_auth
 @requires_roles('admin')
+@profiled
 def delete_location(id):
-    """Delete location."""
+    """Delete location and its inventory (``?background=true`` runs it as a job)."""
     try:
         location = Location.get_by_id(id)
         if not location:
             return {'error': 'Location not found'}, 404
         
-        location.delete()
-        return {'message': 'Location deleted successfully'}
+        if request.args.get('background', '').lower() == 'true':
+            job = start_location_delete(id)
+            return jsonify(job), 202, {'Location': url_for('location.get_delete_job', job_id=job['id'])}
+        
+        counts = delete_location_cascade(id)
+        db.session.commit()
+        return jsonify(dict(counts, message='Location deleted successfully'))
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f'Error deleting location {id}: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
+
+@bp.route('/delete-jobs/<job_id>', methods=['GET'])
+@requires_auth
+@requires_roles('admin')
+def get_delete_job(job_id):
+    """Get the progress and counts of a background location deletion."""
+    job = get_job(job_id)
+    if not job:
+        return {'error': 'Job not found'}, 404
+    return jsonify(job)
@@ -1,67 +1,215 @@
 """Statistics routes."""
-from flask import Blueprint, jsonify, current_app
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, current_app, request
 from sqlalchemy import func, text
 from ..models.inventory import Inventory
 from ..models.location import Location
-from ..models.audit import AuditLog
-from ..utils.auth import requires_auth
+from ..models.stats import DailyStat
+from ..utils.archive import get_history_page
+from ..utils.auth import requires_auth, requires_roles
+from ..utils.cache import cache, cache_age, coalesced, single_flight, stale_while_revalidate
+from ..utils.db import read_replica
+from ..utils.pagination import page_size, time_range
+from ..utils.profiling import profiled
+from ..utils.rollups import backfill_in_background, missing_days
 
 bp = Blueprint('stats', __name__, url_prefix='/api/stats')
 
+# metric -> (rollup column, filters, whether values add up across days)
+TREND_METRICS = {
+    'active': (DailyStat.asset_count, {'status': 'active'}, False),
+    'decommissions': (DailyStat.decommissioned_count, {}, True),
+    'by_site': (DailyStat.asset_count, {'exclude_status': 'decommissioned', 'by_site': True}, False)
+}
+
 @bp.route('', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
+@coalesced
 def get_stats():
     """Get inventory statistics."""
     try:
-        # Get total counts
-        total_items = Inventory.query.count()
-        active_items = Inventory.query.filter_by(status='active').count()
-        decommissioned_items = Inventory.query.filter_by(status='decommissioned').count()
-        loaner_items = Inventory.query.filter_by(is_loaner=True).count()
-        
-        # Get counts by type using SQLAlchemy 2.0 style
-        type_counts = (
-            Inventory.query
-            .with_entities(Inventory.asset_type, func.count(Inventory.id))
-            .group_by(Inventory.asset_type)
-            .all()
-        )
-        
-        # Get counts by location using SQLAlchemy 2.0 style
-        location_counts = (
-            Inventory.query
-            .join(Location)
-            .with_entities(Location.site_name, func.count(Inventory.id))
-            .group_by(Location.site_name)
-            .all()
-        )
-        
-        return jsonify({
-            'total_items': total_items,
-            'active_items': active_items,
-            'decommissioned_items': decommissioned_items,
-            'loaner_items': loaner_items,
-            'by_type': dict(type_counts),
-            'by_location': dict(location_counts)
-        })
+        response = jsonify(_stats_payload())
+        response.headers['Age'] = str(cache_age())
+        return response
     except Exception as e:
         current_app.logger.error(f'Error getting stats: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
 
+@stale_while_revalidate('stats', warm=True)
+def _stats_payload():
+    """Build the statistics payload."""
+    # Get total counts
+    total_items = Inventory.query.count()
+    active_items = Inventory.query.filter_by(status='active').count()
+    decommissioned_items = Inventory.query.filter_by(status='decommissioned').count()
+    loaner_items = Inventory.query.filter_by(is_loaner=True).count()
+    
+    # Get counts by type using SQLAlchemy 2.0 style
+    type_counts = (
+        Inventory.query
+        .with_entities(Inventory.asset_type, func.count(Inventory.id))
+        .group_by(Inventory.asset_type)
+        .all()
+    )
+    
+    # Get counts by location using SQLAlchemy 2.0 style
+    location_counts = (
+        Inventory.query
+        .join(Location)
+        .with_entities(Location.site_name, func.count(Inventory.id))
+        .group_by(Location.site_name)
+        .all()
+    )
+    
+    return {
+        'total_items': total_items,
+        'active_items': active_items,
+        'decommissioned_items': decommissioned_items,
+        'loaner_items': loaner_items,
+        'by_type': dict(type_counts),
+        'by_location': dict(location_counts)
+    }
+
 @bp.route('/recent-activity', methods=['GET'])
 @requires_auth
+@profiled
+@read_replica
+@coalesced
 def get_recent_activity():
     """Get recent audit log entries."""
     try:
-        # Get last 50 audit log entries using SQLAlchemy 2.0 style
-        logs = (
-            AuditLog.query
-            .order_by(AuditLog.changed_at.desc())
-            .limit(50)
-            .all()
+        try:
+            limit = page_size(request.args)
+        except ValueError:
+            return {'error': 'limit must be a positive integer'}, 400
+        # The default page shares the cache entry filled at warm-up
+        payload = _recent_activity_payload(limit) if 'limit' in request.args else _recent_activity_payload()
+        response = jsonify(payload['items'])
+        response.headers['Age'] = str(cache_age())
+        # Older entries continue from /api/stats/audit?cursor=<X-Next-Cursor>
+        if payload['next_cursor']:
+            response.headers['X-Next-Cursor'] = payload['next_cursor']
+        return response
+    except Exception as e:
+        current_app.logger.error(f'Error getting recent activity: {str(e)}')
+        return {'error': 'Internal Server Error'}, 500
+
+@stale_while_revalidate('recent_activity', warm=True)
+def _recent_activity_payload(limit=None):
+    """Build the recent activity payload."""
+    logs, next_cursor = get_history_page(limit or current_app.config.get('AUDIT_PAGE_SIZE', 50))
+    return {'items': [log.to_dict() for log in logs], 'next_cursor': next_cursor}
+
+@bp.route('/audit', methods=['GET'])
+@requires_auth
+@profiled
+@read_replica
+@coalesced
+def get_audit_log():
+    """Get a page of audit log entries, optionally filtered."""
+    try:
+        try:
+            limit = page_size(request.args)
+            since, until = time_range(request.args)
+            location_id = int(request.args['location_id']) if request.args.get('location_id') else None
+            logs, next_cursor = get_history_page(
+                limit,
+                cursor=request.args.get('cursor'),
+                asset_tag=request.args.get('asset_tag'),
+                changed_by=request.args.get('changed_by'),
+                action_type=request.args.get('action_type'),
+                location_id=location_id,
+                since=since,
+                until=until
+            )
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        
+        return jsonify({
+            'items': [log.to_dict() for log in logs],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        current_app.logger.error(f'Error getting audit log: {str(e)}')
+        return {'error': 'Internal Server Error'}, 500
+
+@bp.route('/trends', methods=['GET'])
+@requires_auth
+@profiled
+@read_replica
+@coalesced
+def get_trends():
+    """Get trend series from the daily rollups."""
+    try:
+        metric = request.args.get('metric', 'active')
+        interval = request.args.get('interval', 'day')
+        if metric not in TREND_METRICS:
+            return {'error': f'Unknown metric, expected one of {", ".join(TREND_METRICS)}'}, 400
+        if interval not in ('day', 'month'):
+            return {'error': 'Unknown interval, expected day or month'}, 400
+        try:
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=89)
+        except ValueError:
+            return {'error': 'Invalid date, expected YYYY-MM-DD'}, 400
+        if start > end:
+            return {'error': 'start must not be after end'}, 400
+        
+        # Gaps are reconstructed from the audit log in the background
+        missing = missing_days(start, end)
+        if missing and current_app.config.get('TRENDS_BACKFILL', True):
+            backfill_in_background(missing[0], missing[-1])
+        
+        column, filters, additive = TREND_METRICS[metric]
+        rows = DailyStat.get_series(
+            start, end, column,
+            asset_type=request.args.get('asset_type'),
+            site_name=request.args.get('site_name'),
+            **filters
         )
         
-        return jsonify([log.to_dict() for log in logs])
+        if filters.get('by_site'):
+            sites = {}
+            for day, site_name, value in rows:
+                sites.setdefault(site_name, []).append((day, value))
+            series = {site_name: _bucket(points, interval, additive) for site_name, points in sites.items()}
+        else:
+            series = _bucket(rows, interval, additive)
+        
+        return jsonify({
+            'metric': metric,
+            'interval': interval,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'missing_days': len(missing),
+            'series': series
+        })
     except Exception as e:
-        current_app.logger.error(f'Error getting recent activity: {str(e)}')
+        current_app.logger.error(f'Error getting trends: {str(e)}')
         return {'error': 'Internal Server Error'}, 500
+
+def _bucket(points, interval, additive):
+    """Group (day, value) points by interval.
+
+    Additive metrics are summed per month; level metrics take the month's
+    last recorded day.
+    """
+    if interval == 'day':
+        return [{'date': day.isoformat(), 'value': int(value or 0)} for day, value in points]
+    months = {}
+    for day, value in points:
+        month = day.strftime('%Y-%m')
+        months[month] = months.get(month, 0) + int(value or 0) if additive else int(value or 0)
+    return [{'date': month, 'value': value} for month, value in months.items()]
+
+@bp.route('/cache', methods=['GET'])
+@requires_auth
+@requires_roles('admin')
+def get_cache_metrics():
+    """Get read cache and request coalescing metrics for this worker."""
+    return jsonify({
+        'read_cache': {'entries': cache.size()},
+        'single_flight': single_flight.metrics()
+    })
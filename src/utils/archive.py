@@ -0,0 +1,280 @@
+"""Cold archival of old audit entries to monthly compressed NDJSON files."""
+import gzip
+import heapq
+import io
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from flask import current_app
+from ..models import db
+from ..models.audit import COMPACT, RANKS, ROWS, AuditChange, AuditLog, decode_cursor, page_from_records
+
+MANIFEST = 'manifest.json'
+ENTRY_FIELDS = ('action_type', 'field_name', 'changed_by', 'old_value', 'new_value', 'asset_tag',
+                'location_id', 'ip_address', 'user_agent')
+
+_archive_lock = threading.Lock()
+
+def archive_dir():
+    """Directory holding the archive files and manifest."""
+    return current_app.config.get('AUDIT_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'audit-archive')
+
+def load_manifest(directory=None):
+    """Load the manifest: partitions by month, the archive horizon and any unfinished batch."""
+    path = os.path.join(directory or archive_dir(), MANIFEST)
+    if not os.path.exists(path):
+        return {'archived_before': None, 'partitions': {}, 'pending': None}
+    with open(path) as fh:
+        return json.load(fh)
+
+def read_manifest():
+    """Load the manifest for reads, re-parsing only when the file changes (do not modify)."""
+    path = os.path.join(archive_dir(), MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {'archived_before': None, 'partitions': {}, 'pending': None}
+    return _cached_manifest(path, mtime)
+
+def save_manifest(manifest, directory=None):
+    """Write the manifest atomically."""
+    directory = directory or archive_dir()
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(path + '.tmp', path)
+
+def archive_audit(cutoff=None, batch_size=None):
+    """Move audit entries older than ``cutoff`` into the monthly archive files.
+
+    ``cutoff`` defaults to ``AUDIT_RETENTION_DAYS`` ago. Each batch is
+    announced in the manifest, appended to its month's file and marked
+    written before the rows are deleted. The next run finishes an interrupted
+    batch: one not yet marked written is cut from the files and archived
+    again, so entries are never duplicated. Returns the number of entries archived.
+    """
+    if not _archive_lock.acquire(blocking=False):
+        raise RuntimeError('An audit archive run is already in progress')
+    try:
+        cutoff = cutoff or datetime.utcnow() - timedelta(days=current_app.config.get('AUDIT_RETENTION_DAYS', 365))
+        batch_size = batch_size or current_app.config.get('AUDIT_ARCHIVE_BATCH_SIZE', 5000)
+        directory = archive_dir()
+        os.makedirs(directory, exist_ok=True)
+        manifest = load_manifest(directory)
+        _finish_pending(manifest, directory)
+
+        archived = 0
+        for source, model in ((ROWS, AuditLog), (COMPACT, AuditChange)):
+            while True:
+                batch = (
+                    model.query.filter(model.changed_at < cutoff)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                archived += _archive_batch(manifest, directory, source, batch)
+
+        horizon = cutoff.isoformat()
+        if not manifest['archived_before'] or manifest['archived_before'] < horizon:
+            manifest['archived_before'] = horizon
+        save_manifest(manifest, directory)
+        current_app.logger.info(f'Archived {archived} audit entries older than {horizon}')
+        return archived
+    finally:
+        _archive_lock.release()
+
+def get_history_page(limit, cursor=None, **filters):
+    """``AuditLog.get_page`` that also reads archived partitions when the page reaches them.
+
+    The archive is only opened when the database cannot fill the page on
+    its own from entries newer than the archive horizon.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    fetch = limit + 1 if limit else None
+    records = AuditLog.get_records(fetch, position, **filters)
+
+    manifest = read_manifest()
+    horizon = manifest.get('archived_before')
+    if horizon and manifest['partitions']:
+        horizon = datetime.fromisoformat(horizon)
+        since = filters.get('since')
+        entries = sum(len(record[3]) for record in records)
+        oldest = min((record[0] for record in records), default=None)
+        reaches_archive = not since or since < horizon
+        if reaches_archive and (not limit or entries < fetch or (oldest and oldest < horizon)):
+            records += archived_records(manifest, fetch, position, **filters)
+
+    return page_from_records(records, limit)
+
+def archived_records(manifest, fetch, position=None, asset_tag=None, changed_by=None, action_type=None,
+                     location_id=None, since=None, until=None):
+    """Read up to ``fetch`` matching records from the archive, newest first.
+
+    Archived batches are read newest first, one gzip member at a time, and
+    only the newest ``fetch`` matching records are kept. Reading stops once
+    the page is full and the remaining batches are all older than it.
+    """
+    directory = archive_dir()
+    conditions = {'asset_tag': asset_tag, 'changed_by': changed_by, 'action_type': action_type}
+    members = []
+    for month, partition in manifest['partitions'].items():
+        path = os.path.join(directory, partition['file'])
+        # Partitions written before members were recorded are read as one stream
+        for member in partition.get('members') or [dict(partition, offset=0, length=None)]:
+            members.append((member['max_changed_at'], member['min_changed_at'], path, member['offset'], member['length']))
+
+    heap = []
+    for max_changed_at, min_changed_at, path, offset, length in sorted(members, reverse=True):
+        if since and max_changed_at < since.isoformat():
+            break
+        if fetch and len(heap) >= fetch and max_changed_at < heap[0][0][0].isoformat():
+            break
+        if until and min_changed_at >= until.isoformat():
+            continue
+        if position and min_changed_at > position[0].isoformat():
+            continue
+        for key, documents in _read_member(path, offset, length):
+            first = documents[0]
+            if any(value and first[field] != value for field, value in conditions.items()):
+                continue
+            if location_id is not None and first['location_id'] != location_id:
+                continue
+            changed_at = key[0]
+            if (since and changed_at < since) or (until and changed_at >= until):
+                continue
+            if position and key >= (position[0], RANKS[position[2]], position[1]):
+                continue
+            if not fetch or len(heap) < fetch:
+                heapq.heappush(heap, (key, documents))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, documents))
+    return [(*key, _entries(key, documents)) for key, documents in sorted(heap, key=lambda item: item[0], reverse=True)]
+
+def iter_field_changes(since, fields):
+    """``AuditLog.iter_field_changes`` followed by archived changes older than the database's."""
+    yield from AuditLog.iter_field_changes(since, fields)
+    manifest = read_manifest()
+    if not manifest.get('archived_before') or manifest['archived_before'] < since.isoformat():
+        return
+    # Archived entries all predate the archive horizon, so they follow the live ones
+    for record in archived_records(manifest, None, since=since):
+        for entry in record[3]:
+            if entry.asset_tag and entry.action_type == 'UPDATE' and entry.field_name in fields:
+                yield entry.asset_tag, entry.field_name, entry.old_value, entry.changed_at
+
+def _archive_batch(manifest, directory, source, batch):
+    """Append one batch to its monthly files, then delete it from the database."""
+    months = {}
+    for row in batch:
+        entries = row.entries() if source == COMPACT else [row]
+        lines = months.setdefault(row.changed_at.strftime('%Y-%m'), [])
+        for entry in entries:
+            document = {field: getattr(entry, field) for field in ENTRY_FIELDS}
+            document.update(source=source, id=row.id, changed_at=row.changed_at.isoformat())
+            lines.append(json.dumps(document, separators=(',', ':')))
+
+    # Recorded before appending, with the file sizes to roll back to if the
+    # run stops before the batch is marked written
+    sizes = {}
+    for month in months:
+        path = os.path.join(directory, f'audit-{month}.ndjson.gz')
+        sizes[f'audit-{month}.ndjson.gz'] = os.path.getsize(path) if os.path.exists(path) else 0
+    manifest['pending'] = {'source': source, 'ids': [row.id for row in batch], 'files': sizes, 'written': False}
+    save_manifest(manifest, directory)
+
+    for month, lines in months.items():
+        filename = f'audit-{month}.ndjson.gz'
+        # Each append adds a gzip member; readers see one continuous stream
+        path = os.path.join(directory, filename)
+        with gzip.open(path, 'at', encoding='utf-8') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        times = [row.changed_at.isoformat() for row in batch if row.changed_at.strftime('%Y-%m') == month]
+        partition = manifest['partitions'].setdefault(month, {
+            'file': filename, 'entries': 0, 'min_changed_at': min(times), 'max_changed_at': max(times), 'members': []
+        })
+        if 'members' not in partition:
+            # Appended before members were recorded
+            partition['members'] = [{'offset': 0, 'length': sizes[filename], 'min_changed_at': partition['min_changed_at'],
+                                     'max_changed_at': partition['max_changed_at']}]
+        # Lets readers seek to one batch instead of decompressing the month
+        partition['members'].append({
+            'offset': sizes[filename], 'length': os.path.getsize(path) - sizes[filename],
+            'min_changed_at': min(times), 'max_changed_at': max(times)
+        })
+        partition['entries'] += len(lines)
+        partition['min_changed_at'] = min(partition['min_changed_at'], min(times))
+        partition['max_changed_at'] = max(partition['max_changed_at'], max(times))
+
+    manifest['pending']['written'] = True
+    save_manifest(manifest, directory)
+    _finish_pending(manifest, directory)
+    return sum(len(lines) for lines in months.values())
+
+def _finish_pending(manifest, directory):
+    """Delete the rows of a batch written to the archive, or roll back a partly written one."""
+    pending = manifest.get('pending')
+    if not pending:
+        return
+    if not pending.get('written', True):
+        # The rows are still in the database and will be archived again
+        for filename, size in pending['files'].items():
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                with open(path, 'r+b') as fh:
+                    fh.truncate(size)
+        manifest['pending'] = None
+        save_manifest(manifest, directory)
+        return
+    model = AuditChange if pending['source'] == COMPACT else AuditLog
+    for start in range(0, len(pending['ids']), 1000):
+        ids = pending['ids'][start:start + 1000]
+        db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    manifest['pending'] = None
+    save_manifest(manifest, directory)
+
+@lru_cache(maxsize=4)
+def _cached_manifest(path, mtime):
+    with open(path) as fh:
+        return json.load(fh)
+
+def _read_member(path, offset, length):
+    """Yield ``(key, documents)`` per archived record of one gzip member (or the whole file)."""
+    if length is None:
+        fh = gzip.open(path, 'rt', encoding='utf-8')
+    else:
+        with open(path, 'rb') as raw:
+            raw.seek(offset)
+            fh = io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(raw.read(length))), encoding='utf-8')
+    with fh:
+        key, documents = None, []
+        # The entries of one compact change set are written consecutively
+        for line in fh:
+            document = json.loads(line)
+            line_key = (datetime.fromisoformat(document['changed_at']), RANKS[document['source']], document['id'])
+            if line_key != key:
+                if documents:
+                    yield key, documents
+                key, documents = line_key, []
+            documents.append(document)
+        if documents:
+            yield key, documents
+
+def _entries(key, documents):
+    """Build the detached audit entries of one archived record."""
+    entries = []
+    for document in documents:
+        entry = AuditLog(changed_at=key[0], **{field: document[field] for field in ENTRY_FIELDS})
+        entry.archived = True
+        if document['source'] == COMPACT:
+            entry.change_id = document['id']
+        else:
+            entry.id = document['id']
+        entries.append(entry)
+    return entries
@@ -0,0 +1,351 @@
+"""Automatic audit logging for inventory and location changes."""
+import atexit
+import json
+import os
+import threading
+from datetime import date, datetime
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.audit import AuditChange, AuditLog, AuditUser, AuditUserAgent
+from ..models.inventory import Inventory
+from ..models.location import Location
+
+AUDITED_MODELS = (Inventory, Location)
+SKIPPED_FIELDS = {'id', 'created_at', 'updated_at', 'version_id'}
+SYSTEM_USER = 'system'
+
+# Dictionary ids committed to the database, keyed by (database URL, table, value)
+_dictionary_cache = {}
+_dictionary_lock = threading.Lock()
+
+class AuditWriter:
+    """Buffers committed audit rows and writes them in batches from a background thread.
+
+    A batch is written once ``batch_size`` rows are waiting or every
+    ``interval`` seconds, whichever comes first. Rows are written outside the
+    request's transaction, so a crash can lose at most the buffered rows.
+    """
+
+    def __init__(self, app, batch_size=500, interval=2.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self._rows = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, rows):
+        """Queue rows for the next batch."""
+        with self._lock:
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        """Number of rows waiting to be written."""
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        """Write every buffered row in one multi-row insert; returns the row count."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        dictionary = {}
+        try:
+            with self.app.app_context():
+                from ..models import db
+                with db.engine.begin() as conn:
+                    write_rows(conn, rows, dictionary, compact=_compact(self.app))
+            _promote(dictionary)
+        except Exception as e:
+            self.app.logger.error(f'Error writing {len(rows)} audit rows: {str(e)}')
+            # Keep the rows for the next attempt
+            with self._lock:
+                self._rows[:0] = rows
+            return 0
+        return len(rows)
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+def init_app(app):
+    """Register the audit capture hooks and, in async mode, the buffered writer."""
+    if not event.contains(Session, 'before_flush', _capture_changes):
+        event.listen(Session, 'before_flush', _capture_changes)
+        event.listen(Session, 'after_flush', _write_changes)
+        event.listen(Session, 'after_commit', _hand_off)
+        event.listen(Session, 'after_rollback', _discard)
+        # Load the previous value on assignment even when the attribute was
+        # expired, so the flush hook always sees the old value
+        for model in AUDITED_MODELS:
+            for column in model.__table__.columns:
+                if column.key not in SKIPPED_FIELDS:
+                    event.listen(getattr(model, column.key), 'set', _keep_old_value, active_history=True)
+
+    if app.config.get('AUDIT_WRITER', 'sync') == 'async' and 'audit_writer' not in app.extensions:
+        writer = AuditWriter(
+            app,
+            batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+            interval=app.config.get('AUDIT_FLUSH_INTERVAL', 2.0)
+        )
+        app.extensions['audit_writer'] = writer
+        atexit.register(writer.flush)
+
+def flush_audit_writer(app):
+    """Write any buffered audit rows now (no-op in sync mode)."""
+    writer = app.extensions.get('audit_writer')
+    return writer.flush() if writer else 0
+
+def record(session, rows):
+    """Write prepared audit rows for the current transaction in one multi-row insert.
+
+    Used by set-based write paths that bypass the ORM unit of work; rows
+    need the same keys as those produced by the flush hooks.
+    """
+    if not rows or not _enabled():
+        return
+    writer = _writer()
+    if writer is not None:
+        session.info.setdefault('audit_committed', []).extend(rows)
+    else:
+        dictionary = session.info.setdefault('audit_dictionary', {})
+        write_rows(session.connection(), rows, dictionary, compact=has_app_context() and _compact(current_app))
+
+def change_rows(model, action_type, values, changes=None, changed_at=None):
+    """Audit rows for one entity changed outside the unit of work, to pass to ``record``.
+    
+    ``values`` are the entity's column values (after a create, before a
+    delete); ``changes`` maps each updated field to ``(old, new)``.
+    """
+    base = dict(
+        audit_context(),
+        asset_tag=values.get('asset_tag') if model is Inventory else None,
+        location_id=values.get('location_id') if model is Inventory else values.get('id'),
+        changed_at=changed_at or datetime.utcnow()
+    )
+    if action_type == 'UPDATE':
+        return [
+            dict(base, action_type='UPDATE', field_name=field_name, old_value=_format(old), new_value=_format(new))
+            for field_name, (old, new) in changes.items()
+            if field_name not in SKIPPED_FIELDS and _format(old) != _format(new)
+        ]
+    snapshot = json.dumps({
+        column.key: _format(values.get(column.key))
+        for column in model.__table__.columns
+        if column.key not in SKIPPED_FIELDS
+    }, sort_keys=True)
+    if action_type == 'CREATE':
+        return [dict(base, action_type='CREATE', field_name='item', old_value=None, new_value=snapshot)]
+    return [dict(base, action_type='DELETE', field_name='item', old_value=snapshot, new_value=None)]
+
+def write_rows(conn, rows, dictionary, compact=False):
+    """Insert per-field audit rows, as is or folded into compact change sets.
+
+    Dictionary ids inserted on this connection are added to ``dictionary``;
+    they become shared only once the transaction commits.
+    """
+    if compact:
+        conn.execute(insert(AuditChange.__table__), change_sets(conn, rows, dictionary))
+    else:
+        conn.execute(insert(AuditLog.__table__), rows)
+
+def change_sets(conn, rows, dictionary):
+    """Fold per-field rows into one compact row per entity change."""
+    users = _dictionary_ids(conn, AuditUser.__table__.c.email, {row['changed_by'] for row in rows}, dictionary)
+    agents = _dictionary_ids(
+        conn, AuditUserAgent.__table__.c.user_agent, {row['user_agent'] for row in rows} - {None}, dictionary
+    )
+    grouped = {}
+    for row in rows:
+        key = (row['action_type'], row.get('asset_tag'), row.get('location_id'), row['changed_by'],
+               row.get('ip_address'), row.get('user_agent'), row.get('changed_at'))
+        grouped.setdefault(key, {})[row['field_name']] = [row.get('old_value'), row.get('new_value')]
+    return [
+        {
+            'action_type': action_type,
+            'asset_tag': asset_tag,
+            'location_id': location_id,
+            'user_id': users[changed_by],
+            'user_agent_id': agents.get(user_agent),
+            'ip_address': ip_address,
+            'changed_at': changed_at or datetime.utcnow(),
+            'changes': json.dumps(changes, separators=(',', ':'))
+        }
+        for (action_type, asset_tag, location_id, changed_by, ip_address, user_agent, changed_at), changes
+        in grouped.items()
+    ]
+
+def clear_dictionary_cache():
+    """Forget cached user and user agent ids (e.g. after recreating the tables)."""
+    with _dictionary_lock:
+        _dictionary_cache.clear()
+
+def _dictionary_ids(conn, column, values, dictionary):
+    """Map values to dictionary ids, inserting the missing ones on ``conn``."""
+    url = str(conn.engine.url)
+    ids = {}
+    with _dictionary_lock:
+        for value in values:
+            key = (url, column.table.name, value)
+            if key in _dictionary_cache:
+                ids[value] = _dictionary_cache[key]
+    for value in values:
+        key = (url, column.table.name, value)
+        if value not in ids and key in dictionary:
+            ids[value] = dictionary[key]
+
+    missing = [value for value in values if value not in ids]
+    if missing:
+        ids.update(conn.execute(select(column, column.table.c.id).where(column.in_(missing))).all())
+    for value in missing:
+        if value in ids:
+            continue
+        try:
+            # Another worker may insert the same value concurrently
+            with conn.begin_nested():
+                conn.execute(insert(column.table).values({column.key: value}))
+        except IntegrityError:
+            pass
+        ids[value] = conn.execute(select(column.table.c.id).where(column == value)).scalar_one()
+
+    for value in missing:
+        dictionary[(url, column.table.name, value)] = ids[value]
+    return ids
+
+def _promote(dictionary):
+    with _dictionary_lock:
+        _dictionary_cache.update(dictionary)
+
+def audit_context():
+    """Who made the change: user, IP address and user agent from the request."""
+    user = g.get('user') if has_app_context() else None
+    context = {
+        'changed_by': (user or {}).get('id') or SYSTEM_USER,
+        'ip_address': None,
+        'user_agent': None
+    }
+    if has_request_context():
+        context['ip_address'] = request.remote_addr
+        context['user_agent'] = request.user_agent.string[:200] or None
+    return context
+
+def _compact(app):
+    return app.config.get('AUDIT_FORMAT', 'rows') == 'compact'
+
+def _enabled():
+    return not has_app_context() or current_app.config.get('ENABLE_AUDIT_LOGGING', True)
+
+def _writer():
+    return current_app.extensions.get('audit_writer') if has_app_context() else None
+
+def _format(value):
+    """Render a column value for the audit log's text columns."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+def audited_state(obj):
+    """All audited column values of an object, formatted as the audit log stores them."""
+    return {
+        column.key: _format(getattr(obj, column.key))
+        for column in obj.__table__.columns
+        if column.key not in SKIPPED_FIELDS
+    }
+
+def _snapshot(obj):
+    """All audited column values of an object as a JSON document."""
+    return json.dumps(audited_state(obj), sort_keys=True)
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+def _capture_changes(session, flush_context, instances):
+    """Collect attribute changes before the flush while their history is still available."""
+    if not _enabled():
+        return
+    pending = session.info.setdefault('audit_pending', [])
+
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            pending.append((obj, 'CREATE', 'item', None, None))
+
+    for obj in session.dirty:
+        if not isinstance(obj, AUDITED_MODELS) or not session.is_modified(obj, include_collections=False):
+            continue
+        state = inspect(obj)
+        for column in obj.__table__.columns:
+            if column.key in SKIPPED_FIELDS:
+                continue
+            history = state.attrs[column.key].history
+            if not history.has_changes():
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            if old != new:
+                pending.append((obj, 'UPDATE', column.key, _format(old), _format(new)))
+
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            pending.append((obj, 'DELETE', 'item', _snapshot(obj), None))
+
+def _write_changes(session, flush_context):
+    """Turn the collected changes into audit rows once new objects have ids."""
+    pending = session.info.pop('audit_pending', None)
+    if not pending:
+        return
+
+    context = audit_context()
+    changed_at = datetime.utcnow()
+    rows = []
+    for obj, action_type, field_name, old_value, new_value in pending:
+        if action_type == 'CREATE':
+            new_value = _snapshot(obj)
+        rows.append(dict(
+            context,
+            action_type=action_type,
+            field_name=field_name,
+            old_value=old_value,
+            new_value=new_value,
+            asset_tag=obj.asset_tag if isinstance(obj, Inventory) else None,
+            location_id=obj.location_id if isinstance(obj, Inventory) else obj.id,
+            changed_at=changed_at
+        ))
+    record(session, rows)
+
+def _hand_off(session):
+    _promote(session.info.pop('audit_dictionary', {}))
+    rows = session.info.pop('audit_committed', None)
+    writer = _writer()
+    if rows and writer is not None:
+        writer.add(rows)
+
+def _discard(session):
+    session.info.pop('audit_dictionary', None)
+    session.info.pop('audit_pending', None)
+    session.info.pop('audit_committed', None)
@@ -0,0 +1,198 @@
+"""Set-based bulk inventory operations selected by filter."""
+import threading
+import uuid
+from datetime import datetime
+from flask import current_app, g
+from sqlalchemy import DateTime, delete, or_, select, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from ..models import db
+from ..models.inventory import Inventory
+from ..models.location import Location
+from . import audit
+
+FILTERS = ('asset_tags', 'location_id', 'site_name', 'asset_type', 'status', 'is_loaner')
+
+# Background location deletions of this process, by job id
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+class utcnow(FunctionElement):
+    """The database server's current UTC time."""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # CURRENT_TIMESTAMP is UTC on SQLite
+    return 'CURRENT_TIMESTAMP'
+
+@compiles(utcnow, 'mssql')
+def _utcnow_mssql(element, compiler, **kw):
+    return 'GETUTCDATE()'
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "(NOW() AT TIME ZONE 'utc')"
+
+def inventory_filter(spec):
+    """SQL conditions for a bulk filter; raises ValueError on unknown or empty filters.
+
+    Filters are ``asset_tags`` (list), ``location_id``, ``site_name``,
+    ``asset_type``, ``status`` and ``is_loaner``; all given ones must match.
+    """
+    unknown = set(spec) - set(FILTERS)
+    if unknown:
+        raise ValueError(f'Unknown filters: {", ".join(sorted(unknown))}')
+    conditions = []
+    if spec.get('asset_tags') is not None:
+        if not isinstance(spec['asset_tags'], list):
+            raise ValueError('asset_tags must be a list')
+        conditions.append(Inventory.asset_tag.in_(spec['asset_tags']))
+    if spec.get('location_id') is not None:
+        conditions.append(Inventory.location_id == spec['location_id'])
+    if spec.get('site_name'):
+        conditions.append(Inventory.location_id.in_(select(Location.id).where(Location.site_name == spec['site_name'])))
+    if spec.get('asset_type'):
+        conditions.append(Inventory.asset_type == spec['asset_type'])
+    if spec.get('status'):
+        conditions.append(Inventory.status == spec['status'])
+    if spec.get('is_loaner') is not None:
+        conditions.append(Inventory.is_loaner == bool(spec['is_loaner']))
+    if not conditions:
+        raise ValueError('A filter is required')
+    return conditions
+
+def transition_inventory(spec, status, chunk_size=None):
+    """Set ``status`` on every item matching the filter; returns the number changed.
+
+    Runs one ``UPDATE`` per chunk of ids; moving to ``decommissioned`` also
+    sets ``date_decommissioned`` to the server's time. The audit rows for
+    all chunks are recorded as one batch. The caller commits.
+    """
+    conditions = inventory_filter(spec) + [or_(Inventory.status != status, Inventory.status.is_(None))]
+    decommission = status == 'decommissioned'
+    values = {'status': status, 'updated_at': datetime.utcnow(), 'version_id': Inventory.version_id + 1}
+    if decommission:
+        values['date_decommissioned'] = utcnow()
+
+    rows = []
+    count = 0
+    columns = (Inventory.id, Inventory.asset_tag, Inventory.location_id, Inventory.status,
+               Inventory.date_decommissioned)
+    for chunk in _chunks(conditions, columns, chunk_size):
+        ids = [row.id for row in chunk]
+        db.session.execute(update(Inventory).where(Inventory.id.in_(ids)).values(values),
+                           execution_options={'synchronize_session': False})
+        dates = {}
+        if decommission:
+            dates = dict(db.session.execute(
+                select(Inventory.id, Inventory.date_decommissioned).where(Inventory.id.in_(ids))
+            ).all())
+        for row in chunk:
+            changes = {'status': (row.status, status)}
+            if decommission:
+                changes['date_decommissioned'] = (row.date_decommissioned, dates.get(row.id))
+            rows += audit.change_rows(Inventory, 'UPDATE', row._asdict(), changes, changed_at=values['updated_at'])
+        count += len(chunk)
+    audit.record(db.session, rows)
+    return count
+
+def delete_inventory(spec, chunk_size=None, max_chunks=None):
+    """Delete every item matching the filter; returns the number deleted.
+
+    Runs one ``DELETE`` per chunk of ids and records the audit rows (with a
+    snapshot of each item) as one batch. ``max_chunks`` stops early so the
+    caller can commit in between. The caller commits.
+    """
+    rows = []
+    count = 0
+    changed_at = datetime.utcnow()
+    chunks = _chunks(inventory_filter(spec), tuple(Inventory.__table__.columns), chunk_size)
+    for n, chunk in enumerate(chunks, 1):
+        db.session.execute(delete(Inventory).where(Inventory.id.in_([row.id for row in chunk])),
+                           execution_options={'synchronize_session': False})
+        for row in chunk:
+            rows += audit.change_rows(Inventory, 'DELETE', row._asdict(), changed_at=changed_at)
+        count += len(chunk)
+        if max_chunks and n >= max_chunks:
+            break
+    audit.record(db.session, rows)
+    return count
+
+def delete_location_cascade(location_id, chunk_size=None, progress=None):
+    """Delete a location and its inventory with chunked set-based deletes.
+
+    Replaces the ORM cascade, which loads every item of the location and
+    deletes them one by one. With ``progress`` (a dict that receives the
+    running counts), each chunk commits on its own so long deletions keep
+    transactions short; otherwise the caller commits once. Returns the
+    ``inventory_deleted`` and ``locations_deleted`` counts.
+    """
+    counts = progress if progress is not None else {}
+    counts.update(inventory_deleted=0, locations_deleted=0)
+    while True:
+        deleted = delete_inventory({'location_id': location_id}, chunk_size, max_chunks=1 if progress is not None else None)
+        counts['inventory_deleted'] += deleted
+        if progress is None or not deleted:
+            break
+        db.session.commit()
+
+    location = db.session.execute(select(Location.__table__).where(Location.id == location_id)).first()
+    if location is not None:
+        db.session.execute(delete(Location).where(Location.id == location_id),
+                           execution_options={'synchronize_session': False})
+        audit.record(db.session, audit.change_rows(Location, 'DELETE', location._asdict()))
+        counts['locations_deleted'] = 1
+    if progress is not None:
+        db.session.commit()
+    return {'inventory_deleted': counts['inventory_deleted'], 'locations_deleted': counts['locations_deleted']}
+
+def start_location_delete(location_id):
+    """Run ``delete_location_cascade`` in a background thread; returns the job (see ``get_job``).
+
+    Jobs live in this process only, so their status is served by the worker
+    that started them.
+    """
+    job = {'id': uuid.uuid4().hex, 'location_id': location_id, 'state': 'running',
+           'inventory_deleted': 0, 'locations_deleted': 0, 'error': None}
+    with _jobs_lock:
+        _jobs[job['id']] = job
+    app = current_app._get_current_object()
+    user = g.get('user')
+
+    def run():
+        try:
+            with app.app_context():
+                # Audit rows name the admin who started the job
+                g.user = user
+                delete_location_cascade(location_id, progress=job)
+            job['state'] = 'done'
+        except Exception as e:
+            app.logger.error(f'Background delete of location {location_id} failed: {str(e)}')
+            job.update(state='failed', error=str(e))
+
+    threading.Thread(target=run, name=f'location-delete-{location_id}', daemon=True).start()
+    return dict(job)
+
+def get_job(job_id):
+    """Snapshot of a background location deletion, or None if unknown here."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def _chunks(conditions, columns, chunk_size=None):
+    """Yield the matching rows in chunks of ids, walking the id keyset."""
+    chunk_size = chunk_size or current_app.config.get('BULK_CHUNK_SIZE', 1000)
+    last_id = 0
+    while True:
+        chunk = db.session.execute(
+            select(*columns)
+            .where(*conditions, Inventory.id > last_id)
+            .order_by(Inventory.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
@@ -0,0 +1,317 @@
+"""Read cache utilities."""
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from ..models import db
+from ..models.session import RoutingSession, _use_replica
+
+class CacheEntry:
+    """A cached value with the time it was computed."""
+
+    __slots__ = ('value', 'stored_at', 'stale')
+
+    def __init__(self, value):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.stale = False
+
+    @property
+    def age(self):
+        """Seconds since the value was computed."""
+        return time.monotonic() - self.stored_at
+
+class ReadCache:
+    """In-process cache for expensive, JSON-ready read payloads.
+
+    Entries expire after their TTL and are marked stale whenever this process
+    commits a write: plain cached reads then recompute, stale-while-revalidate
+    reads keep serving the old value while it refreshes in the background.
+    Other workers catch up within the TTL.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidate/clear, so late writers can tell their value is outdated
+        self._generation = 0
+
+    def entry(self, key):
+        """Get the raw entry for a key, or None."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def get(self, key, ttl):
+        """Get a cached value, or None when missing, stale or older than ``ttl``."""
+        entry = self.entry(key)
+        if entry is None or entry.stale or entry.age > ttl:
+            return None
+        return entry.value
+
+    def set(self, key, value, generation=None):
+        """Store a value; returns False (storing nothing) when ``generation`` is no longer current."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._entries[key] = CacheEntry(value)
+            return True
+
+    def generation(self):
+        """Current generation; pass it to ``set`` for values computed from earlier reads."""
+        with self._lock:
+            return self._generation
+
+    def size(self):
+        """Number of stored entries."""
+        with self._lock:
+            return len(self._entries)
+
+    def invalidate(self):
+        """Mark every entry stale."""
+        with self._lock:
+            self._generation += 1
+            for entry in self._entries.values():
+                entry.stale = True
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+class _Call:
+    """An in-flight computation other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run one computation per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def do(self, key, fn, timeout, metric=None):
+        """Run ``fn`` or wait up to ``timeout`` seconds for the identical in-flight call.
+
+        A caller that times out computes the value itself rather than failing.
+        """
+        metric = metric or key
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(metric, 'leaders' if leader else 'coalesced')
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._count(metric, 'timeouts')
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def metrics(self):
+        """Get counters per metric name."""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._metrics.items()}
+
+    def _count(self, metric, name):
+        counts = self._metrics.setdefault(metric, {'leaders': 0, 'coalesced': 0, 'timeouts': 0})
+        counts[name] += 1
+
+cache = ReadCache()
+single_flight = SingleFlight()
+_warmers = []
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def cached(namespace, warm=False):
+    """Decorator caching a payload builder's return value per arguments.
+
+    Builders marked ``warm`` are run by ``warm_caches`` before a worker
+    takes traffic.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            ttl = current_app.config.get('READ_CACHE_TTL', 30)
+            if not ttl:
+                return f(*args, **kwargs)
+            key = (namespace, args, tuple(sorted(kwargs.items())))
+            value = cache.get(key, ttl)
+            if value is None:
+                value = f(*args, **kwargs)
+                cache.set(key, value)
+            return value
+        if warm:
+            _warmers.append((namespace, decorated))
+        return decorated
+    return decorator
+
+def stale_while_revalidate(namespace, warm=False):
+    """Decorator serving a payload builder's cached value while it refreshes.
+
+    Within ``SWR_SOFT_TTL`` the cached value is returned as is. Past it (or
+    after a local write) the cached value is still returned immediately and
+    one background thread recomputes it. Only past ``SWR_HARD_TTL``, or on a
+    cold cache, does the caller wait for the computation. The age of the
+    returned value is available from ``cache_age()``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            app = current_app._get_current_object()
+            soft_ttl = app.config.get('SWR_SOFT_TTL', 5)
+            hard_ttl = app.config.get('SWR_HARD_TTL', 60)
+            if not hard_ttl:
+                _set_age(0)
+                return f(*args, **kwargs)
+
+            key = (namespace, args, tuple(sorted(kwargs.items())))
+            entry = cache.entry(key)
+            if entry is None or entry.age > hard_ttl:
+                value = f(*args, **kwargs)
+                cache.set(key, value)
+                _set_age(0)
+                return value
+
+            if entry.stale or entry.age > soft_ttl:
+                _revalidate(app, key, f, args, kwargs)
+            _set_age(entry.age)
+            return entry.value
+        if warm:
+            _warmers.append((namespace, decorated))
+        return decorated
+    return decorator
+
+def cache_age():
+    """Age in whole seconds of the last cached value served in this request."""
+    return int(g.get('cache_age', 0))
+
+def _set_age(age):
+    if has_request_context():
+        g.cache_age = age
+
+def _revalidate(app, key, f, args, kwargs):
+    """Recompute a cache entry in a background thread (one refresh per key).
+
+    A value whose computation overlapped a write's invalidation is dropped,
+    since it may predate that write; the entry stays stale for the next read.
+    """
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            generation = cache.generation()
+            with app.app_context():
+                cache.set(key, f(*args, **kwargs), generation)
+        except Exception as e:
+            app.logger.warning(f'Background refresh of {key[0]} failed: {str(e)}')
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, name=f'swr-{key[0]}', daemon=True).start()
+
+def coalesced(f):
+    """Decorator sharing one response between concurrent identical GET requests.
+
+    Requests are identical when they hit the same endpoint with the same
+    query arguments and the same user roles, and read from the same database:
+    a user pinned to the primary after a write must not get a replica read.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.headers.get('X-Profile') == '1':
+            return f(*args, **kwargs)
+        user = g.get('user') or {}
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            tuple(sorted(user.get('roles', []))),
+            _use_replica()
+        )
+        app = current_app._get_current_object()
+
+        def compute():
+            response = app.make_response(f(*args, **kwargs))
+            return response.get_data(), response.status_code, list(response.headers.items())
+
+        timeout = app.config.get('SINGLE_FLIGHT_TIMEOUT', 10)
+        body, status, headers = single_flight.do(key, compute, timeout, metric=request.endpoint)
+        return app.response_class(body, status=status, headers=headers)
+    return decorated
+
+def warm_caches():
+    """Run every warm-up payload builder; returns {namespace: seconds}."""
+    timings = {}
+    for namespace, builder in _warmers:
+        start = time.perf_counter()
+        builder()
+        timings[namespace] = time.perf_counter() - start
+    return timings
+
+def warm_up(app):
+    """Prime the connection pool, compiled statements and read caches.
+
+    Runs before a worker accepts traffic; returns the elapsed seconds.
+    Failures are logged and never keep the worker from starting.
+    """
+    from .db import warm_pool
+
+    start = time.perf_counter()
+    try:
+        connections, _ = warm_pool(app)
+        with app.app_context():
+            # Running the builders also fills SQLAlchemy's compiled statement cache
+            timings = warm_caches()
+            db.session.remove()
+    except Exception as e:
+        app.logger.warning(f'Warm-up failed after {(time.perf_counter() - start) * 1000:.0f} ms: {str(e)}')
+        return time.perf_counter() - start
+
+    elapsed = time.perf_counter() - start
+    details = ', '.join(f'{namespace}={seconds * 1000:.0f}ms' for namespace, seconds in timings.items())
+    app.logger.info(f'Warm-up finished in {elapsed * 1000:.0f} ms ({connections} connections; {details})')
+    return elapsed
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flagged_write(session, flush_context):
+    session.info['read_cache_dirty'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _flagged_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['read_cache_dirty'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _clear_on_commit(session):
+    if session.info.pop('read_cache_dirty', False):
+        cache.invalidate()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('read_cache_dirty', None)
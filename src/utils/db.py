@@ -1,17 +1,129 @@
 """Database utilities."""
-from flask import current_app
-from sqlalchemy import text
+import logging
+import time
+from functools import wraps
+from flask import current_app, g
+from sqlalchemy import event, text
+from ..config import get_engine_profile
 from ..models import db
+from . import audit
+
+logger = logging.getLogger(__name__)
 
 def init_db(app):
     """Initialize database."""
     # Don't initialize SQLAlchemy again if it's already initialized
     if not hasattr(app, 'extensions') or 'sqlalchemy' not in app.extensions:
+        profile = get_engine_profile(app.config)
+
+        # Explicit SQLALCHEMY_ENGINE_OPTIONS win over the profile defaults
+        engine_options = dict(profile.get('engine_options', {}))
+        engine_options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+        # Binds (e.g. the read replica) may use a different backend, so each gets its own profile
+        binds = {}
+        for key, value in app.config.get('SQLALCHEMY_BINDS', {}).items():
+            if isinstance(value, str):
+                value = dict(get_engine_profile(app.config, uri=value).get('engine_options', {}), url=value)
+            binds[key] = value
+        app.config['SQLALCHEMY_BINDS'] = binds
+
         db.init_app(app)
+        with app.app_context():
+            for engine in db.engines.values():
+                configure_engine(engine, get_engine_profile(app.config, uri=str(engine.url)))
 
 def init_app(app):
     """Initialize database utilities."""
     init_db(app)
+    audit.init_app(app)
+
+def configure_engine(engine, profile):
+    """Attach per-connection tuning from an engine profile."""
+    if engine.dialect.name != 'sqlite' or not profile.get('pragmas'):
+        return
+
+    pragmas = profile['pragmas']
+    optimize_interval = profile.get('optimize_interval')
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value};')
+        cursor.close()
+        connection_record.info['optimized_at'] = time.monotonic()
+
+    if optimize_interval:
+        @event.listens_for(engine, 'checkin')
+        def _periodic_optimize(dbapi_connection, connection_record):
+            # Refresh query planner statistics on long-lived pooled connections
+            if dbapi_connection is None:
+                return
+            last = connection_record.info.get('optimized_at', 0)
+            if time.monotonic() - last < optimize_interval:
+                return
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute('PRAGMA optimize;')
+                cursor.close()
+            except Exception as e:
+                logger.warning(f'PRAGMA optimize failed: {str(e)}')
+            connection_record.info['optimized_at'] = time.monotonic()
+
+def dispose_engines(app, close=True):
+    """Drop all pooled connections.
+
+    In a forked child pass ``close=False`` so the parent's sockets are
+    discarded without being closed (or shared) by the child.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+def warm_pool(app, connections=None):
+    """Open pooled connections up front so the first requests skip the connect cost.
+
+    Returns the number of connections opened and the time it took in seconds.
+    """
+    start = time.perf_counter()
+    warmed = 0
+    with app.app_context():
+        for engine in db.engines.values():
+            size = connections or app.config.get('DB_POOL_WARM_CONNECTIONS') or _pool_size(engine)
+            opened = []
+            try:
+                for _ in range(size):
+                    conn = engine.connect()
+                    opened.append(conn)
+                    conn.execute(text('SELECT 1'))
+            finally:
+                for conn in opened:
+                    conn.close()
+            warmed += len(opened)
+    return warmed, time.perf_counter() - start
+
+def pool_status(app):
+    """Get pool statistics for every engine."""
+    with app.app_context():
+        return {key or 'primary': engine.pool.status() for key, engine in db.engines.items()}
+
+def _pool_size(engine):
+    """Configured pool size, or 1 for pools without a fixed size."""
+    size = getattr(engine.pool, 'size', None)
+    return size() if callable(size) else 1
+
+def read_replica(f):
+    """Decorator to serve a read-only route from the replica bind when configured."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_only = False
+    return decorated
 
 def health_check():
     """Check database connection."""
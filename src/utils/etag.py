@@ -0,0 +1,14 @@
+"""ETags from row versions and ``If-Match`` checks for optimistic concurrency."""
+from flask import request
+
+def with_etag(response, version):
+    """Set a row's ``version_id`` as the response's ETag."""
+    response.set_etag(str(version))
+    return response
+
+def if_match_fails(version):
+    """True when the request sends ``If-Match`` without the row's current version.
+
+    Requests without the header always pass; ``If-Match: *`` matches any version.
+    """
+    return bool(request.if_match) and not request.if_match.contains(str(version))
@@ -0,0 +1,23 @@
+"""Request parsing helpers for paginated listings."""
+from datetime import datetime
+from flask import current_app
+
+def page_size(args):
+    """Get the requested page size, clamped to ``AUDIT_MAX_PAGE_SIZE``.
+
+    Raises ValueError when ``limit`` is not a positive integer.
+    """
+    default = current_app.config.get('AUDIT_PAGE_SIZE', 50)
+    limit = int(args.get('limit', default))
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, current_app.config.get('AUDIT_MAX_PAGE_SIZE', 500))
+
+def time_range(args):
+    """Get the ``since``/``until`` ISO timestamps as datetimes (None when absent).
+
+    Raises ValueError when either is malformed.
+    """
+    since = datetime.fromisoformat(args['since']) if args.get('since') else None
+    until = datetime.fromisoformat(args['until']) if args.get('until') else None
+    return since, until
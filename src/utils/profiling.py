@@ -0,0 +1,86 @@
+"""Request profiling utilities."""
+import cProfile
+import io
+import os
+import pstats
+import time
+from functools import wraps
+from flask import current_app, request
+from .auth import requires_roles
+
+# Sampling profiler is optional
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PROFILE_HEADER = 'X-Profile'
+
+def _profile_dir():
+    """Get directory for profile dumps."""
+    path = current_app.config.get('PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _profile_name():
+    """Build a unique file stem for the current request."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    endpoint = (request.endpoint or 'unknown').replace('.', '-')
+    return f'{stamp}-{endpoint}-{os.getpid()}-{time.perf_counter_ns() % 1000000:06d}'
+
+def _run_cprofile(f, path, name, *args, **kwargs):
+    """Run view under cProfile and dump stats plus a top-N summary."""
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    rv = profiler.runcall(f, *args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    profiler.dump_stats(os.path.join(path, f'{name}.pstats'))
+
+    summary = io.StringIO()
+    summary.write(f'{request.method} {request.full_path} took {elapsed * 1000:.1f} ms\n\n')
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(current_app.config.get('PROFILE_SORT', 'cumulative'))
+    stats.print_stats(current_app.config.get('PROFILE_TOP_N', 30))
+    with open(os.path.join(path, f'{name}.txt'), 'w') as fh:
+        fh.write(summary.getvalue())
+    return rv
+
+def _run_sampling(f, path, name, *args, **kwargs):
+    """Run view under the sampling profiler and dump a text summary."""
+    profiler = pyinstrument.Profiler()
+    profiler.start()
+    try:
+        rv = f(*args, **kwargs)
+    finally:
+        profiler.stop()
+    with open(os.path.join(path, f'{name}.txt'), 'w') as fh:
+        fh.write(profiler.output_text())
+    with open(os.path.join(path, f'{name}.html'), 'w') as fh:
+        fh.write(profiler.output_html())
+    return rv
+
+def profiled(f):
+    """Decorator to profile a request when the X-Profile header is set.
+
+    Profiling is limited to admins; anyone else sending the header gets a
+    403. Requests without it pay nothing beyond a header lookup.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.headers.get(PROFILE_HEADER) != '1' or not current_app.config.get('PROFILING_ENABLED', True):
+            return f(*args, **kwargs)
+
+        @requires_roles('admin')
+        def run(*args, **kwargs):
+            path = _profile_dir()
+            name = _profile_name()
+            use_sampling = pyinstrument is not None and current_app.config.get('PROFILER') == 'sampling'
+            runner = _run_sampling if use_sampling else _run_cprofile
+            response = current_app.make_response(runner(f, path, name, *args, **kwargs))
+            response.headers['X-Profile-Id'] = name
+            current_app.logger.info(f'Profiled {request.endpoint} to {os.path.join(path, name)}')
+            return response
+
+        return run(*args, **kwargs)
+    return decorated
@@ -0,0 +1,159 @@
+"""Daily statistics rollup jobs."""
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+from flask import current_app
+from sqlalchemy import and_, delete, func, insert
+from ..models import db
+from ..models.inventory import Inventory
+from ..models.location import Location
+from ..models.stats import DailyStat
+from .archive import iter_field_changes
+
+# Audited fields that move an asset between rollup buckets
+BUCKET_FIELDS = ('status', 'asset_type', 'location_id')
+UNKNOWN = 'Unknown'
+
+_backfill_lock = threading.Lock()
+
+def _day_bounds(day):
+    """Start and end datetimes of a day."""
+    start = datetime.combine(day, dt_time.min)
+    return start, start + timedelta(days=1)
+
+def _write_day(day, buckets):
+    """Replace the rollup rows for a day."""
+    db.session.execute(delete(DailyStat).where(DailyStat.day == day))
+    rows = [
+        {
+            'day': day,
+            'status': status,
+            'asset_type': asset_type,
+            'site_name': site_name,
+            'asset_count': counts[0],
+            'decommissioned_count': counts[1]
+        }
+        for (status, asset_type, site_name), counts in buckets.items()
+    ]
+    if rows:
+        db.session.execute(insert(DailyStat), rows)
+
+def write_daily_rollup(day=None):
+    """Write today's (or ``day``'s) rollup from the live inventory tables.
+
+    Counts reflect the current state, so run it once at the end of the day;
+    reruns for the same day replace the earlier rows. Returns the bucket count.
+    """
+    day = day or date.today()
+    start, end = _day_bounds(day)
+    keys = (
+        func.coalesce(Inventory.status, UNKNOWN),
+        func.coalesce(Inventory.asset_type, UNKNOWN),
+        func.coalesce(Location.site_name, UNKNOWN)
+    )
+    base = db.session.query(*keys, func.count(Inventory.id)).outerjoin(
+        Location, Inventory.location_id == Location.id
+    )
+
+    buckets = {}
+    for status, asset_type, site_name, count in base.filter(Inventory.created_at < end).group_by(*keys):
+        buckets[(status, asset_type, site_name)] = [count, 0]
+    decommissioned = base.filter(
+        and_(Inventory.date_decommissioned >= start, Inventory.date_decommissioned < end)
+    ).group_by(*keys)
+    for status, asset_type, site_name, count in decommissioned:
+        buckets.setdefault((status, asset_type, site_name), [0, 0])[1] = count
+
+    _write_day(day, buckets)
+    db.session.commit()
+    return len(buckets)
+
+def missing_days(start, end):
+    """Days in a range (up to yesterday) without a stored rollup."""
+    end = min(end, date.today() - timedelta(days=1))
+    if end < start:
+        return []
+    present = DailyStat.get_days(start, end)
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)
+            if start + timedelta(days=n) not in present]
+
+def backfill(start, end=None):
+    """Reconstruct rollups for missing past days from the audit log.
+
+    Starts from the live inventory state and walks the audit log backwards,
+    undoing status, asset type and location changes one day at a time, so
+    the audit rows since ``start`` are read once regardless of how many days
+    are missing. Assets deleted since then cannot be reconstructed and are
+    absent from backfilled days. Returns the list of days written.
+    """
+    days = missing_days(start, end or date.today())
+    if not days:
+        return []
+
+    sites = dict(db.session.query(Location.id, Location.site_name).all())
+    assets = {}
+    columns = (Inventory.asset_tag, Inventory.status, Inventory.asset_type, Inventory.location_id,
+               Inventory.created_at, Inventory.date_decommissioned)
+    for tag, status, asset_type, location_id, created_at, decommissioned_at in \
+            db.session.query(*columns).yield_per(5000):
+        assets[tag] = {
+            'status': status or UNKNOWN,
+            'asset_type': asset_type or UNKNOWN,
+            'location_id': location_id,
+            'created_at': created_at,
+            'decommissioned_on': decommissioned_at.date() if decommissioned_at else None
+        }
+
+    pending = iter_field_changes(_day_bounds(days[0])[0], BUCKET_FIELDS)
+    change = next(pending, None)
+
+    rollups = {}
+    for day in reversed(days):
+        _, end_of_day = _day_bounds(day)
+        # Undo every change made after this day to get its end-of-day state
+        while change is not None and change[3] >= end_of_day:
+            asset_tag, field_name, value, _ = change
+            asset = assets.get(asset_tag)
+            if asset is not None:
+                if field_name == 'location_id':
+                    value = int(value) if value and value.isdigit() else None
+                elif not value:
+                    value = UNKNOWN
+                asset[field_name] = value
+            change = next(pending, None)
+
+        buckets = {}
+        for asset in assets.values():
+            if asset['created_at'] and asset['created_at'] >= end_of_day:
+                continue
+            key = (asset['status'], asset['asset_type'], sites.get(asset['location_id'], UNKNOWN))
+            counts = buckets.setdefault(key, [0, 0])
+            counts[0] += 1
+            if asset['decommissioned_on'] == day:
+                counts[1] += 1
+        rollups[day] = buckets
+
+    # Written after the walk so the streamed audit cursor stays open throughout
+    for day, buckets in rollups.items():
+        _write_day(day, buckets)
+    db.session.commit()
+
+    current_app.logger.info(f'Backfilled {len(days)} daily rollups from {days[0]} to {days[-1]}')
+    return days
+
+def backfill_in_background(start, end):
+    """Start a backfill thread unless one is already running."""
+    if not _backfill_lock.acquire(blocking=False):
+        return False
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                backfill(start, end)
+        except Exception as e:
+            app.logger.error(f'Rollup backfill failed: {str(e)}')
+        finally:
+            _backfill_lock.release()
+
+    threading.Thread(target=run, name='rollup-backfill', daemon=True).start()
+    return True
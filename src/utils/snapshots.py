@@ -0,0 +1,165 @@
+"""Point-in-time asset state from snapshots plus audit deltas."""
+import json
+import threading
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import Boolean, Integer, func, or_
+from ..models import db
+from ..models.audit import AuditChange, AuditLog
+from ..models.inventory import Inventory
+from ..models.snapshot import AssetSnapshot
+from .archive import get_history_page
+from .audit import audited_state
+
+_snapshot_lock = threading.Lock()
+_queued = set()
+
+def state_as_of(item, ts):
+    """Reconstruct an inventory item's audited state at ``ts``.
+
+    Starts from the nearest snapshot at or before ``ts`` and replays the
+    audit entries after it; without one, it starts from the next snapshot
+    after ``ts`` (or the live row) and undoes the entries since ``ts``.
+    Returns ``(state, replayed)``; state is None when the asset did not
+    exist at ``ts``.
+    """
+    before, after = AssetSnapshot.nearest(item.asset_tag, ts)
+    if before is not None:
+        state = before.get_state()
+        entries = _entries(item.asset_tag, before.taken_at, ts)
+        for entry in reversed(entries):
+            state = _apply(state, entry)
+    else:
+        state, upto = (after.get_state(), after.taken_at) if after is not None else (audited_state(item), None)
+        entries = _entries(item.asset_tag, ts, upto)
+        for entry in entries:
+            state = _undo(state, entry)
+    return (_typed(state) if state is not None else None), len(entries)
+
+def write_snapshot(asset_tag):
+    """Snapshot an asset's state as of its latest audit entry; returns the snapshot or None."""
+    item = Inventory.query.filter_by(asset_tag=asset_tag).first()
+    if item is None:
+        return None
+    latest = _latest_change(asset_tag)
+    if latest is None:
+        return None
+    state, _ = state_as_of(item, latest)
+    if state is None:
+        return None
+    snapshot = AssetSnapshot(asset_tag=asset_tag, taken_at=latest, state=json.dumps(_untyped(state), sort_keys=True))
+    db.session.add(snapshot)
+    db.session.commit()
+    return snapshot
+
+def write_due_snapshots(every=None):
+    """Snapshot every asset with at least ``every`` audit entries since its last snapshot.
+
+    Keeps point-in-time queries bounded to about ``every`` replayed entries.
+    Returns the number of snapshots written.
+    """
+    every = every or current_app.config.get('SNAPSHOT_EVERY', 50)
+    written = 0
+    for asset_tag in due_assets(every):
+        if write_snapshot(asset_tag) is not None:
+            written += 1
+    current_app.logger.info(f'Wrote {written} asset snapshots')
+    return written
+
+def due_assets(every):
+    """Asset tags with at least ``every`` audit entries after their latest snapshot."""
+    last = (
+        db.session.query(AssetSnapshot.asset_tag, func.max(AssetSnapshot.taken_at).label('taken_at'))
+        .group_by(AssetSnapshot.asset_tag)
+        .subquery()
+    )
+    counts = {}
+    for model in (AuditLog, AuditChange):
+        rows = (
+            db.session.query(model.asset_tag, func.count(model.id))
+            .outerjoin(last, last.c.asset_tag == model.asset_tag)
+            .filter(model.asset_tag.isnot(None), or_(last.c.taken_at.is_(None), model.changed_at > last.c.taken_at))
+            .group_by(model.asset_tag)
+        )
+        for asset_tag, count in rows:
+            counts[asset_tag] = counts.get(asset_tag, 0) + count
+    return [asset_tag for asset_tag, count in counts.items() if count >= every]
+
+def snapshot_in_background(asset_tag):
+    """Snapshot one asset in a background thread unless it is already queued."""
+    with _snapshot_lock:
+        if asset_tag in _queued:
+            return False
+        _queued.add(asset_tag)
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                write_snapshot(asset_tag)
+        except Exception as e:
+            app.logger.error(f'Snapshot of {asset_tag} failed: {str(e)}')
+        finally:
+            with _snapshot_lock:
+                _queued.discard(asset_tag)
+
+    threading.Thread(target=run, name=f'snapshot-{asset_tag}', daemon=True).start()
+    return True
+
+def _entries(asset_tag, after, upto=None):
+    """Audit entries with ``after < changed_at <= upto``, newest first (archive included)."""
+    until = upto + timedelta(microseconds=1) if upto else None
+    entries, _ = get_history_page(None, asset_tag=asset_tag, since=after, until=until)
+    return [entry for entry in entries if entry.changed_at > after]
+
+def _latest_change(asset_tag):
+    """Timestamp of the asset's newest audit entry in either storage format."""
+    times = [
+        db.session.query(func.max(model.changed_at)).filter(model.asset_tag == asset_tag).scalar()
+        for model in (AuditLog, AuditChange)
+    ]
+    times = [ts for ts in times if ts is not None]
+    return max(times) if times else None
+
+def _apply(state, entry):
+    """Move a state forward over one audit entry."""
+    if entry.action_type == 'CREATE':
+        return json.loads(entry.new_value) if entry.new_value else {}
+    if entry.action_type == 'DELETE':
+        return None
+    if state is not None and entry.field_name != 'item':
+        state[entry.field_name] = entry.new_value
+    return state
+
+def _undo(state, entry):
+    """Move a state back over one audit entry."""
+    if entry.action_type == 'CREATE':
+        return None
+    if entry.action_type == 'DELETE':
+        return json.loads(entry.old_value) if entry.old_value else {}
+    if state is not None and entry.field_name != 'item':
+        state[entry.field_name] = entry.old_value
+    return state
+
+def _typed(state):
+    """Convert stored text values back to the column types."""
+    columns = Inventory.__table__.columns
+    typed = {}
+    for key, value in state.items():
+        column = columns.get(key)
+        if value is None or column is None:
+            typed[key] = value
+        elif isinstance(column.type, Boolean):
+            typed[key] = value in (True, 'true', 'True', '1')
+        elif isinstance(column.type, Integer):
+            typed[key] = int(value)
+        else:
+            typed[key] = value
+    return typed
+
+def _untyped(state):
+    """Format a typed state the way the audit log stores values."""
+    return {
+        key: ('true' if value else 'false') if isinstance(value, bool) else (None if value is None else str(value))
+        for key, value in state.items()
+    }
@@ -0,0 +1,189 @@
+"""Set-based upserts with inserted/updated/unchanged accounting."""
+import sqlite3
+from datetime import date, datetime
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import audit
+
+# Bound parameters allowed per statement
+MAX_PARAMS = {
+    'mssql': 2000,
+    'sqlite': 32000 if sqlite3.sqlite_version_info >= (3, 32, 0) else 990,
+    'postgresql': 30000
+}
+GENERATED = ('id', 'created_at', 'updated_at', 'version_id')
+
+def upsert(session, model, rows, keys):
+    """Insert or update ``rows`` of ``model``, matched on the ``keys`` columns.
+
+    Stored rows are read first, for the counts and the audit trail; new and
+    changed rows are then written with ``INSERT ... ON CONFLICT`` (SQLite,
+    PostgreSQL) or ``MERGE`` (SQL Server), as many rows per statement as the
+    dialect's parameter limit allows. Rows equal to the stored ones are not
+    written. The caller commits. Returns the ``inserted``, ``updated`` and
+    ``unchanged`` counts; raises ValueError on unknown, missing or invalid fields.
+    """
+    table = model.__table__
+    now = datetime.utcnow()
+    rows = _prepare(table, rows, keys)
+    existing = _existing(session, table, keys, list(rows))
+
+    inserted, updated, audit_rows = [], [], []
+    for key, row in rows.items():
+        stored = existing.get(key)
+        if stored is None:
+            inserted.append(row)
+            continue
+        changes = {column: (stored[column], value) for column, value in row.items() if stored[column] != value}
+        if changes:
+            updated.append(row)
+            audit_rows += audit.change_rows(model, 'UPDATE', dict(stored), changes, changed_at=now)
+
+    dialect = session.get_bind().dialect.name
+    groups = {}
+    for row in inserted + updated:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, group in groups.items():
+        size = max(1, MAX_PARAMS.get(dialect, 2000) // (len(table.columns) + 1))
+        for start in range(0, len(group), size):
+            chunk = [_with_defaults(table, row, now) for row in group[start:start + size]]
+            if dialect == 'mssql':
+                _merge(session, table, keys, columns, chunk, now)
+            else:
+                _insert_on_conflict(session, table, keys, columns, chunk, now, dialect)
+
+    if inserted:
+        created = _existing(session, table, keys, [_key(row, keys) for row in inserted])
+        audit_rows += [audit.change_rows(model, 'CREATE', dict(row), changed_at=now)[0] for row in created.values()]
+    audit.record(session, audit_rows)
+    return {'inserted': len(inserted), 'updated': len(updated), 'unchanged': len(rows) - len(inserted) - len(updated)}
+
+def _prepare(table, rows, keys):
+    """Validate rows, coerce values to their column types and deduplicate on the key (the last row wins).
+
+    Coercing first makes ``"5"`` equal a stored ``5`` (and an ISO string a
+    stored datetime), so resent rows count as unchanged.
+    """
+    prepared = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError('Each row must be an object')
+        unknown = set(row) - set(table.columns.keys()) | (set(row) & set(GENERATED))
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+        missing = [key for key in keys if row.get(key) in (None, '')]
+        if missing:
+            raise ValueError(f'Missing required fields: {", ".join(missing)}')
+        row = {column: coerce(table.c[column], value) for column, value in row.items()}
+        prepared[_key(row, keys)] = row
+    return prepared
+
+def coerce(column, value):
+    """A request value as the column's Python type; raises ValueError when it does not convert."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    # bool is an int, but not the other way round
+    if value is None or type(value) is python_type or isinstance(value, python_type) and not isinstance(value, bool):
+        return value
+    try:
+        if python_type is bool:
+            if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0'):
+                return value.strip().lower() in ('true', '1')
+            if isinstance(value, (int, float)) and value in (0, 1):
+                return bool(value)
+        elif python_type is int:
+            if isinstance(value, (int, str)) or isinstance(value, float) and value.is_integer():
+                return int(value)
+        elif python_type in (datetime, date):
+            if isinstance(value, str):
+                return python_type.fromisoformat(value)
+        elif python_type is str:
+            if isinstance(value, (int, float)):
+                return str(value)
+        else:
+            return python_type(value)
+    except (TypeError, ValueError):
+        pass
+    raise ValueError(f'Invalid value for {column.key}: {value!r}')
+
+def _key(row, keys):
+    return tuple(row[key] for key in keys)
+
+def _existing(session, table, keys, wanted):
+    """Stored rows for the given key tuples, keyed the same way."""
+    found = {}
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        if len(keys) == 1:
+            condition = table.c[keys[0]].in_([key[0] for key in chunk])
+        else:
+            # Spelled out; SQL Server has no row-value IN
+            condition = or_(*[and_(*[table.c[column] == value for column, value in zip(keys, key)]) for key in chunk])
+        for row in session.execute(select(table).where(condition)).mappings():
+            found[_key(row, keys)] = row
+    return found
+
+def _with_defaults(table, row, now):
+    """Fill Python-side column defaults for the insert branch."""
+    values = dict(row)
+    for column in table.columns:
+        if column.key in values or column.key == 'id':
+            continue
+        if column.key in ('created_at', 'updated_at'):
+            values[column.key] = now
+        elif column.default is not None and column.default.is_scalar:
+            values[column.key] = column.default.arg
+        else:
+            values[column.key] = None
+    return values
+
+def _insert_on_conflict(session, table, keys, columns, chunk, now, dialect):
+    insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+    statement = insert(table).values(chunk)
+    updates = [column for column in columns if column not in keys]
+    if not updates:
+        session.execute(statement.on_conflict_do_nothing(index_elements=list(keys)))
+        return
+    assignments = dict({column: statement.excluded[column] for column in updates}, updated_at=now)
+    if 'version_id' in table.c:
+        assignments['version_id'] = table.c.version_id + 1
+    session.execute(statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_=assignments,
+        where=or_(*[table.c[column].is_distinct_from(statement.excluded[column]) for column in updates])
+    ))
+
+def _merge(session, table, keys, columns, chunk, now):
+    """One ``MERGE`` over a multi-row ``VALUES`` source (SQL Server)."""
+    names = list(chunk[0])
+    params = {}
+    sources = []
+    for n, row in enumerate(chunk):
+        placeholders = []
+        for m, name in enumerate(names):
+            params[f'p{n}_{m}'] = row[name]
+            placeholders.append(f':p{n}_{m}')
+        sources.append(f"({', '.join(placeholders)})")
+    updates = [column for column in columns if column not in keys]
+    matched = ''
+    if updates:
+        # NULL-safe comparison: EXCEPT treats NULLs as equal
+        differs = (f"EXISTS (SELECT {', '.join(f't.{column}' for column in updates)} "
+                   f"EXCEPT SELECT {', '.join(f's.{column}' for column in updates)})")
+        bumps = ['t.version_id = t.version_id + 1'] if 'version_id' in table.c else []
+        assignments = ', '.join([f't.{column} = s.{column}' for column in updates] + ['t.updated_at = :now'] + bumps)
+        matched = f'WHEN MATCHED AND {differs} THEN UPDATE SET {assignments}'
+        params['now'] = now
+    statement = text(f"""
+        MERGE INTO {table.name} WITH (HOLDLOCK) AS t
+        USING (VALUES {', '.join(sources)}) AS s ({', '.join(names)})
+        ON {' AND '.join(f't.{key} = s.{key}' for key in keys)}
+        {matched}
+        WHEN NOT MATCHED THEN INSERT ({', '.join(names)}) VALUES ({', '.join(f's.{name}' for name in names)});
+    """)
+    session.execute(statement, params)
+    # Textual statements are not seen by the read cache's write detection
+    session.info['read_cache_dirty'] = True
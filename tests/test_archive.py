@@ -0,0 +1,98 @@
+"""Test audit archival."""
+from datetime import datetime, timedelta
+import pytest
+from src.models.audit import AuditLog
+from src.utils import archive
+from src.utils.archive import archive_audit, get_history_page, load_manifest
+
+@pytest.fixture
+def archive_dir(app, tmp_path):
+    """Point the archive at a temporary directory."""
+    app.config['AUDIT_ARCHIVE_DIR'] = str(tmp_path)
+    yield tmp_path
+    app.config['AUDIT_ARCHIVE_DIR'] = None
+
+def _add_logs(session, asset_tag, times):
+    for n, changed_at in enumerate(times):
+        session.add(AuditLog(
+            action_type='UPDATE',
+            field_name='notes',
+            old_value=str(n),
+            new_value=str(n + 1),
+            changed_by='archive@example.com',
+            asset_tag=asset_tag,
+            changed_at=changed_at
+        ))
+    session.commit()
+
+def test_archive_moves_old_entries(session, archive_dir, sample_inventory):
+    """Test entries past the cutoff move to monthly files and leave the table."""
+    tag = sample_inventory.asset_tag
+    _add_logs(session, tag, [datetime(2023, 1, 5), datetime(2023, 1, 20), datetime(2023, 2, 1)])
+    
+    assert archive_audit(cutoff=datetime(2023, 6, 1), batch_size=2) == 3
+    assert AuditLog.query.filter_by(changed_by='archive@example.com').count() == 0
+    
+    manifest = load_manifest(str(archive_dir))
+    assert manifest['pending'] is None
+    assert {month: part['entries'] for month, part in manifest['partitions'].items()} == {'2023-01': 2, '2023-02': 1}
+    assert (archive_dir / 'audit-2023-01.ndjson.gz').exists()
+
+def test_interrupted_archive_is_not_duplicated(session, archive_dir, sample_inventory, monkeypatch):
+    """Test a run stopped after appending a batch rolls it back instead of writing it twice."""
+    tag = sample_inventory.asset_tag
+    _add_logs(session, tag, [datetime(2023, 4, 1), datetime(2023, 4, 2)])
+    save_manifest = archive.save_manifest
+    
+    def crash_when_written(manifest, directory=None):
+        if (manifest.get('pending') or {}).get('written'):
+            raise OSError('Disk full')
+        save_manifest(manifest, directory)
+    
+    monkeypatch.setattr(archive, 'save_manifest', crash_when_written)
+    with pytest.raises(OSError):
+        archive_audit(cutoff=datetime(2023, 6, 1))
+    monkeypatch.setattr(archive, 'save_manifest', save_manifest)
+    
+    assert archive_audit(cutoff=datetime(2023, 6, 1)) == 2
+    assert load_manifest(str(archive_dir))['partitions']['2023-04']['entries'] == 2
+    page, _ = get_history_page(10, asset_tag=tag, changed_by='archive@example.com')
+    assert [entry.changed_at for entry in page] == [datetime(2023, 4, 2), datetime(2023, 4, 1)]
+
+def test_history_pages_into_archive(session, archive_dir, sample_inventory):
+    """Test history pages continue seamlessly from the table into archived months."""
+    tag = sample_inventory.asset_tag
+    old = [datetime(2023, 3, 1) + timedelta(days=n) for n in range(4)]
+    _add_logs(session, tag, old)
+    archive_audit(cutoff=datetime(2023, 6, 1))
+    _add_logs(session, tag, [datetime.utcnow()])
+    
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = get_history_page(2, cursor=cursor, asset_tag=tag, changed_by='archive@example.com')
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [entry.changed_at for entry in seen][1:] == sorted(old, reverse=True)
+    assert [entry.to_dict().get('archived', False) for entry in seen] == [False, True, True, True, True]
+    
+    page, _ = get_history_page(10, asset_tag=tag, since=datetime(2023, 3, 2), until=datetime(2023, 3, 4))
+    assert [entry.changed_at for entry in page] == [datetime(2023, 3, 3), datetime(2023, 3, 2)]
+
+def test_archived_page_reads_only_needed_batches(session, archive_dir, sample_inventory, monkeypatch):
+    """Test an archived page stops reading once the batches left are older than it."""
+    tag = sample_inventory.asset_tag
+    _add_logs(session, tag, [datetime(2023, 5, 1) + timedelta(hours=n) for n in range(6)])
+    archive_audit(cutoff=datetime(2023, 6, 1), batch_size=2)
+    assert len(load_manifest(str(archive_dir))['partitions']['2023-05']['members']) == 3
+    
+    reads = []
+    read_member = archive._read_member
+    monkeypatch.setattr(archive, '_read_member', lambda *args: reads.append(args) or read_member(*args))
+    page, cursor = get_history_page(2, asset_tag=tag, changed_by='archive@example.com')
+    assert [entry.changed_at for entry in page] == [datetime(2023, 5, 1, 5), datetime(2023, 5, 1, 4)]
+    assert len(reads) == 2
+    
+    page, _ = get_history_page(10, cursor=cursor, asset_tag=tag, changed_by='archive@example.com')
+    assert [entry.changed_at.hour for entry in page] == [3, 2, 1, 0]
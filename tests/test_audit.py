@@ -0,0 +1,90 @@
+"""Test automatic audit logging."""
+import json
+import time
+from sqlalchemy import delete, func, select
+from src.models.audit import AuditLog
+from src.utils.audit import AuditWriter
+
+def test_create_update_delete_are_audited(client, auth_headers, session, sample_location):
+    """Test write routes record audit rows with the request's user."""
+    response = client.post('/api/inventory', json={
+        'asset_tag': 'AUDIT001',
+        'asset_type': 'Laptop',
+        'location_id': sample_location.id
+    }, headers=auth_headers)
+    assert response.status_code == 201
+    item_id = json.loads(response.data)['id']
+    
+    created = AuditLog.query.filter_by(asset_tag='AUDIT001', action_type='CREATE').one()
+    assert created.changed_by == 'test@example.com'
+    assert json.loads(created.new_value)['asset_type'] == 'Laptop'
+    
+    client.put(f'/api/inventory/{item_id}', json={'status': 'repair', 'notes': 'Screen'}, headers=auth_headers)
+    updates = {log.field_name: log for log in AuditLog.query.filter_by(asset_tag='AUDIT001', action_type='UPDATE')}
+    assert set(updates) == {'status', 'notes'}
+    assert (updates['status'].old_value, updates['status'].new_value) == ('active', 'repair')
+    assert updates['notes'].user_agent is not None
+    
+    client.delete(f'/api/inventory/{item_id}', headers=auth_headers)
+    deleted = AuditLog.query.filter_by(asset_tag='AUDIT001', action_type='DELETE').one()
+    assert json.loads(deleted.old_value)['status'] == 'repair'
+
+def test_unchanged_values_are_not_audited(session, sample_inventory):
+    """Test assigning the current value records nothing."""
+    before = AuditLog.query.filter_by(asset_tag=sample_inventory.asset_tag).count()
+    sample_inventory.asset_type = sample_inventory.asset_type
+    session.commit()
+    assert AuditLog.query.filter_by(asset_tag=sample_inventory.asset_tag).count() == before
+
+def test_buffered_writer_flushes_on_batch_size(app, db, session):
+    """Test the async writer writes a full batch without waiting for the interval."""
+    writer = AuditWriter(app, batch_size=2, interval=60)
+    row = {'action_type': 'UPDATE', 'field_name': 'notes', 'changed_by': 'writer@example.com'}
+    writer.add([row])
+    assert writer.pending() == 1
+    writer.add([row])
+    
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert writer.pending() == 0
+    # The writer commits on its own connection, outside the test transaction
+    with db.engine.begin() as conn:
+        table = AuditLog.__table__
+        count = conn.execute(select(func.count()).where(table.c.changed_by == 'writer@example.com')).scalar()
+        conn.execute(delete(table).where(table.c.changed_by == 'writer@example.com'))
+    assert count == 2
+
+def test_compact_format(app, client, auth_headers, session, sample_inventory):
+    """Test compact change sets store one row per change and read back per field."""
+    from src.models.audit import AuditChange, AuditUser
+    from src.utils.audit import clear_dictionary_cache
+    
+    app.config['AUDIT_FORMAT'] = 'compact'
+    clear_dictionary_cache()
+    try:
+        for notes in ('First', 'Second'):
+            response = client.put(
+                f'/api/inventory/{sample_inventory.id}',
+                json={'notes': notes, 'assigned_to': f'{notes.lower()}@example.com'},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+    finally:
+        app.config['AUDIT_FORMAT'] = 'rows'
+    
+    changes = AuditChange.query.filter_by(asset_tag=sample_inventory.asset_tag).all()
+    assert len(changes) == 2
+    assert AuditUser.query.filter_by(email='test@example.com').count() == 1
+    
+    history = AuditLog.get_inventory_history(sample_inventory.asset_tag)
+    latest = {entry.field_name: entry for entry in history[:2]}
+    assert set(latest) == {'notes', 'assigned_to'}
+    assert (latest['notes'].old_value, latest['notes'].new_value) == ('First', 'Second')
+    assert latest['notes'].changed_by == 'test@example.com'
+    # The per-field CREATE row written before the switch is still listed
+    assert history[-1].action_type == 'CREATE'
+    
+    # Change sets are never split across pages
+    page, cursor = AuditLog.get_page(1, asset_tag=sample_inventory.asset_tag)
+    assert len(page) == 2 and cursor is not None
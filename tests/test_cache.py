@@ -0,0 +1,174 @@
+"""Test read caches."""
+import json
+import threading
+import time
+import pytest
+from flask import g, session
+from src.models.session import STICKY_SESSION_KEY
+from src.utils.cache import (
+    ReadCache, SingleFlight, cached, cache, coalesced, single_flight, stale_while_revalidate, warm_caches
+)
+
+def test_read_cache_ttl():
+    """Test entries expire after the TTL."""
+    read_cache = ReadCache()
+    read_cache.set('key', {'value': 1})
+    assert read_cache.get('key', ttl=60) == {'value': 1}
+    assert read_cache.get('key', ttl=-1) is None
+    read_cache.clear()
+    assert read_cache.get('key', ttl=60) is None
+
+def test_cached_builder(app):
+    """Test cached builders run once per TTL."""
+    calls = []
+    
+    @cached('test-builder')
+    def builder(value):
+        calls.append(value)
+        return {'value': value}
+    
+    app.config['READ_CACHE_TTL'] = 30
+    try:
+        cache.clear()
+        assert builder(1) == {'value': 1}
+        assert builder(1) == {'value': 1}
+        assert builder(2) == {'value': 2}
+        assert calls == [1, 2]
+    finally:
+        app.config['READ_CACHE_TTL'] = 0
+        cache.clear()
+
+def test_warm_caches(app, sample_inventory):
+    """Test warm-up runs the stats, location and asset type builders."""
+    timings = warm_caches()
+    assert {'stats', 'locations', 'asset_types'} <= set(timings)
+
+def test_single_flight_coalesces():
+    """Test concurrent identical calls share one computation."""
+    flight = SingleFlight()
+    calls = []
+    results = []
+    
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+    
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do('key', compute, timeout=5)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    assert flight.metrics()['key'] == {'leaders': 1, 'coalesced': 4, 'timeouts': 0}
+
+def test_single_flight_timeout():
+    """Test callers compute themselves when the in-flight call is too slow."""
+    flight = SingleFlight()
+    started = threading.Event()
+    
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return 'slow'
+    
+    leader = threading.Thread(target=lambda: flight.do('key', slow, timeout=5))
+    leader.start()
+    started.wait()
+    assert flight.do('key', lambda: 'fast', timeout=0.01) == 'fast'
+    leader.join()
+    assert flight.metrics()['key']['timeouts'] == 1
+
+def test_coalesced_requests_share_a_database(app, monkeypatch):
+    """Test requests pinned to the primary never share a replica read."""
+    keys = []
+    monkeypatch.setattr(single_flight, 'do', lambda key, fn, timeout, metric=None: keys.append(key) or fn())
+    
+    @coalesced
+    def view():
+        return {'value': 1}
+    
+    for sticky_until in (0, time.time() + 60, 0):
+        with app.test_request_context('/api/stats'):
+            g.db_read_only = True
+            session[STICKY_SESSION_KEY] = sticky_until
+            assert view().get_json() == {'value': 1}
+    assert keys[0] == keys[2] != keys[1]
+
+def test_cache_metrics_endpoint(client, auth_headers):
+    """Test cache metrics endpoint."""
+    client.get('/api/stats', headers=auth_headers)
+    response = client.get('/api/stats/cache', headers=auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'stats.get_stats' in data['single_flight']
+
+def test_stale_while_revalidate(app):
+    """Test stale values are served while a background refresh runs."""
+    values = iter([1, 2, 3])
+    
+    @stale_while_revalidate('test-swr')
+    def builder():
+        return next(values)
+    
+    app.config.update(SWR_SOFT_TTL=0, SWR_HARD_TTL=60)
+    try:
+        cache.clear()
+        assert builder() == 1  # cold cache computes synchronously
+        assert builder() == 1  # past soft TTL: stale value, refresh in background
+        for _ in range(50):
+            if builder() == 2:
+                break
+            time.sleep(0.01)
+        assert cache.entry(('test-swr', (), ())).value in (2, 3)
+    finally:
+        app.config['SWR_HARD_TTL'] = 0
+        cache.clear()
+
+def test_refresh_overlapping_a_write_is_dropped(app):
+    """Test a background refresh does not store a value computed before a write's invalidation."""
+    started, written = threading.Event(), threading.Event()
+    values = ['old', 'before-write', 'after-write']
+    
+    @stale_while_revalidate('test-swr-write')
+    def builder():
+        value = values.pop(0) if len(values) > 1 else values[0]
+        if value == 'before-write':
+            started.set()
+            written.wait(5)
+        return value
+    
+    key = ('test-swr-write', (), ())
+    app.config.update(SWR_SOFT_TTL=0, SWR_HARD_TTL=60)
+    try:
+        cache.clear()
+        assert builder() == 'old'
+        assert builder() == 'old'  # starts the refresh, which reads before the write commits
+        assert started.wait(5)
+        cache.invalidate()
+        written.set()
+        for thread in threading.enumerate():
+            if thread.name == 'swr-test-swr-write':
+                thread.join(5)
+        assert cache.entry(key).value == 'old'
+        assert cache.entry(key).stale
+        # The next read refreshes again, from after the write
+        for _ in range(50):
+            if builder() == 'after-write':
+                break
+            time.sleep(0.01)
+        assert cache.entry(key).value == 'after-write'
+    finally:
+        app.config['SWR_HARD_TTL'] = 0
+        cache.clear()
+
+def test_stats_age_header(client, auth_headers):
+    """Test stats responses carry an Age header."""
+    response = client.get('/api/stats', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers['Age'] == '0'
@@ -2,8 +2,11 @@
 import json
 import pytest
 from unittest.mock import patch, Mock
+from sqlalchemy import event, update
+from src.models import db as _db
 from src.models.inventory import Inventory
 from src.models.location import Location
+from src.models.audit import AuditLog
 
 def test_get_inventory_error_handling(client, auth_headers):
     """Test inventory list error handling."""
@@ -207,3 +210,179 @@ def test_bulk_operations(client, auth_headers, session, sample_location):
     data = json.loads(response.data)
     assert len(data['updated']) == 3
     assert all(item['status'] == 'decommissioned' for item in data['updated'])
+
+def test_bulk_upsert(client, auth_headers, session, sample_inventory):
+    """Test bulk upsert counts inserts, updates and unchanged items."""
+    items = [
+        {'asset_tag': sample_inventory.asset_tag, 'asset_type': 'Laptop', 'location_id': sample_inventory.location_id},
+        {'asset_tag': 'UPSERT1', 'asset_type': 'Desktop', 'location_id': sample_inventory.location_id}
+    ]
+    url = '/api/inventory/bulk?upsert=true'
+    headers = {**auth_headers, 'Content-Type': 'application/json'}
+    response = client.post(url, headers=headers, data=json.dumps({'items': items}))
+    assert response.status_code == 200
+    assert json.loads(response.data) == {'inserted': 1, 'updated': 0, 'unchanged': 1}
+    
+    items[1]['notes'] = 'Resent by procurement'
+    response = client.post(url, headers=headers, data=json.dumps({'items': items}))
+    assert json.loads(response.data) == {'inserted': 0, 'updated': 1, 'unchanged': 1}
+    item = Inventory.query.filter_by(asset_tag='UPSERT1').one()
+    assert item.notes == 'Resent by procurement'
+    assert item.status == 'active'
+    
+    actions = [(log.action_type, log.field_name) for log in AuditLog.get_inventory_history('UPSERT1')]
+    assert actions == [('UPDATE', 'notes'), ('CREATE', 'item')]
+    
+    # Values equal to the stored ones once converted to the column types
+    resent = dict(items[1], location_id=str(items[1]['location_id']), is_loaner='false',
+                  purchase_date='2024-03-01T00:00:00')
+    client.post(url, headers=headers, data=json.dumps({'items': [resent]}))
+    response = client.post(url, headers=headers, data=json.dumps({'items': [resent]}))
+    assert json.loads(response.data) == {'inserted': 0, 'updated': 0, 'unchanged': 1}
+    actions = [(log.action_type, log.field_name) for log in AuditLog.get_inventory_history('UPSERT1')]
+    assert actions == [('UPDATE', 'purchase_date'), ('UPDATE', 'notes'), ('CREATE', 'item')]
+    
+    response = client.post(url, headers=headers, data=json.dumps({'items': [dict(resent, is_loaner='maybe')]}))
+    assert response.status_code == 400
+    
+    items[1]['location_id'] = 999999
+    response = client.post(url, headers=headers, data=json.dumps({'items': items}))
+    assert response.status_code == 404
+
+def test_item_writes_use_constraints(client, auth_headers, session, sample_inventory):
+    """Test item writes map constraint violations to errors and keep the audit trail."""
+    headers = {**auth_headers, 'Content-Type': 'application/json'}
+    item = {'asset_tag': 'RET001', 'asset_type': 'Laptop', 'serial_number': 'RET-SN',
+            'location_id': sample_inventory.location_id}
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(_db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/api/inventory', headers=headers, data=json.dumps(item))
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 201
+    # The item and its location come back from the insert itself
+    assert [statement.split()[:3] for statement in statements if 'inventory' in statement] == [['INSERT', 'INTO', 'inventory']]
+    assert not [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+    data = json.loads(response.data)
+    assert data['status'] == 'active'
+    assert data['location']['id'] == sample_inventory.location_id
+    
+    response = client.post('/api/inventory', headers=headers, data=json.dumps(dict(item, asset_tag='RET002')))
+    assert response.status_code == 400
+    assert json.loads(response.data)['error'] == 'Serial number already exists'
+    response = client.post('/api/inventory', headers=headers, data=json.dumps(dict(item, bogus=1)))
+    assert response.status_code == 400
+    dated = dict(item, asset_tag='RET003', serial_number=None, date_assigned='2024-05-01T09:30:00')
+    response = client.post('/api/inventory', headers=headers, data=json.dumps(dated))
+    assert response.status_code == 201
+    assert json.loads(response.data)['date_assigned'].startswith('Wed, 01 May 2024 09:30:00')
+    response = client.post('/api/inventory', headers=headers, data=json.dumps(dict(dated, date_assigned='May 1st')))
+    assert response.status_code == 400
+    response = client.put(f'/api/inventory/{data["id"]}', headers=headers,
+                          data=json.dumps({'location_id': 999999}))
+    assert response.status_code == 404
+    
+    response = client.put(f'/api/inventory/{data["id"]}', headers=headers, data=json.dumps({'notes': 'Spare'}))
+    assert json.loads(response.data)['notes'] == 'Spare'
+    response = client.post(f'/api/inventory/{data["id"]}/toggle-loaner', headers=auth_headers)
+    assert json.loads(response.data)['is_loaner'] is True
+    
+    actions = [(log.action_type, log.field_name, log.new_value) for log in AuditLog.get_inventory_history('RET001')]
+    assert actions == [('UPDATE', 'is_loaner', 'true'), ('UPDATE', 'notes', 'Spare'), ('CREATE', 'item', actions[-1][2])]
+
+def test_patch_with_if_match(client, auth_headers, session, sample_inventory):
+    """Test PATCH writes only changed columns and rejects stale ETags."""
+    headers = {**auth_headers, 'Content-Type': 'application/json'}
+    url = f'/api/inventory/{sample_inventory.id}'
+    etag = client.get(url, headers=auth_headers).headers['ETag']
+    
+    # Unchanged values are not written
+    response = client.patch(url, headers={**headers, 'If-Match': etag},
+                            data=json.dumps({'asset_type': sample_inventory.asset_type}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] == etag
+    
+    response = client.patch(url, headers={**headers, 'If-Match': etag}, data=json.dumps({'notes': 'First'}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    
+    # A second admin still holding the old ETag
+    response = client.patch(url, headers={**headers, 'If-Match': etag}, data=json.dumps({'notes': 'Second'}))
+    assert response.status_code == 412
+    assert client.get(url, headers=auth_headers).get_json()['notes'] == 'First'
+    
+    response = client.patch(url, headers={**headers, 'If-Match': '*'}, data=json.dumps({'notes': 'Second'}))
+    assert response.get_json()['notes'] == 'Second'
+    assert response.get_json()['version_id'] == 3
+    fields = [log.field_name for log in AuditLog.get_inventory_history(sample_inventory.asset_tag)]
+    assert fields.count('notes') == 2
+    assert 'version_id' not in fields
+    assert all('version_id' not in log.to_dict() for log in AuditLog.get_inventory_history(sample_inventory.asset_tag))
+
+def test_delete_with_if_match(client, auth_headers, session, sample_inventory):
+    """Test DELETE rejects stale ETags and concurrent updates."""
+    url = f'/api/inventory/{sample_inventory.id}'
+    etag = client.get(url, headers=auth_headers).headers['ETag']
+    client.patch(url, headers={**auth_headers, 'Content-Type': 'application/json'}, data=json.dumps({'notes': 'Moved'}))
+    
+    response = client.delete(url, headers={**auth_headers, 'If-Match': etag})
+    assert response.status_code == 412
+    assert client.get(url, headers=auth_headers).status_code == 200
+    
+    # An update committed after the item was loaded
+    session.refresh(sample_inventory)
+    session.execute(update(Inventory).where(Inventory.id == sample_inventory.id)
+                    .values(version_id=Inventory.version_id + 1), execution_options={'synchronize_session': False})
+    response = client.delete(url, headers=auth_headers)
+    assert response.status_code == 412
+    
+    response = client.delete(url, headers={**auth_headers, 'If-Match': client.get(url, headers=auth_headers).headers['ETag']})
+    assert response.status_code == 200
+    assert client.get(url, headers=auth_headers).status_code == 404
+
+def test_bulk_transition_and_delete(client, auth_headers, session, sample_location, app):
+    """Test filter-driven bulk status transitions and deletes."""
+    for i in range(5):
+        session.add(Inventory(asset_tag=f'SITE{i}', asset_type='Monitor' if i < 3 else 'Laptop',
+                              location_id=sample_location.id))
+    session.commit()
+    headers = {**auth_headers, 'Content-Type': 'application/json'}
+    app.config['BULK_CHUNK_SIZE'] = 2
+    try:
+        response = client.post('/api/inventory/bulk-transition', headers=headers, data=json.dumps({
+            'filter': {'site_name': 'Test Site', 'asset_type': 'Monitor'}, 'status': 'decommissioned'
+        }))
+        assert response.status_code == 200
+        assert json.loads(response.data)['updated'] == 3
+        items = Inventory.query.filter(Inventory.asset_tag.like('SITE%')).order_by(Inventory.asset_tag).all()
+        assert [item.status for item in items] == ['decommissioned'] * 3 + ['active'] * 2
+        assert all(item.date_decommissioned for item in items[:3])
+        fields = {log.field_name for log in AuditLog.get_inventory_history('SITE0') if log.action_type == 'UPDATE'}
+        assert fields == {'status', 'date_decommissioned'}
+        
+        response = client.delete('/api/inventory/bulk', headers=headers,
+                                 data=json.dumps({'filter': {'status': 'decommissioned', 'location_id': sample_location.id}}))
+        assert json.loads(response.data) == {'deleted': 3}
+        assert Inventory.query.filter(Inventory.asset_tag.like('SITE%')).count() == 2
+        assert AuditLog.get_inventory_history('SITE0')[0].action_type == 'DELETE'
+    finally:
+        app.config['BULK_CHUNK_SIZE'] = 1000
+    
+    response = client.delete('/api/inventory/bulk', headers=headers, data=json.dumps({'filter': {}}))
+    assert response.status_code == 400
+
+def test_delete_location_cascade_in_chunks(session, sample_location):
+    """Test chunked location deletion commits per chunk and counts what it removed."""
+    from src.utils.bulk import delete_location_cascade
+    for i in range(3):
+        session.add(Inventory(asset_tag=f'CASCADE{i}', asset_type='Laptop', location_id=sample_location.id))
+    session.commit()
+    
+    progress = {}
+    counts = delete_location_cascade(sample_location.id, chunk_size=2, progress=progress)
+    assert counts == {'inventory_deleted': 3, 'locations_deleted': 1}
+    assert progress['inventory_deleted'] == 3
+    assert Inventory.query.filter(Inventory.asset_tag.like('CASCADE%')).count() == 0
+    assert AuditLog.get_inventory_history('CASCADE2')[0].action_type == 'DELETE'
@@ -0,0 +1,333 @@
+"""Test the legacy data migration script against a SQLite legacy database."""
+import multiprocessing
+import sqlite3
+import sys
+import types
+from collections import Counter, namedtuple
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from src.models import db as _db
+from src.models.audit import AuditLog
+from src.models.inventory import Inventory
+from src.models.location import Location
+from src.models.migration import MigrationState, decode_key, encode_key
+
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    # Only get_old_db_connection needs the driver; the tests pass connections in
+    sys.modules['pyodbc'] = types.ModuleType('pyodbc')
+
+import migrate_data
+
+class LegacyCursor:
+    """pyodbc-style cursor (positional parameters, attribute rows) over sqlite3."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.description = None
+
+    def execute(self, sql, *params):
+        self.cursor.execute(sql, params)
+        self.description = self.cursor.description
+        self.row = namedtuple('Row', [column[0] for column in self.description], rename=True)
+        return self
+
+    def fetchmany(self, size):
+        return [self.row(*values) for values in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self.row(*values) for values in self.cursor.fetchall()]
+
+class LegacyConnection:
+    """pyodbc-style connection over a sqlite3 database."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return LegacyCursor(self.conn.cursor())
+
+    def execute(self, sql, params=()):
+        self.conn.execute(sql, params)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+@pytest.fixture
+def legacy(tmp_path):
+    """Legacy database with 12 assets in 3 rooms and 20 audit entries (repeated timestamps)."""
+    conn = LegacyConnection(str(tmp_path / 'legacy.db'))
+    conn.conn.executescript("""
+        CREATE TABLE formatted_company_inventory (
+            asset_tag TEXT, asset_type TEXT, manufacturer TEXT, model TEXT, serial_number TEXT, status TEXT,
+            assigned_to TEXT, site_name TEXT, room_number TEXT, room_name TEXT, room_type TEXT, floor TEXT,
+            building TEXT, is_loaner INTEGER, notes TEXT, date_assigned TEXT, date_decommissioned TEXT,
+            purchase_date TEXT, warranty_expiry TEXT
+        );
+        CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY, action_type TEXT, field_name TEXT, changed_by TEXT, old_value TEXT,
+            new_value TEXT, asset_tag TEXT, location_id INTEGER, changed_at TEXT, ip_address TEXT, user_agent TEXT
+        );
+    """)
+    conn.conn.executemany(
+        'INSERT INTO formatted_company_inventory VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [(f'L{n:03d} ', 'Laptop', 'Dell', None, f'SN{n}', None, None, 'Main', f' {n % 3} ', None, None, None, None,
+          n % 2, None, '2021-01-02', None, 'not a date', None) for n in range(12)]
+    )
+    conn.conn.executemany(
+        'INSERT INTO audit_log (action_type, field_name, changed_by, old_value, new_value, asset_tag, changed_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [('UPDATE', 'notes', 'legacy@example.com', str(n), str(n + 1), f'L{n % 12:03d}',
+          f'2022-01-{1 + n // 2:02d} 10:00:00') for n in range(20)]
+    )
+    conn.conn.commit()
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def target(app, tmp_path):
+    """Empty new-schema database, separate from the test session's."""
+    engine = create_engine(f'sqlite:///{tmp_path / "target.db"}')
+    _db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+def _migrate(legacy, target):
+    location_map = migrate_data.migrate_locations(legacy, target)
+    migrate_data.migrate_inventory(legacy, target, location_map)
+    migrate_data.migrate_audit_log(legacy, target)
+    return location_map
+
+def test_verify_chunk_matches_current_models(legacy, target):
+    """Test verify digests cover the current model columns and find changed rows."""
+    location_map = _migrate(legacy, target)
+    for stage in migrate_data.VERIFY_STAGES:
+        result = migrate_data.verify_chunk(stage, (None, None), legacy, target, location_map)
+        assert result['legacy_rows'] == result['new_rows'] > 0
+        assert result['differing_keys'] == []
+    
+    with target.begin() as conn:
+        conn.execute(update(Inventory.__table__).where(Inventory.__table__.c.asset_tag == 'L004')
+                     .values(model='Changed', version_id=Inventory.__table__.c.version_id + 1))
+        # Row versions alone are not differences
+        conn.execute(update(Inventory.__table__).where(Inventory.__table__.c.asset_tag == 'L005')
+                     .values(version_id=7))
+    result = migrate_data.verify_chunk('inventory', (None, None), legacy, target, location_map)
+    assert result['differing_keys'] == [('L004', 1, 1)]
+
+def test_copy_rows_streams_batches(legacy, target, monkeypatch):
+    """Test legacy rows are copied one mapped multi-row write per fetched batch."""
+    fetch_batches = migrate_data.fetch_batches
+    sizes = []
+    monkeypatch.setattr(migrate_data, 'fetch_batches',
+                        lambda cursor, size=5: (sizes.append(len(rows)) or rows for rows in fetch_batches(cursor, 5)))
+    location_map = migrate_data.migrate_locations(legacy, target)
+    progress = migrate_data.StageProgress('inventory items')
+    
+    assert migrate_data.migrate_inventory(legacy, target, location_map, progress=progress) == 12
+    assert sizes[-3:] == [5, 5, 2]
+    with target.connect() as conn:
+        rows = conn.execute(select(Inventory.__table__).order_by(Inventory.__table__.c.asset_tag)).mappings().all()
+    assert [row['asset_tag'] for row in rows][:2] == ['L000', 'L001']
+    assert rows[0]['location_id'] == location_map['Main|0']
+    assert rows[0]['status'] == 'active'
+    assert rows[0]['date_assigned'].year == 2021
+    assert rows[0]['purchase_date'] is None
+
+def test_partition_ranges_cover_every_row_once(legacy):
+    """Test key ranges split the legacy table without gaps or overlaps, NULL keys included."""
+    legacy.execute("INSERT INTO audit_log (action_type, field_name, changed_by, changed_at) "
+                   "VALUES ('UPDATE', 'notes', 'legacy@example.com', NULL)")
+    ranges = migrate_data.partition_ranges(legacy, 'audit_log', 'changed_at', 4)
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert len(ranges) > 1
+    
+    ids = []
+    for key_range in ranges:
+        cursor = migrate_data.legacy_rows(legacy, 'audit_log', 'changed_at', key_range)
+        ids += [row.id for batch in migrate_data.fetch_batches(cursor) for row in batch]
+    assert sorted(ids) == list(range(1, 22))
+    
+    # Equal keys never straddle two ranges, even with more parts than keys
+    seen = []
+    for key_range in migrate_data.partition_ranges(legacy, 'audit_log', 'changed_at', 20):
+        cursor = migrate_data.legacy_rows(legacy, 'audit_log', 'changed_at', key_range)
+        seen += sorted({row.changed_at for batch in migrate_data.fetch_batches(cursor) for row in batch}, key=str)
+    assert len(seen) == len(set(seen)) == 11
+    assert migrate_data.partition_ranges(legacy, 'audit_log', 'changed_at', 1) == [(None, None)]
+
+def test_copy_rows_resumes_after_checkpoint(legacy, target, monkeypatch):
+    """Test a failed copy resumes after its high-water mark without losing or repeating rows."""
+    fetch_batches = migrate_data.fetch_batches
+    monkeypatch.setattr(migrate_data, 'fetch_batches', lambda cursor, size=3: fetch_batches(cursor, 3))
+    state = MigrationState.__table__
+    with target.begin() as conn:
+        result = conn.execute(state.insert().values(stage='audit', range_start='null', range_end='null'))
+        state_id = result.inserted_primary_key[0]
+    checkpoint = migrate_data.Checkpoint(state_id, (None, None), None)
+    
+    audit_values = migrate_data.audit_values
+    
+    def fail_on_ninth(data):
+        if data['old_value'] == '9':
+            raise RuntimeError('Connection lost')
+        return audit_values(data)
+    
+    monkeypatch.setattr(migrate_data, 'audit_values', fail_on_ninth)
+    with pytest.raises(RuntimeError):
+        migrate_data.migrate_audit_log(legacy, target, checkpoint)
+    with target.connect() as conn:
+        high_water = decode_key(conn.execute(select(state.c.high_water)).scalar())
+        copied = conn.execute(select(func.count()).select_from(AuditLog.__table__)).scalar()
+    # Batches end on a key change, so the mark never splits rows sharing a timestamp
+    assert high_water == '2022-01-04 10:00:00'
+    assert copied == 8
+    
+    monkeypatch.setattr(migrate_data, 'audit_values', audit_values)
+    migrate_data.migrate_audit_log(legacy, target, checkpoint._replace(high_water=high_water))
+    with target.connect() as conn:
+        values = conn.execute(select(AuditLog.__table__.c.old_value)).scalars().all()
+        assert conn.execute(select(state.c.rows_copied)).scalar() == 20
+    assert sorted(values, key=int) == [str(n) for n in range(20)]
+
+def test_plan_stage_resume_and_incremental(legacy, session):
+    """Test resume continues unfinished ranges and incremental waits for a finished run."""
+    checkpoints = migrate_data.plan_stage(legacy, 'audit', 2)
+    assert len(checkpoints) == 2
+    first, second = (session.get(MigrationState, checkpoint.id) for checkpoint in checkpoints)
+    first.high_water, first.finished_at = encode_key('2022-01-05 10:00:00'), datetime.utcnow()
+    second.high_water = encode_key('2022-01-08 10:00:00')
+    session.commit()
+    
+    with pytest.raises(ValueError):
+        migrate_data.plan_stage(legacy, 'audit', 2)
+    with pytest.raises(ValueError, match='--resume'):
+        migrate_data.plan_stage(legacy, 'audit', 2, incremental=True)
+    resumed = migrate_data.plan_stage(legacy, 'audit', 2, resume=True)
+    assert [(checkpoint.id, checkpoint.high_water) for checkpoint in resumed] == [(second.id, '2022-01-08 10:00:00')]
+    
+    second.high_water, second.finished_at = encode_key('2022-01-10 10:00:00'), datetime.utcnow()
+    session.commit()
+    synced = migrate_data.plan_stage(legacy, 'audit', 2, incremental=True)
+    assert synced and all(checkpoint.high_water == '2022-01-10 10:00:00' for checkpoint in synced)
+    assert MigrationState.query.filter_by(stage='audit').count() == len(synced)
+
+def test_migrate_locations_builds_map_once(legacy, target):
+    """Test rooms are deduplicated on trimmed keys and reruns keep existing locations."""
+    location_map = migrate_data.migrate_locations(legacy, target)
+    assert set(location_map) == {'Main|0', 'Main|1', 'Main|2'}
+    with target.connect() as conn:
+        room = conn.execute(select(Location.__table__).where(Location.__table__.c.id == location_map['Main|1'])).first()
+    assert (room.room_number, room.room_name, room.room_type) == ('1', '1', 'Office')
+    
+    legacy.execute("INSERT INTO formatted_company_inventory (asset_tag, site_name, room_number) VALUES ('L900', 'Annex', '7')")
+    rerun = migrate_data.migrate_locations(legacy, target)
+    assert {key: rerun[key] for key in location_map} == location_map
+    assert set(rerun) - set(location_map) == {'Annex|7'}
+    assert migrate_data.location_key(' Main ', ' ') is None
+
+def test_verify_drills_down_only_into_mismatched_chunks(legacy, target, monkeypatch, capsys):
+    """Test verify compares chunk summaries and lists the keys of differing chunks only."""
+    location_map = _migrate(legacy, target)
+    with target.begin() as conn:
+        conn.execute(AuditLog.__table__.delete().where(AuditLog.__table__.c.old_value == '3'))
+        conn.execute(AuditLog.__table__.insert().values(
+            action_type='UPDATE', field_name='notes', changed_by='extra@example.com',
+            changed_at=datetime(2022, 1, 9, 10)
+        ))
+    new_digests = migrate_data._new_digests
+    drilled = []
+    monkeypatch.setattr(migrate_data, '_new_digests',
+                        lambda stage, keys, engine: drilled.append((stage, frozenset(keys))) or
+                        new_digests(stage, keys, engine))
+    
+    assert migrate_data.verify(legacy, target, chunks=4) == 2
+    # Each chunk is summarized once and re-read only when it differs
+    audit_reads = Counter(keys for stage, keys in drilled if stage == 'audit')
+    assert sorted(audit_reads.values()) == [1, 1, 2, 2]
+    assert all(count == 1 for stage, count in Counter(drilled).items() if stage[0] == 'inventory')
+    output = capsys.readouterr().out
+    assert '2022-01-02 10:00:00: 1 legacy-only, 0 new-only rows' in output
+    assert '2022-01-09 10:00:00: 0 legacy-only, 1 new-only rows' in output
+
+def test_verify_chunks_follow_legacy_collation(legacy, target, monkeypatch, capsys):
+    """Test verify matches chunks by legacy keys when the legacy ordering is case-insensitive."""
+    # SQL Server keeps the column's case-insensitive collation through LTRIM/RTRIM
+    table, key, new_table, key_column, label = migrate_data.VERIFY_STAGES['inventory']
+    monkeypatch.setitem(migrate_data.VERIFY_STAGES, 'inventory',
+                        (table, f'{key} COLLATE NOCASE', new_table, key_column, label))
+    legacy.conn.executemany(
+        'INSERT INTO formatted_company_inventory (asset_tag, asset_type, site_name, room_number, is_loaner) '
+        "VALUES (?, 'Laptop', 'Main', ' 0 ', 0)",
+        [('l004a',), ('l008a',), ('m001',)]
+    )
+    legacy.conn.commit()
+    # 'l004a' and 'l008a' fall inside uppercase ranges that a binary comparison puts them after
+    assert migrate_data.partition_ranges(legacy, table, f'{key} COLLATE NOCASE', 4) == [
+        (None, 'L004'), ('L004', 'L007'), ('L007', 'L010'), ('L010', None)
+    ]
+    location_map = _migrate(legacy, target)
+    
+    assert migrate_data.verify(legacy, target, chunks=4) == 0
+    assert 'inventory items: 15 legacy rows, 15 new rows, 0 of 4 chunks differ' in capsys.readouterr().out
+    
+    with target.begin() as conn:
+        conn.execute(Inventory.__table__.insert().values(asset_tag='L004A', asset_type='Laptop', is_loaner=False,
+                                                          location_id=location_map['Main|0']))
+    assert migrate_data.verify(legacy, target, chunks=4) == 1
+    assert '1 new rows have no legacy key' in capsys.readouterr().out
+
+def test_undated_audit_rows_map_to_a_fixed_timestamp(legacy, target):
+    """Test legacy audit rows without a timestamp migrate and verify the same on every run."""
+    legacy.execute("INSERT INTO audit_log (action_type, field_name, changed_by, changed_at) "
+                   "VALUES ('UPDATE', 'notes', 'legacy@example.com', NULL)")
+    location_map = _migrate(legacy, target)
+    with target.connect() as conn:
+        undated = conn.scalars(select(AuditLog.__table__.c.changed_at)
+                               .where(AuditLog.__table__.c.changed_by == 'legacy@example.com')
+                               .where(AuditLog.__table__.c.field_name == 'notes')
+                               .where(AuditLog.__table__.c.old_value.is_(None))).all()
+    assert undated == [migrate_data.UNDATED_AUDIT]
+    
+    result = migrate_data.verify_chunk('audit', (None, None), legacy, target, location_map)
+    assert result['legacy_rows'] == result['new_rows'] == 21
+    assert result['differing_keys'] == []
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='workers inherit the patched connection factories by forking')
+def test_workers_match_the_serial_run(legacy, app, session, tmp_path, monkeypatch, capsys):
+    """Test --workers 2 migrates and verifies through the process pool exactly like a serial run."""
+    # Worker processes open their own connections through these factories
+    monkeypatch.setattr(migrate_data, 'create_app', lambda: app)
+    monkeypatch.setattr(migrate_data, 'get_old_db_connection', lambda: LegacyConnection(str(tmp_path / 'legacy.db')))
+    runs = {}
+    for workers in (1, 2):
+        url = f'sqlite:///{tmp_path / f"workers{workers}.db"}'
+        monkeypatch.setattr(migrate_data, 'get_new_db_engine', lambda url=url: create_engine(url))
+        engine = create_engine(url)
+        _db.metadata.create_all(engine)
+        session.query(MigrationState).delete()
+        session.commit()
+        
+        location_map = migrate_data.migrate_locations(legacy, engine)
+        migrate_data.migrate_stages(legacy, engine, location_map, workers=workers)
+        with engine.connect() as conn:
+            rows = [sorted(conn.execute(select(*migrate_data._verified_columns(table))).all(), key=repr)
+                    for table in (Inventory.__table__, AuditLog.__table__)]
+        assert ('2 workers' in capsys.readouterr().out) == (workers == 2)
+        assert migrate_data.verify(legacy, engine, workers=workers, chunks=4) == 0
+        clean = capsys.readouterr().out
+        
+        with engine.begin() as conn:
+            conn.execute(update(Inventory.__table__).where(Inventory.__table__.c.asset_tag == 'L007')
+                         .values(model='Changed'))
+        assert migrate_data.verify(legacy, engine, workers=workers, chunks=4) == 1
+        runs[workers] = (rows, clean, capsys.readouterr().out)
+        engine.dispose()
+    
+    assert runs[2] == runs[1]
+    assert len(runs[2][0][0]) == 12 and len(runs[2][0][1]) == 20
+    assert 'L007: 1 legacy-only, 1 new-only rows' in runs[2][2]
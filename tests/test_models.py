@@ -1,4 +1,5 @@
 """Test models."""
+from datetime import datetime
 import pytest
 from sqlalchemy.exc import IntegrityError
 from src.models.location import Location
@@ -183,14 +184,40 @@ def test_audit_log_queries(session, sample_inventory):
         session.add(log)
     session.commit()
     
-    # Test get_inventory_history
+    # Test get_inventory_history (includes the automatic CREATE entry)
     history = AuditLog.get_inventory_history(sample_inventory.asset_tag)
-    assert len(history) == 3
+    assert len(history) == 4
     
     # Test get_user_actions
     actions = AuditLog.get_user_actions('admin@example.com')
     assert len(actions) == 3
 
+def test_audit_log_keyset_pages(session, sample_inventory):
+    """Test keyset pages cover every entry once, including same-timestamp ties."""
+    changed_at = datetime(2024, 1, 1, 12, 0, 0)
+    for i in range(5):
+        session.add(AuditLog(
+            action_type='UPDATE',
+            field_name=f'field{i}',
+            changed_by='pager@example.com',
+            asset_tag=sample_inventory.asset_tag,
+            changed_at=changed_at
+        ))
+    session.commit()
+    
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = AuditLog.get_page(2, cursor=cursor, changed_by='pager@example.com')
+        seen.extend(log.id for log in page)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    assert seen == sorted(seen, reverse=True)
+    
+    with pytest.raises(ValueError):
+        AuditLog.get_page(2, cursor='not-a-cursor')
+
 def test_model_to_dict_methods(session, sample_location, sample_inventory):
     """Test model to_dict methods."""
     location_dict = sample_location.to_dict()
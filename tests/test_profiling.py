@@ -0,0 +1,34 @@
+"""Test request profiling."""
+import os
+import pytest
+
+def test_profile_header_writes_dump(app, client, auth_headers, tmp_path):
+    """Test that admins get a pstats dump and summary."""
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    response = client.get('/api/stats', headers={**auth_headers, 'X-Profile': '1'})
+    assert response.status_code == 200
+    name = response.headers['X-Profile-Id']
+    assert os.path.exists(tmp_path / f'{name}.pstats')
+    summary = (tmp_path / f'{name}.txt').read_text()
+    assert 'GET /api/stats' in summary
+
+def test_profile_header_requires_admin(app, client, tmp_path):
+    """Test that non-admins cannot trigger profiling."""
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    headers = {
+        'X-User-ID': 'viewer@example.com',
+        'X-User-Name': 'Viewer',
+        'X-User-Roles': '["viewer"]',
+        'X-Profile': '1'
+    }
+    response = client.get('/api/stats', headers=headers)
+    assert response.status_code == 403
+    assert not os.listdir(tmp_path)
+
+def test_no_profile_without_header(app, client, auth_headers, tmp_path):
+    """Test that regular requests are not profiled."""
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    response = client.get('/api/stats', headers=auth_headers)
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert not os.listdir(tmp_path)
@@ -1,8 +1,12 @@
 """Test routes."""
 import json
+import time
+from datetime import datetime
 import pytest
+from sqlalchemy import update
 from src.models.location import Location
 from src.models.inventory import Inventory
+from src.models.audit import AuditLog
 
 def test_health_check(client):
     """Test health check endpoint."""
@@ -40,6 +44,18 @@ def test_create_location(client, auth_headers):
     data = json.loads(response.data)
     assert data['site_name'] == 'New Site'
 
+def test_create_location_upsert(client, auth_headers, sample_location):
+    """Test create location in upsert mode updates the existing site and room."""
+    data = {'site_name': 'Test Site', 'room_number': '101', 'room_name': 'Renamed Room'}
+    response = client.post('/api/locations?upsert=true',
+                         headers={**auth_headers, 'Content-Type': 'application/json'},
+                         data=json.dumps(data))
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data['inserted'], data['updated'], data['unchanged']) == (0, 1, 0)
+    assert data['location']['id'] == sample_location.id
+    assert data['location']['room_name'] == 'Renamed Room'
+
 def test_update_location(client, auth_headers, sample_location):
     """Test update location endpoint."""
     data = {'room_name': 'Updated Room'}
@@ -50,11 +66,61 @@ def test_update_location(client, auth_headers, sample_location):
     data = json.loads(response.data)
     assert data['room_name'] == 'Updated Room'
 
+def test_update_location_if_match(client, auth_headers, sample_location, session):
+    """Test location updates honour If-Match and detect concurrent writes."""
+    headers = {**auth_headers, 'Content-Type': 'application/json'}
+    url = f'/api/locations/{sample_location.id}'
+    etag = client.get(url, headers=auth_headers).headers['ETag']
+    response = client.patch(url, headers={**headers, 'If-Match': etag}, data=json.dumps({'floor': '2'}))
+    assert response.status_code == 200
+    response = client.patch(url, headers={**headers, 'If-Match': etag}, data=json.dumps({'floor': '3'}))
+    assert response.status_code == 412
+    
+    # Written elsewhere after this session loaded the location
+    session.execute(update(Location).where(Location.id == sample_location.id)
+                    .values(version_id=Location.version_id + 1), execution_options={'synchronize_session': False})
+    response = client.put(url, headers=headers, data=json.dumps({'floor': '4'}))
+    assert response.status_code == 412
+
 def test_delete_location(client, auth_headers, sample_location, session):
     """Test delete location endpoint."""
-    response = client.delete(f'/api/locations/{sample_location.id}', headers=auth_headers)
+    location_id = sample_location.id
+    session.add(Inventory(asset_tag='DELLOC1', asset_type='Laptop', location_id=location_id))
+    session.commit()
+    response = client.delete(f'/api/locations/{location_id}', headers=auth_headers)
     assert response.status_code == 200
-    assert session.get(Location, sample_location.id) is None
+    data = json.loads(response.data)
+    assert (data['inventory_deleted'], data['locations_deleted']) == (1, 1)
+    assert session.get(Location, location_id) is None
+
+def test_delete_location_in_background(client, auth_headers, sample_location, sample_inventory, session):
+    """Test background location deletion returns a pollable job that finishes the cascade."""
+    location_id, asset_tag = sample_location.id, sample_inventory.asset_tag
+    response = client.delete(f'/api/locations/{location_id}?background=true', headers=auth_headers)
+    assert response.status_code == 202
+    job = json.loads(response.data)
+    assert job['location_id'] == location_id
+    
+    url, deadline = response.headers['Location'], time.monotonic() + 10
+    while True:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        status = json.loads(response.data)
+        if status['state'] != 'running' or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert status['id'] == job['id']
+    assert status['state'] == 'done', status['error']
+    assert (status['inventory_deleted'], status['locations_deleted']) == (1, 1)
+    
+    session.expire_all()
+    assert session.get(Location, location_id) is None
+    assert session.query(Inventory).filter_by(location_id=location_id).count() == 0
+    actions = {(log.asset_tag, log.location_id, log.action_type)
+               for log in session.query(AuditLog).filter_by(action_type='DELETE')}
+    assert (asset_tag, location_id, 'DELETE') in actions
+    assert any(tag is None and log_location == location_id for tag, log_location, _ in actions)
+    assert client.get('/api/locations/delete-jobs/unknown', headers=auth_headers).status_code == 404
 
 def test_get_inventory(client, auth_headers):
     """Test get inventory endpoint."""
@@ -63,6 +129,13 @@ def test_get_inventory(client, auth_headers):
     data = json.loads(response.data)
     assert isinstance(data, list)
 
+def test_get_asset_types(client, auth_headers, sample_inventory):
+    """Test distinct asset types endpoint."""
+    response = client.get('/api/inventory/types', headers=auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data == ['Laptop']
+
 def test_get_inventory_item(client, auth_headers, sample_inventory):
     """Test get inventory item endpoint."""
     response = client.get(f'/api/inventory/{sample_inventory.id}', headers=auth_headers)
@@ -127,6 +200,55 @@ def test_get_recent_activity(client, auth_headers, sample_audit_log):
     assert isinstance(data, list)
     assert len(data) > 0
 
+def test_get_audit_log(client, auth_headers, sample_audit_log):
+    """Test filtered, paginated audit log endpoint."""
+    response = client.get(
+        f'/api/stats/audit?asset_tag={sample_audit_log.asset_tag}&action_type=CREATE&limit=1',
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [log['id'] for log in data['items']] == [sample_audit_log.id]
+    
+    # The item's automatic CREATE entry is on the next page
+    response = client.get(
+        f'/api/stats/audit?asset_tag={sample_audit_log.asset_tag}&action_type=CREATE&limit=1'
+        f'&cursor={data["next_cursor"]}',
+        headers=auth_headers
+    )
+    data = json.loads(response.data)
+    assert len(data['items']) == 1 and data['items'][0]['id'] != sample_audit_log.id
+    assert data['next_cursor'] is None
+    
+    response = client.get('/api/stats/audit?since=yesterday', headers=auth_headers)
+    assert response.status_code == 400
+    response = client.get('/api/stats/audit?limit=0', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_get_inventory_history(client, auth_headers, sample_inventory, sample_audit_log):
+    """Test inventory history endpoint."""
+    response = client.get(f'/api/inventory/{sample_inventory.id}/history', headers=auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['items'][0]['asset_tag'] == sample_inventory.asset_tag
+    
+    response = client.get('/api/inventory/999999/history', headers=auth_headers)
+    assert response.status_code == 404
+
+def test_get_inventory_as_of(client, auth_headers, sample_inventory):
+    """Test point-in-time inventory endpoint."""
+    url = f'/api/inventory/{sample_inventory.id}/as-of'
+    response = client.get(f'{url}?ts={datetime.utcnow().isoformat()}', headers=auth_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['state']['asset_tag'] == sample_inventory.asset_tag
+    assert data['location']['site_name'] == 'Test Site'
+    
+    response = client.get(f'{url}?ts=2000-01-01T00:00:00', headers=auth_headers)
+    assert response.status_code == 404
+    response = client.get(f'{url}?ts=yesterday', headers=auth_headers)
+    assert response.status_code == 400
+
 def test_unauthorized_access(client):
     """Test unauthorized access."""
     response = client.get('/api/inventory')